@@ -26,9 +26,19 @@ __all__ = ['BeautifulSoup']
 
 import re
 
+from . import binary
 from .builder import builder_registry
 from .dammit import UnicodeDammit
-from .element import DEFAULT_OUTPUT_ENCODING, NavigableString, Tag
+from .element import (
+    DEFAULT_OUTPUT_ENCODING,
+    NavigableString,
+    SoupStrainer,
+    StringIndex,
+    Tag,
+    _set_up_document,
+    make_links_weak,
+    )
+from .stats import ParseStats
 
 
 class BeautifulSoup(Tag):
@@ -65,46 +75,150 @@ class BeautifulSoup(Tag):
     # alone.
     STRIP_ASCII_SPACES = {9: None, 10: None, 12: None, 13: None, 32: None, }
 
+    # A bs4.stats.ParseStats, if statistics were collected.
+    parse_stats = None
+
+    # The number of documents that have had to be parsed twice, because
+    # the tree builder found a <meta> tag declaring an encoding that
+    # UnicodeDammit didn't spot. See UnicodeDammit.META_CHARSET_RE.
+    reparse_count = 0
+
+    # The markup and encoding passed into the constructor. They're only
+    # kept while parsing, in case the document has to be parsed again.
+    _raw_markup = None
+    _from_encoding = None
+
+    # The SoupStrainers in parse_only that look for tags, and those
+    # that look for strings.
+    _tag_strainers = ()
+    _text_strainers = ()
+
     def __init__(self, markup="", features=None, builder=None,
-                 parse_only=None, from_encoding=None):
+                 parse_only=None, from_encoding=None, index_strings=False,
+                 parse_cache=None, collect_stats=False, weak_links=False):
         """The Soup object is initialized as the 'root tag', and the
         provided markup (which can be a string or a file-like object)
-        is fed into the underlying parser."""
+        is fed into the underlying parser.
+
+        If parse_only is a SoupStrainer, or a list of them, only the
+        parts of the document that match are kept. A tag that matches
+        one of the strainers is kept along with everything inside it,
+        however deep in the document it is; everything outside such a
+        tag is left out of the tree. A string outside them is kept only
+        if it matches a strainer that looks for strings.
+
+        If index_strings is true, a list of all the strings in the
+        document is built once parsing is done, and text searches
+        over the whole document (find_all(text=...)) look through
+        that list instead of the entire tree.
+
+        If parse_cache is a bs4.cache.ParseCache, the document is
+        looked up in the cache before it's parsed, and put in the cache
+        after it's parsed.
+
+        If collect_stats is true, the time spent in each phase of
+        parsing and the number of parser events are recorded in
+        self.parse_stats, a bs4.stats.ParseStats.
+
+        If weak_links is true, the links that point up and back along
+        the tree (parent, previous_element and previous_sibling) are
+        weak references, so the tree has no reference cycles and is
+        freed as soon as the BeautifulSoup object is no longer used,
+        without any help from the cyclic garbage collector. An element
+        of such a tree doesn't keep the rest of the tree alive. See
+        bs4.element.WeakLinkedElement.
+        """
 
         if builder is None:
-            if isinstance(features, basestring):
-                features = [features]
-            if features is None or len(features) == 0:
-                features = self.DEFAULT_BUILDER_FEATURES
-            builder_class = builder_registry.lookup(*features)
-            if builder_class is None:
-                raise ValueError(
-                    "Couldn't find a tree builder with the features you "
-                    "requested: %s. Do you need to install a parser library?"
-                    % ",".join(features))
-            builder = builder_class()
+            builder = self._find_builder(features)
         self.builder = builder
         self.is_xml = builder.is_xml
         self.builder.soup = self
 
         self.parse_only = parse_only
+        if parse_only:
+            if isinstance(parse_only, SoupStrainer):
+                parse_only = [parse_only]
+            self._tag_strainers = tuple(
+                strainer for strainer in parse_only if not strainer.text)
+            self._text_strainers = tuple(
+                strainer for strainer in parse_only if strainer.text)
+        if collect_stats:
+            self.parse_stats = ParseStats()
 
         self.reset()
 
         if hasattr(markup, 'read'):        # It's a file-type object.
             markup = markup.read()
-        self.markup, self.original_encoding, self.declared_html_encoding = (
-            self.builder.prepare_markup(markup, from_encoding))
 
+        cache_key = None
+        if parse_cache is not None:
+            cache_key = parse_cache.key(
+                markup, builder, parse_only, from_encoding)
+        parse_stats = self.parse_stats
+        if cache_key is not None and parse_cache.load(cache_key, self):
+            builder.soup = None
+            self.parse_stats = parse_stats
+        else:
+            self._parse(markup, from_encoding)
+            if cache_key is not None:
+                parse_cache.store(cache_key, self)
+
+        if weak_links:
+            self._make_links_weak()
+        if index_strings:
+            self._string_index = StringIndex(self)
+
+    @classmethod
+    def _find_builder(cls, features):
+        """Make a tree builder with the given features."""
+        if isinstance(features, basestring):
+            features = [features]
+        if features is None or len(features) == 0:
+            features = cls.DEFAULT_BUILDER_FEATURES
+        builder_class = builder_registry.lookup(*features)
+        if builder_class is None:
+            raise ValueError(
+                "Couldn't find a tree builder with the features you "
+                "requested: %s. Do you need to install a parser library?"
+                % ",".join(features))
+        return builder_class()
+
+    def _parse(self, markup, from_encoding):
+        stats = self.parse_stats
+        if stats is not None:
+            stats.start(self)
         try:
-            self._feed()
-        except StopParsing:
-            pass
+            prepared = self.builder.prepare_markup(markup, from_encoding)
+            if stats is not None:
+                stats.encoding_done()
+
+            if not isinstance(markup, unicode):
+                self._raw_markup = markup
+                self._from_encoding = from_encoding
+            while True:
+                (self.markup, self.original_encoding,
+                 self.declared_html_encoding) = prepared
+                try:
+                    self._feed()
+                except ParseAgain as e:
+                    prepared = e.args
+                    BeautifulSoup.reparse_count += 1
+                    self.reset()
+                    continue
+                except StopParsing:
+                    pass
+                break
+        finally:
+            # Even if the parser fails, take out the instrumentation.
+            if stats is not None:
+                stats.finish(self)
 
-        # Clear out the markup and the builder so they can be CGed.
-        self.markup = None
-        self.builder.soup = None
-        self.builder = None
+            # Clear out the markup and the builder so they can be CGed.
+            self._raw_markup = self._from_encoding = None
+            self.markup = None
+            self.builder.soup = None
+            self.builder = None
 
     def _feed(self):
         # Convert the document to Unicode.
@@ -115,9 +229,13 @@ class BeautifulSoup(Tag):
         self.endData()
         while self.currentTag.name != self.ROOT_TAG_NAME:
             self.popTag()
+        # The tree was built without going through insert(), so nothing
+        # has noticed it changing.
+        self._tree_modified()
 
     def reset(self):
         Tag.__init__(self, self, self.builder, self.ROOT_TAG_NAME)
+        self.contents = []
         self.hidden = 1
         self.builder.reset()
         self.currentData = []
@@ -125,6 +243,36 @@ class BeautifulSoup(Tag):
         self.tagStack = []
         self.pushTag(self)
 
+    def _make_links_weak(self):
+        make_links_weak(self._contents)
+        # The BeautifulSoup object keeps its own class, but anything
+        # inserted into it gets weak links.
+        self._weak_links = True
+        # The only other references back to the BeautifulSoup object
+        # are in the parser state, which isn't needed after parsing.
+        self.currentTag = None
+        self.tagStack = []
+
+    def _declared_encoding_found(self, encoding):
+        """Called by a tree builder that finds a <meta> tag declaring
+        the document's encoding, after the document has already been
+        converted to Unicode without that information.
+
+        If converting the original markup with the declared encoding
+        gives different text, raises ParseAgain to start parsing over
+        with that text.
+        """
+        if self._raw_markup is None or not isinstance(self.markup, unicode):
+            # The document was Unicode to begin with, or the parser
+            # is doing its own decoding.
+            return
+        self.declared_html_encoding = encoding
+        markup, original_encoding, declared_encoding = (
+            self.builder.prepare_markup(
+                self._raw_markup, self._from_encoding, encoding))
+        if markup != self.markup:
+            raise ParseAgain(markup, original_encoding, encoding)
+
     def popTag(self):
         tag = self.tagStack.pop()
         #print "Pop", tag.name
@@ -142,17 +290,17 @@ class BeautifulSoup(Tag):
     def endData(self, containerClass=NavigableString):
         if self.currentData:
             currentData = u''.join(self.currentData)
+            tag_info = self.builder.tag_info
             if (currentData.translate(self.STRIP_ASCII_SPACES) == '' and
-                not set([tag.name for tag in self.tagStack]).intersection(
-                    self.builder.preserve_whitespace_tags)):
+                not [tag for tag in self.tagStack
+                     if tag_info(tag.name).preserve_whitespace]):
                 if '\n' in currentData:
                     currentData = '\n'
                 else:
                     currentData = ' '
             self.currentData = []
-            if self.parse_only and len(self.tagStack) <= 1 and \
-                   (not self.parse_only.text or \
-                    not self.parse_only.search(currentData)):
+            if (self.parse_only and len(self.tagStack) <= 1
+                and not self._keeps_string(currentData)):
                 return
             o = containerClass(currentData)
             self.object_was_parsed(o)
@@ -188,6 +336,20 @@ class BeautifulSoup(Tag):
             mostRecentTag = self.popTag()
         return mostRecentTag
 
+    def _keeps_tag(self, name, attrs):
+        """Does a tag outside everything kept so far match parse_only?"""
+        for strainer in self._tag_strainers:
+            if strainer.search_tag(name, attrs):
+                return True
+        return False
+
+    def _keeps_string(self, string):
+        """Does a string outside every kept tag match parse_only?"""
+        for strainer in self._text_strainers:
+            if strainer.search(string):
+                return True
+        return False
+
     def handle_starttag(self, name, attrs):
         """Push a start tag on to the stack.
 
@@ -201,8 +363,7 @@ class BeautifulSoup(Tag):
         self.endData()
 
         if (self.parse_only and len(self.tagStack) <= 1
-            and (self.parse_only.text
-                 or not self.parse_only.search_tag(name, attrs))):
+            and not self._keeps_tag(name, attrs)):
             return None
 
         tag = Tag(self, self.builder, name, attrs, self.currentTag,
@@ -223,6 +384,53 @@ class BeautifulSoup(Tag):
     def handle_data(self, data):
         self.currentData.append(data)
 
+    def dumps(self):
+        """Convert this document into a compact byte string.
+
+        BeautifulSoup.loads() turns the string back into a document
+        much faster than the markup could be parsed again. See
+        bs4.binary for the details.
+        """
+        return binary.dumps(self)
+
+    @classmethod
+    def loads(cls, data):
+        """Turn a byte string created by dumps() back into a document."""
+        return binary.loads(data, cls)
+
+    def clone(self):
+        """Make a copy of this document."""
+        soup = super(BeautifulSoup, self).clone()
+        _set_up_document(
+            soup, self.is_xml, self.parse_only, self.original_encoding,
+            self.declared_html_encoding)
+        if self._weak_links:
+            soup._make_links_weak()
+        return soup
+
+    def close(self):
+        """Destroy the document.
+
+        Every element in the document is decomposed in one pass,
+        breaking all the references between them, so the memory they
+        use is released right away instead of whenever the cyclic
+        garbage collector gets around to it. Afterwards the
+        BeautifulSoup object is empty.
+
+        A BeautifulSoup object can also be used as a context manager,
+        which closes it at the end of the block.
+        """
+        self.clear(decompose=True)
+        # Once parsing is done, previous_element is the last element
+        # in the document.
+        self.previous_element = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def decode(self, pretty_print=False,
                eventual_encoding=DEFAULT_OUTPUT_ENCODING,
                substitute_html_entities=False):
@@ -249,6 +457,12 @@ class StopParsing(Exception):
     pass
 
 
+class ParseAgain(Exception):
+    """Raised to start parsing a document over, with the markup,
+    original encoding and declared encoding given as arguments."""
+    pass
+
+
 #By default, act as an HTML pretty-printer.
 if __name__ == '__main__':
     import sys
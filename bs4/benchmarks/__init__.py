@@ -0,0 +1,352 @@
+"""Measure how fast Beautiful Soup is.
+
+The tests in bs4.tests make sure Beautiful Soup gets the right answer;
+the benchmarks here measure how long it takes. There are three
+suites.
+
+The 'parse' suite parses corpora of documents (see
+bs4.benchmarks.corpus) with each tree builder, and reports documents
+per second, megabytes per second, nodes per second and the peak memory
+used.
+
+The 'tree' suite times searching, outputting and modifying trees of
+different shapes and sizes (see bs4.benchmarks.tree), and reports how
+the time taken grows with the size of the tree.
+
+The 'gc' suite measures how much parsed documents that have been
+thrown away leave for the cyclic garbage collector, with and without
+weak_links: the number of objects it frees, and how long it pauses to
+do so.
+
+From the command line:
+
+    python -m bs4.benchmarks --json results.json
+    python -m bs4.benchmarks --baseline results.json
+
+The second command exits with a nonzero status if anything got
+noticeably slower, or uses noticeably more memory, than it did when
+results.json was saved.
+"""
+
+__all__ = [
+    'BUILDERS',
+    'SUITES',
+    'compare',
+    'format_results',
+    'load_results',
+    'run',
+    'run_gc',
+    'run_parse',
+    'save_results',
+    ]
+
+import gc
+import json
+import multiprocessing
+import platform
+import sys
+
+import bs4
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+from bs4.benchmarks import corpus
+from bs4.benchmarks.tree import run_tree
+from bs4.stats import clock
+
+try:
+    import resource
+except ImportError:
+    # Peak memory can't be measured on this platform.
+    resource = None
+
+# The tree builders to benchmark, by feature name.
+BUILDERS = ['lxml', 'html.parser', 'html5lib']
+
+SUITES = ['parse', 'tree', 'gc']
+
+
+def _peak_memory():
+    """The most memory this process has used so far, in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        # Linux reports kilobytes; Mac OS X reports bytes.
+        peak *= 1024
+    return peak
+
+
+def _count_nodes(soup):
+    return sum(1 for node in soup.recursive_children)
+
+
+def run_parse(feature, corpus_name, documents, repeat=3):
+    """Parse every document in a corpus, `repeat` times over, and
+    report on the fastest time.
+
+    :return: A dictionary of measurements.
+    """
+    builder_class = builder_registry.lookup(feature)
+    total_bytes = sum(len(markup) for markup in documents)
+    nodes = 0
+    memory_before = _peak_memory()
+    best = None
+    for i in range(repeat):
+        start = clock()
+        for markup in documents:
+            soup = BeautifulSoup(markup, builder=builder_class())
+        elapsed = clock() - start
+        if best is None or elapsed < best:
+            best = elapsed
+        if i == 0:
+            # The work of counting the nodes isn't timed.
+            for markup in documents:
+                nodes += _count_nodes(
+                    BeautifulSoup(markup, builder=builder_class()))
+    memory_after = _peak_memory()
+    best = max(best, 1e-9)
+    if memory_before is None:
+        peak_memory = None
+    else:
+        peak_memory = memory_after - memory_before
+    return dict(
+        suite='parse', builder=feature, corpus=corpus_name,
+        documents=len(documents),
+        bytes=total_bytes, nodes=nodes, seconds=best,
+        docs_per_sec=len(documents) / best,
+        mb_per_sec=total_bytes / best / (1024 * 1024),
+        nodes_per_sec=nodes / best,
+        peak_memory=peak_memory)
+
+
+def _run_isolated(args):
+    """Generate a corpus and benchmark it, in a fresh process."""
+    feature, corpus_name, scale, repeat = args
+    return run_parse(
+        feature, corpus_name, corpus.generate(corpus_name, scale), repeat)
+
+
+def run_gc(builders=None, scale=1.0, repeat=3):
+    """Parse the small_pages corpus with automatic garbage collection
+    switched off, throwing each document away as soon as it's parsed,
+    then time a full collection. Do this once with ordinary trees and
+    once with weak_links, for each tree builder.
+
+    :return: A dictionary of results, keyed by
+        'gc/<builder>/default' and 'gc/<builder>/weak_links'.
+    """
+    if builders is None:
+        builders = BUILDERS
+    documents = corpus.generate('small_pages', scale)
+    results = {}
+    for feature in builders:
+        builder_class = builder_registry.lookup(feature)
+        if builder_class is None:
+            continue
+        for weak_links in (False, True):
+            best = None
+            for i in range(repeat):
+                gc.collect()
+                gc.disable()
+                try:
+                    for markup in documents:
+                        BeautifulSoup(markup, builder=builder_class(),
+                                      weak_links=weak_links)
+                    start = clock()
+                    collected = gc.collect()
+                    elapsed = clock() - start
+                finally:
+                    gc.enable()
+                if best is None or elapsed < best:
+                    best = elapsed
+            if weak_links:
+                mode = 'weak_links'
+            else:
+                mode = 'default'
+            results['gc/%s/%s' % (feature, mode)] = dict(
+                suite='gc', builder=feature, weak_links=weak_links,
+                documents=len(documents), collected=collected,
+                seconds=best, peak_memory=None)
+    return results
+
+
+def run(builders=None, corpora=None, scale=1.0, repeat=3, isolate=True,
+        documents=None, suites=None):
+    """Run the benchmarks.
+
+    :param builders: Feature names of the tree builders to use. Builders
+        that aren't installed are skipped. Defaults to BUILDERS.
+    :param corpora: Names of the corpora to parse. Defaults to all of
+        them.
+    :param scale: Make every corpus this much bigger or smaller.
+    :param isolate: Run each benchmark in a new process, so that peak
+        memory figures aren't thrown off by earlier benchmarks.
+    :param documents: A list of byte strings to parse instead of the
+        generated corpora. They're reported as the corpus 'custom'.
+    :param suites: The suites to run. Defaults to all of SUITES.
+
+    :return: A dictionary of results, suitable for save_results().
+    """
+    if suites is None:
+        suites = SUITES
+    if builders is None:
+        builders = BUILDERS
+    if corpora is None:
+        corpora = [name for name, function in corpus.CORPORA]
+    builders = [feature for feature in builders
+                if builder_registry.lookup(feature) is not None]
+
+    results = {}
+    parse_builders = builders
+    if 'parse' not in suites:
+        parse_builders = []
+    for feature in parse_builders:
+        if documents is not None:
+            cases = [('custom', documents)]
+        else:
+            cases = [(name, None) for name in corpora]
+        for corpus_name, case_documents in cases:
+            try:
+                if case_documents is not None:
+                    result = run_parse(
+                        feature, corpus_name, case_documents, repeat)
+                elif isolate:
+                    pool = multiprocessing.Pool(1)
+                    try:
+                        result = pool.apply(
+                            _run_isolated,
+                            [(feature, corpus_name, scale, repeat)])
+                    finally:
+                        pool.close()
+                        pool.join()
+                else:
+                    result = _run_isolated(
+                        (feature, corpus_name, scale, repeat))
+            except Exception, e:
+                # A builder that can't parse a corpus shouldn't stop
+                # the other benchmarks from running.
+                result = dict(
+                    suite='parse', builder=feature, corpus=corpus_name,
+                    peak_memory=None,
+                    error="%s: %s" % (e.__class__.__name__, e))
+            results["%s/%s" % (feature, corpus_name)] = result
+    if 'tree' in suites:
+        results.update(run_tree(scale=scale, repeat=repeat))
+    if 'gc' in suites:
+        results.update(run_gc(builders, scale, repeat))
+    return dict(
+        version=bs4.__version__,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        scale=scale,
+        results=results)
+
+
+def save_results(results, filename):
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=0.1):
+    """Compare a set of results against a saved baseline.
+
+    :param tolerance: How much worse than the baseline a benchmark can
+        get (as a fraction) before it counts as a regression.
+    :return: A list of descriptions of the regressions.
+    """
+    regressions = []
+    old_results = baseline['results']
+    for key, new in sorted(results['results'].items()):
+        old = old_results.get(key)
+        if old is None:
+            continue
+        if 'error' in new and 'error' not in old:
+            regressions.append("%s: %s" % (key, new['error']))
+            continue
+        if 'error' in new or 'error' in old:
+            continue
+        if new['suite'] == 'gc':
+            # The number of objects is the same every time, so any
+            # increase is real.
+            if new['collected'] > old['collected']:
+                regressions.append(
+                    "%s: %d objects left for the garbage collector, was %d"
+                    % (key, new['collected'], old['collected']))
+            continue
+        if new['suite'] == 'parse':
+            rate, units = 'docs_per_sec', 'docs/sec'
+        else:
+            rate, units = 'ops_per_sec', 'ops/sec'
+        if new[rate] < old[rate] * (1 - tolerance):
+            regressions.append(
+                "%s: %.1f %s, was %.1f" % (key, new[rate], units, old[rate]))
+        if (new['peak_memory'] is not None and old['peak_memory']
+            and new['peak_memory'] > old['peak_memory'] * (1 + tolerance)):
+            regressions.append(
+                "%s: peak memory %d bytes, was %d" % (
+                    key, new['peak_memory'], old['peak_memory']))
+    return regressions
+
+
+def format_results(results):
+    """Turn a set of results into tables, one for each suite."""
+    parse = []
+    tree = []
+    garbage = []
+    for key, result in sorted(results['results'].items()):
+        if result['suite'] == 'gc':
+            garbage.append("%-32s %10d %12d %10.3f" % (
+                key, result['documents'], result['collected'],
+                result['seconds'] * 1000))
+            continue
+        if result['suite'] == 'parse':
+            if 'error' in result:
+                parse.append("%-28s %s" % (key, result['error']))
+                continue
+            if result['peak_memory'] is None:
+                peak = "-"
+            else:
+                peak = "%.1f" % (result['peak_memory'] / (1024.0 * 1024))
+            parse.append("%-28s %10.1f %8.2f %12.0f %10s" % (
+                key, result['docs_per_sec'], result['mb_per_sec'],
+                result['nodes_per_sec'], peak))
+        else:
+            tree.append(result)
+
+    lines = []
+    if parse:
+        lines.append("%-28s %10s %8s %12s %10s" % (
+            "benchmark", "docs/sec", "MB/sec", "nodes/sec", "peak MB"))
+        lines.extend(parse)
+    if tree:
+        if lines:
+            lines.append("")
+        lines.append("%-36s %8s %12s %7s" % (
+            "benchmark", "size", "ms", "growth"))
+        tree.sort(key=lambda result: (
+            result['shape'], result['operation'], result['size']))
+        for result in tree:
+            name = "tree/%s/%s" % (result['shape'], result['operation'])
+            if 'error' in result:
+                lines.append("%-36s %8d  %s" % (
+                    name, result['size'], result['error']))
+                continue
+            growth = result.get('growth')
+            if growth is None:
+                growth = "-"
+            else:
+                growth = "%.2f" % growth
+            lines.append("%-36s %8d %12.3f %7s" % (
+                name, result['size'], result['seconds'] * 1000, growth))
+    if garbage:
+        if lines:
+            lines.append("")
+        lines.append("%-32s %10s %12s %10s" % (
+            "benchmark", "documents", "collected", "pause ms"))
+        lines.extend(garbage)
+    return "\n".join(lines)
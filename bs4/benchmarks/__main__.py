@@ -0,0 +1,80 @@
+"""Run the benchmarks from the command line. See bs4.benchmarks."""
+
+from optparse import OptionParser
+import sys
+import warnings
+
+from bs4 import benchmarks
+from bs4.benchmarks import corpus
+
+
+def main(args=None):
+    parser = OptionParser(usage="python -m bs4.benchmarks [options]")
+    parser.add_option(
+        "--suite", action="append", dest="suites",
+        help="Run this suite of benchmarks (%s). Can be given more than "
+        "once. Default: all of them." % ", ".join(benchmarks.SUITES))
+    parser.add_option(
+        "-b", "--builder", action="append", dest="builders",
+        help="Benchmark this tree builder (lxml, html.parser, html5lib). "
+        "Can be given more than once. Default: all that are installed.")
+    parser.add_option(
+        "-c", "--corpus", action="append", dest="corpora",
+        help="Parse this corpus (%s). Can be given more than once. "
+        "Default: all of them." % ", ".join(
+            name for name, function in corpus.CORPORA))
+    parser.add_option(
+        "-d", "--directory",
+        help="Parse the files in this directory instead of the generated "
+        "corpora.")
+    parser.add_option(
+        "-s", "--scale", type="float", default=1.0,
+        help="Make the generated corpora and trees bigger or smaller by "
+        "this factor.")
+    parser.add_option(
+        "-r", "--repeat", type="int", default=3,
+        help="Run each benchmark this many times and keep the best time.")
+    parser.add_option(
+        "--json", help="Write the results to this file.")
+    parser.add_option(
+        "--baseline",
+        help="Compare the results against this file, written earlier with "
+        "--json, and fail if anything got worse.")
+    parser.add_option(
+        "--tolerance", type="float", default=0.1,
+        help="How much worse than the baseline a result can be before it "
+        "counts as a regression. Default: 0.1 (10%).")
+    parser.add_option(
+        "--no-isolate", action="store_false", dest="isolate", default=True,
+        help="Run every benchmark in this process, instead of a new "
+        "process each. Faster, but the peak memory figures are less "
+        "meaningful.")
+    options, args = parser.parse_args(args)
+    # html5lib warns about every document it parses.
+    warnings.simplefilter("ignore")
+
+    documents = None
+    if options.directory is not None:
+        documents = corpus.load_directory(options.directory)
+    results = benchmarks.run(
+        options.builders, options.corpora, options.scale, options.repeat,
+        options.isolate, documents, options.suites)
+    print benchmarks.format_results(results)
+    if options.json is not None:
+        benchmarks.save_results(results, options.json)
+
+    if options.baseline is not None:
+        regressions = benchmarks.compare(
+            results, benchmarks.load_results(options.baseline),
+            options.tolerance)
+        if regressions:
+            print
+            print "Regressions against %s:" % options.baseline
+            for regression in regressions:
+                print "  " + regression
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
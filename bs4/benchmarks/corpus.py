@@ -0,0 +1,184 @@
+"""Documents to benchmark against.
+
+Each corpus is a list of byte strings, generated from a fixed random
+seed so that every run parses exactly the same markup. The `scale`
+argument makes every corpus proportionally bigger or smaller.
+"""
+
+__all__ = ['CORPORA', 'generate', 'load_directory']
+
+import os
+import random
+
+WORDS = (u"lorem ipsum dolor sit amet consectetur adipiscing elit sed do "
+         u"eiusmod tempor incididunt ut labore et dolore magna aliqua").split()
+
+PAGE = u"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<link rel="stylesheet" href="/style.css">
+</head>
+<body>
+<div id="nav"><ul>%(nav)s</ul></div>
+<div id="content" class="main">
+<h1>%(title)s</h1>
+%(paragraphs)s
+</div>
+<div id="footer"><p>Copyright &copy; 2011</p></div>
+</body>
+</html>
+"""
+
+
+def _sentence(rng, words=12):
+    return u" ".join(rng.choice(WORDS) for i in range(words))
+
+
+def small_pages(rng, scale):
+    """Lots of small, well-formed pages, like the output of a crawl."""
+    documents = []
+    for i in range(int(200 * scale) or 1):
+        nav = u"".join(
+            u'<li><a href="/page/%d">%s</a></li>' % (j, rng.choice(WORDS))
+            for j in range(8))
+        paragraphs = u"\n".join(
+            u'<p class="para">%s <a href="/link/%d">%s</a> %s</p>' % (
+                _sentence(rng), j, rng.choice(WORDS), _sentence(rng))
+            for j in range(6))
+        page = PAGE % dict(
+            title=_sentence(rng, 4), nav=nav, paragraphs=paragraphs)
+        documents.append(page.encode("utf-8"))
+    return documents
+
+
+def huge_table(rng, scale):
+    """One document that's a single enormous table."""
+    rows = []
+    for i in range(int(20000 * scale) or 1):
+        rows.append(
+            u'<tr class="row%d"><td>%d</td><td><a href="/item/%d">%s</a>'
+            u'</td><td align="right">%.2f</td></tr>' % (
+                i % 2, i, i, rng.choice(WORDS), rng.random() * 1000))
+    document = (u"<html><body><table>\n%s\n</table></body></html>"
+                % u"\n".join(rows))
+    return [document.encode("utf-8")]
+
+
+def deep_nesting(rng, scale):
+    """Documents whose tags are nested hundreds of levels deep."""
+    documents = []
+    depth = 200
+    for i in range(int(50 * scale) or 1):
+        opening = u"".join(
+            u'<div class="level%d"><span>%s</span>' % (level, rng.choice(WORDS))
+            for level in range(depth))
+        document = u"<html><body>%s%s</body></html>" % (
+            opening, u"</div>" * depth)
+        documents.append(document.encode("utf-8"))
+    return documents
+
+
+def malformed(rng, scale):
+    """Tag soup: unclosed and misnested tags, stray end tags, unquoted
+    and duplicate attributes."""
+    fragments = [
+        u"<p>%s",
+        u"<b><i>%s</b></i>",
+        u"</span>%s",
+        u"<a href=/x/%d>%%s" % rng.randint(0, 100),
+        u"<td>%s</td>",
+        u'<div class=a class=b>%s',
+        u"<li>%s<li>",
+        u"<br/>%s</br>",
+        u"<table><tr><td>%s</table>",
+        u"<!-- %s",
+        ]
+    documents = []
+    for i in range(int(200 * scale) or 1):
+        body = u"".join(rng.choice(fragments) % _sentence(rng, 6)
+                        for j in range(40))
+        documents.append((u"<html><body>" + body).encode("utf-8"))
+    return documents
+
+
+def entities(rng, scale):
+    """Text full of named and numeric character references."""
+    references = [u"&amp;", u"&lt;", u"&gt;", u"&quot;", u"&eacute;",
+                  u"&nbsp;", u"&mdash;", u"&copy;", u"&#233;", u"&#x2014;",
+                  u"&#8220;", u"&hellip;"]
+    documents = []
+    for i in range(int(200 * scale) or 1):
+        paragraphs = []
+        for j in range(20):
+            text = u" ".join(u"%s%s" % (rng.choice(WORDS),
+                                        rng.choice(references))
+                             for k in range(15))
+            paragraphs.append(u'<p title="%s">%s</p>' % (
+                rng.choice(references), text))
+        documents.append(
+            (u"<html><body>%s</body></html>" % u"\n".join(paragraphs)
+             ).encode("utf-8"))
+    return documents
+
+
+NON_UTF8 = [
+    ('windows-1252',
+     u"caf\xe9 na\xefve r\xe9sum\xe9 \u201cquoted\u201d \u2014"),
+    ('koi8-r',
+     u"\u0421\u043e\u0441\u0438\u0441\u043a\u0430 "
+     u"\u043f\u0440\u0438\u0432\u0435\u0442 \u043c\u0438\u0440"),
+    ('shift_jis',
+     u"\u3053\u3093\u306b\u3061\u306f \u4e16\u754c "
+     u"\u65e5\u672c\u8a9e"),
+    ]
+
+
+def non_utf8(rng, scale):
+    """Pages in legacy encodings, declared in a <meta> tag, so that
+    Beautiful Soup has to work out the encoding before it can parse."""
+    documents = []
+    for i in range(int(150 * scale) or 1):
+        encoding, text = NON_UTF8[i % len(NON_UTF8)]
+        paragraphs = u"\n".join(u"<p>%s %s</p>" % (text, _sentence(rng))
+                                for j in range(20))
+        document = (
+            u'<html><head><meta http-equiv="Content-Type" '
+            u'content="text/html; charset=%s"><title>%s</title></head>'
+            u'<body>%s</body></html>' % (encoding, text, paragraphs))
+        documents.append(document.encode(encoding))
+    return documents
+
+
+# The corpora, in the order they're run.
+CORPORA = [
+    ('small_pages', small_pages),
+    ('huge_table', huge_table),
+    ('deep_nesting', deep_nesting),
+    ('malformed', malformed),
+    ('entities', entities),
+    ('non_utf8', non_utf8),
+    ]
+
+
+def generate(name, scale=1.0, seed=0):
+    """Generate the named corpus.
+
+    :return: A list of byte strings.
+    """
+    for corpus_name, function in CORPORA:
+        if corpus_name == name:
+            return function(random.Random(seed), scale)
+    raise ValueError("No such corpus: %s" % name)
+
+
+def load_directory(path):
+    """Use the files in a directory as a corpus."""
+    documents = []
+    for filename in sorted(os.listdir(path)):
+        filename = os.path.join(path, filename)
+        if os.path.isfile(filename):
+            with open(filename, 'rb') as f:
+                documents.append(f.read())
+    return documents
@@ -0,0 +1,246 @@
+"""Benchmarks of searching, outputting and modifying a parse tree.
+
+Each operation is run against trees of several sizes and three shapes:
+
+  flat:     one tag with all the others as its children.
+  balanced: every tag has four children.
+  deep:     every tag is the only child of the one before it.
+
+Every tree has `size` <div> tags, with ids n0 (the root) to n(size-1)
+in document order, and a string inside each tag. Running an operation
+over a range of sizes shows how its cost grows, which a single
+measurement can't: for each size after the first, the results include
+the exponent k for which the time taken looks like size**k. An
+operation that's linear in the size of the tree has a growth near 1;
+one that's quadratic has a growth near 2.
+"""
+
+__all__ = ['OPERATIONS', 'SHAPES', 'SIZES', 'make_tree', 'run_tree']
+
+import gc
+import math
+import re
+
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString
+from bs4.stats import clock
+
+SHAPES = ['flat', 'balanced', 'deep']
+
+# The tree sizes to try, before scaling.
+SIZES = [500, 1000, 2000, 4000]
+
+# How many children each tag in a balanced tree has.
+FANOUT = 4
+
+
+def _tag(number):
+    return u'<div class="c%d" id="n%d">t%d' % (number % 10, number, number)
+
+
+def tree_markup(shape, size):
+    """Generate markup for a tree of the given shape and size."""
+    if shape == 'flat':
+        body = (_tag(0) + u"".join(_tag(i) + u"</div>"
+                                   for i in range(1, size)) + u"</div>")
+    elif shape == 'deep':
+        body = u"".join(_tag(i) for i in range(size)) + u"</div>" * size
+    elif shape == 'balanced':
+        # Lay the tree out breadth-first, as in a heap, then write it
+        # out (and number the tags) in document order.
+        parts = []
+        number = 0
+        stack = [(0, False)]
+        while stack:
+            position, closing = stack.pop()
+            if closing:
+                parts.append(u"</div>")
+                continue
+            parts.append(_tag(number))
+            number += 1
+            stack.append((position, True))
+            first_child = position * FANOUT + 1
+            children = range(first_child, min(first_child + FANOUT, size))
+            for child in reversed(children):
+                stack.append((child, False))
+        body = u"".join(parts)
+    else:
+        raise ValueError("No such tree shape: %s" % shape)
+    return u'<html><body>%s<span id="end">end</span></body></html>' % body
+
+
+def make_tree(shape, size):
+    """Parse a tree of the given shape and size.
+
+    html.parser is used because it builds exactly the tree the markup
+    describes, however deep.
+    """
+    return BeautifulSoup(tree_markup(shape, size), "html.parser")
+
+
+def _target(tags):
+    return "n%d" % (len(tags) // 2)
+
+
+# Each operation is given the tree and a list of its <div> tags, in
+# document order, so that it doesn't have to spend any time finding
+# the tags it works on.
+
+def find_all_name(soup, tags):
+    soup.find_all('div')
+
+
+def find_all_attr(soup, tags):
+    soup.find_all(id=_target(tags))
+
+
+def find_all_class(soup, tags):
+    soup.find_all('div', 'c3')
+
+
+def find_all_regex(soup, tags):
+    soup.find_all(re.compile('^d'))
+
+
+def find_all_callable(soup, tags):
+    target = _target(tags)
+    soup.find_all(lambda tag: tag.get('id') == target)
+
+
+def find_next(soup, tags):
+    # The only <span> is at the very end of the document.
+    tags[0].find_next('span')
+
+
+def find_parents(soup, tags):
+    tags[-1].find_parents('div')
+
+
+def get_text(soup, tags):
+    soup.get_text()
+
+
+def decode(soup, tags):
+    soup.decode()
+
+
+def prettify(soup, tags):
+    soup.prettify()
+
+
+def _samples(tags):
+    """Every tenth tag, in reverse document order."""
+    return tags[::10][::-1]
+
+
+def extract_insert(soup, tags):
+    for tag in _samples(tags):
+        parent = tag.parent
+        position = parent.index(tag)
+        tag.extract()
+        parent.insert(position, tag)
+
+
+def replace_with(soup, tags):
+    # Deeper tags come first, so in a deep tree every sample is still
+    # in the tree when its turn comes.
+    for tag in _samples(tags):
+        tag.replace_with(NavigableString(u"replaced"))
+
+
+def decompose(soup, tags):
+    tags[0].decompose()
+
+
+OPERATIONS = [
+    ('find_all_name', find_all_name),
+    ('find_all_attr', find_all_attr),
+    ('find_all_class', find_all_class),
+    ('find_all_regex', find_all_regex),
+    ('find_all_callable', find_all_callable),
+    ('find_next', find_next),
+    ('find_parents', find_parents),
+    ('get_text', get_text),
+    ('decode', decode),
+    ('prettify', prettify),
+    ('extract_insert', extract_insert),
+    ('replace_with', replace_with),
+    ('decompose', decompose),
+    ]
+
+# Times shorter than this are too close to the resolution of the clock
+# to say anything about how an operation grows.
+MIN_GROWTH_SECONDS = 1e-4
+
+
+def _time_operation(function, soup, repeat):
+    best = None
+    for i in range(repeat):
+        # Work on a fresh copy, made before starting the clock. That
+        # way nothing is left over from the last run: neither changes
+        # to the tree nor anything Beautiful Soup has cached about it.
+        tree = soup.clone()
+        tags = tree.find_all('div')
+        # As with timeit, don't let a garbage collection triggered by
+        # some earlier allocation land in the middle of the timing.
+        gc.collect()
+        gc.disable()
+        try:
+            start = clock()
+            function(tree, tags)
+            elapsed = clock() - start
+        finally:
+            gc.enable()
+        if best is None or elapsed < best:
+            best = elapsed
+    return max(best, 1e-9)
+
+
+def run_tree(shapes=None, operations=None, sizes=None, scale=1.0,
+             repeat=3):
+    """Time tree operations against trees of different shapes and sizes.
+
+    :param shapes: Names of tree shapes. Defaults to all of SHAPES.
+    :param operations: Names of operations. Defaults to all of
+        OPERATIONS.
+    :param sizes: Tree sizes. Defaults to SIZES, multiplied by `scale`.
+
+    :return: A dictionary of results, keyed by
+        'tree/<shape>/<operation>/<size>'. An operation that fails (for
+        instance, by recursing too deeply) has an 'error' instead of a
+        time.
+    """
+    if shapes is None:
+        shapes = SHAPES
+    if operations is None:
+        operations = [name for name, function in OPERATIONS]
+    if sizes is None:
+        sizes = [max(int(size * scale), 10) for size in SIZES]
+
+    results = {}
+    for shape in shapes:
+        trees = dict((size, make_tree(shape, size)) for size in sizes)
+        for name, function in OPERATIONS:
+            if name not in operations:
+                continue
+            previous = None
+            for size in sizes:
+                result = dict(suite='tree', shape=shape, operation=name,
+                              size=size, peak_memory=None)
+                try:
+                    seconds = _time_operation(
+                        function, trees[size], repeat)
+                except RuntimeError, e:
+                    result['error'] = str(e)
+                    previous = None
+                else:
+                    result.update(seconds=seconds, ops_per_sec=1 / seconds)
+                    if (previous is not None
+                        and min(seconds, previous[1]) >= MIN_GROWTH_SECONDS):
+                        previous_size, previous_seconds = previous
+                        result['growth'] = (
+                            math.log(seconds / previous_seconds)
+                            / math.log(float(size) / previous_size))
+                    previous = (size, seconds)
+                results["tree/%s/%s/%d" % (shape, name, size)] = result
+    return results
@@ -0,0 +1,294 @@
+"""A compact binary format for parsed documents.
+
+A BeautifulSoup object can be written out with dumps() and read back
+in with loads() much faster than the document can be parsed again, and
+much faster than it can be pickled and unpickled.
+
+The format is a flat table with one fixed-size record per element, in
+document order, so it never needs to recurse. All tag names, attribute
+names, attribute values and strings are stored once in a string table
+and referred to by number. None of the links between elements are
+stored: they're rebuilt from each element's position in the table and
+the position of its parent.
+
+Layout (all integers are unsigned, 32-bit and little-endian):
+
+  header      magic, format version, flags, element count, attribute
+              count, string count, and the string numbers of the
+              document's original and declared encodings.
+  elements    For each element: kind and flags, name (or text) string
+              number, parent element number, number of the first
+              element after this element's subtree, first attribute
+              number, attribute count.
+  attributes  For each attribute: key string number, value string
+              number.
+  offsets     string count + 1 offsets into the string data.
+  string data The strings, encoded as UTF-8.
+"""
+
+__all__ = ['dumps', 'loads']
+
+from array import array
+import struct
+import sys
+
+from bs4.element import (
+    CData,
+    Comment,
+    Declaration,
+    Doctype,
+    NavigableString,
+    ProcessingInstruction,
+    Tag,
+    _link_in_document_order,
+    _set_up_document,
+    _set_up_tag,
+    )
+
+MAGIC = b'BS4T'
+FORMAT_VERSION = 1
+
+# Stands in for a missing string or element number.
+NONE = 0xFFFFFFFF
+
+HEADER = struct.Struct('<4sHHIIIII')
+
+# The number of integers in an element record, and in an attribute
+# record.
+ELEMENT_SIZE = 6
+ATTRIBUTE_SIZE = 2
+
+# The kinds of element.
+TAG = 0
+STRING_CLASSES = [NavigableString, CData, ProcessingInstruction, Comment,
+                  Declaration, Doctype]
+STRING_KINDS = dict((cls, kind + 1) for kind, cls in enumerate(STRING_CLASSES))
+
+# Element flags.
+CAN_BE_EMPTY_ELEMENT = 0x100
+CONTAINS_SUBSTITUTIONS = 0x200
+HIDDEN = 0x400
+KIND_MASK = 0xFF
+
+# Document flags.
+IS_XML = 0x1
+
+
+def _uint32_array(values=()):
+    return array('I', values)
+
+
+def _to_bytes(a):
+    if sys.byteorder == 'big':
+        a = array(a.typecode, a)
+        a.byteswap()
+    if hasattr(a, 'tobytes'):
+        return a.tobytes()
+    return a.tostring()
+
+
+def _from_bytes(data, start, count):
+    a = _uint32_array()
+    end = start + count * a.itemsize
+    if end > len(data):
+        raise ValueError("Truncated Beautiful Soup binary data.")
+    if hasattr(a, 'frombytes'):
+        a.frombytes(data[start:end])
+    else:
+        a.fromstring(data[start:end])
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return a, end
+
+
+def _string_kind(string):
+    kind = STRING_KINDS.get(string.__class__)
+    if kind is None:
+        # An unknown subclass; store it as its nearest known ancestor.
+        for cls in string.__class__.__mro__:
+            if cls in STRING_KINDS:
+                kind = STRING_KINDS[cls]
+                break
+    return kind
+
+
+class StringTable(object):
+    """Strings stored once each and referred to by number, in the order
+    they were first seen."""
+
+    def __init__(self):
+        self.strings = []
+        self._numbers = {}
+
+    def intern(self, value):
+        """The number of a string, which is added to the table if it's
+        new. Anything that isn't Unicode is converted first, and None
+        is NONE."""
+        if value is None:
+            return NONE
+        if not isinstance(value, unicode):
+            value = unicode(value)
+        number = self._numbers.get(value)
+        if number is None:
+            number = self._numbers[value] = len(self.strings)
+            self.strings.append(value)
+        return number
+
+
+def dumps(soup):
+    """Convert a BeautifulSoup object into a byte string."""
+    table = StringTable()
+    intern = table.intern
+    strings = table.strings
+    elements = _uint32_array()
+    attributes = _uint32_array()
+    parents = []
+
+    # Walk the tree in document order without recursing.
+    stack = [(soup, NONE)]
+    while stack:
+        element, parent = stack.pop()
+        number = len(parents)
+        parents.append(parent)
+        if isinstance(element, Tag):
+            flags = TAG
+            if element.can_be_empty_element:
+                flags |= CAN_BE_EMPTY_ELEMENT
+            if element.contains_substitutions:
+                flags |= CONTAINS_SUBSTITUTIONS
+            if element.hidden:
+                flags |= HIDDEN
+            attribute_start = len(attributes) // ATTRIBUTE_SIZE
+            attrs = element._attrs
+            for key, value in attrs.items():
+                attributes.append(intern(key))
+                attributes.append(intern(value))
+            elements.extend(
+                (flags, intern(element.name), parent, number + 1,
+                 attribute_start, len(attrs)))
+            for child in reversed(element._contents):
+                stack.append((child, number))
+        else:
+            elements.extend(
+                (_string_kind(element), intern(element), parent, number + 1,
+                 0, 0))
+
+    # An element's subtree ends where its last descendant's does.
+    for number in range(len(parents) - 1, 0, -1):
+        parent = parents[number]
+        end = elements[number * ELEMENT_SIZE + 3]
+        if end > elements[parent * ELEMENT_SIZE + 3]:
+            elements[parent * ELEMENT_SIZE + 3] = end
+
+    original_encoding = intern(soup.original_encoding)
+    declared_encoding = intern(soup.declared_html_encoding)
+
+    offsets = _uint32_array([0])
+    encoded = []
+    size = 0
+    for string in strings:
+        data = string.encode("utf-8")
+        encoded.append(data)
+        size += len(data)
+        offsets.append(size)
+
+    flags = 0
+    if soup.is_xml:
+        flags |= IS_XML
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, flags, len(parents),
+        len(attributes) // ATTRIBUTE_SIZE, len(strings),
+        original_encoding, declared_encoding)
+    return b''.join(
+        [header, _to_bytes(elements), _to_bytes(attributes),
+         _to_bytes(offsets)] + encoded)
+
+
+def read_header(data):
+    """Check and unpack the header of some binary data.
+
+    :return: A 2-tuple (header fields, offset of the element table).
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated Beautiful Soup binary data.")
+    fields = HEADER.unpack_from(data, 0)
+    if fields[0] != MAGIC:
+        raise ValueError("Not Beautiful Soup binary data.")
+    if fields[1] != FORMAT_VERSION:
+        raise ValueError(
+            "Unsupported Beautiful Soup binary format version: %d"
+            % fields[1])
+    return fields, HEADER.size
+
+
+def loads(data, soup_class, soup=None):
+    """Turn a byte string made by dumps() back into an object tree.
+
+    :param soup_class: The BeautifulSoup class (or subclass) to use for
+        the root of the tree.
+    :param soup: If this is given, it's used as the root of the tree
+        instead of a new object, and anything it contained is thrown
+        away.
+    """
+    ((magic, version, document_flags, element_count, attribute_count,
+      string_count, original_encoding, declared_encoding),
+     position) = read_header(data)
+    elements, position = _from_bytes(
+        data, position, element_count * ELEMENT_SIZE)
+    attributes, position = _from_bytes(
+        data, position, attribute_count * ATTRIBUTE_SIZE)
+    offsets, position = _from_bytes(data, position, string_count + 1)
+    if position + offsets[-1] > len(data):
+        raise ValueError("Truncated Beautiful Soup binary data.")
+    strings = [data[position + offsets[i]:position + offsets[i + 1]].decode(
+               "utf-8") for i in range(string_count)]
+
+    def string(number):
+        if number == NONE:
+            return None
+        return strings[number]
+
+    if soup is None:
+        soup = Tag.__new__(soup_class)
+    nodes = []
+
+    def elements_in_order():
+        for number in range(element_count):
+            i = number * ELEMENT_SIZE
+            flags = elements[i]
+            kind = flags & KIND_MASK
+            parent_number = elements[i + 2]
+            if parent_number == NONE:
+                parent = None
+            else:
+                parent = nodes[parent_number]
+            if kind == TAG:
+                if parent is None:
+                    node = soup
+                else:
+                    node = Tag.__new__(Tag)
+                attrs = None
+                if elements[i + 5]:
+                    attribute_start = elements[i + 4] * ATTRIBUTE_SIZE
+                    attribute_end = (
+                        attribute_start + elements[i + 5] * ATTRIBUTE_SIZE)
+                    attrs = {}
+                    for j in range(
+                        attribute_start, attribute_end, ATTRIBUTE_SIZE):
+                        attrs[strings[attributes[j]]] = string(
+                            attributes[j + 1])
+                _set_up_tag(
+                    node, soup_class, strings[elements[i + 1]], attrs,
+                    bool(flags & HIDDEN), bool(flags & CAN_BE_EMPTY_ELEMENT),
+                    bool(flags & CONTAINS_SUBSTITUTIONS))
+            else:
+                node = STRING_CLASSES[kind - 1](strings[elements[i + 1]])
+            nodes.append(node)
+            yield node, parent
+
+    if _link_in_document_order(elements_in_order()) is not soup:
+        raise ValueError("Beautiful Soup binary data has no document.")
+    _set_up_document(
+        soup, bool(document_flags & IS_XML), None, string(original_encoding),
+        string(declared_encoding))
+    return soup
@@ -1,10 +1,11 @@
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import re
 import sys
 
 __all__ = [
     'HTMLTreeBuilder',
     'SAXTreeBuilder',
+    'TagInfo',
     'TreeBuilder',
     'TreeBuilderRegistry',
     ]
@@ -72,6 +73,12 @@ class TreeBuilderRegistry(object):
 # to look up builders in this registry.
 builder_registry = TreeBuilderRegistry()
 
+# What a TreeBuilder thinks about tags with a particular name. See
+# TreeBuilder.tag_info().
+TagInfo = namedtuple(
+    'TagInfo',
+    ['can_be_empty_element', 'preserve_whitespace', 'might_substitute'])
+
 
 class TreeBuilder(object):
     """Turn a document into a Beautiful Soup object tree."""
@@ -82,6 +89,21 @@ class TreeBuilder(object):
     preserve_whitespace_tags = set()
     empty_element_tags = None # A tag will be considered an empty-element
                               # tag when and only when it has no contents.
+    substitution_tags = None # The only tags set_up_substitutions()
+                             # might change. None means any tag.
+
+    # True if feed() puts the tree together out of Tag objects itself,
+    # instead of calling the BeautifulSoup object's handle_starttag(),
+    # handle_endtag(), handle_data() and endData().
+    builds_own_tree = False
+
+    # True if the attributes passed to handle_starttag() are a new dict
+    # whose names have already been through intern_name(), so the Tag
+    # can keep it as it is.
+    hands_over_attrs = False
+
+    # TagInfo objects, keyed by tag name. Created by tag_info().
+    _tag_info = None
 
     def __init__(self):
         self.soup = None
@@ -89,6 +111,33 @@ class TreeBuilder(object):
     def reset(self):
         pass
 
+    def tag_info(self, tag_name):
+        """Find out what this builder thinks about tags with the given
+        name.
+
+        The answer is worked out once per name and cached, so that
+        creating a Tag costs one dictionary lookup instead of several
+        method calls.
+
+        :return: A TagInfo.
+        """
+        if self._tag_info is None:
+            self._tag_info = {}
+        info = self._tag_info.get(tag_name)
+        if info is None:
+            if (self.__class__.set_up_substitutions
+                == TreeBuilder.set_up_substitutions):
+                # This builder never changes anything.
+                might_substitute = False
+            else:
+                might_substitute = (self.substitution_tags is None
+                                    or tag_name in self.substitution_tags)
+            info = self._tag_info[tag_name] = TagInfo(
+                self.can_be_empty_element(tag_name),
+                tag_name in self.preserve_whitespace_tags,
+                might_substitute)
+        return info
+
     def can_be_empty_element(self, tag_name):
         """Might a tag with this name be an empty-element tag?
 
@@ -189,6 +238,7 @@ class HTMLTreeBuilder(TreeBuilder):
     preserve_whitespace_tags = set(['pre', 'textarea'])
     empty_element_tags = set(['br' , 'hr', 'input', 'img', 'meta',
                               'spacer', 'link', 'frame', 'base'])
+    substitution_tags = set(['meta'])
 
     # Used by set_up_substitutions to detect the charset in a META tag
     CHARSET_RE = re.compile("((^|;)\s*charset=)([^;]*)", re.M)
@@ -206,27 +256,18 @@ class HTMLTreeBuilder(TreeBuilder):
             # This is an interesting meta tag.
             match = self.CHARSET_RE.search(content)
             if match:
-                if (self.soup.declared_html_encoding is not None or
-                    self.soup.original_encoding == self.soup.from_encoding):
-                    # An HTML encoding was sniffed while converting
-                    # the document to Unicode, or an HTML encoding was
-                    # sniffed during a previous pass through the
-                    # document, or an encoding was specified
-                    # explicitly and it worked. Rewrite the meta tag.
-                    def rewrite(match):
-                        return match.group(1) + "%SOUP-ENCODING%"
-                    tag['content'] = self.CHARSET_RE.sub(rewrite, content)
-                    return True
-                else:
-                    # This is our first pass through the document.
-                    # Go through it again with the encoding information.
-                    new_charset = match.group(3)
-                    if (new_charset is not None
-                        and new_charset != self.soup.original_encoding):
-                        self.soup.declared_html_encoding = new_charset
-                        self.soup._feed(self.soup.declared_html_encoding)
-                        raise StopParsing
-                    pass
+                if self.soup.declared_html_encoding is None:
+                    # This tag wasn't spotted when the document was
+                    # converted to Unicode, probably because it's too
+                    # far into the document. If the encoding it
+                    # declares makes a difference, the soup will start
+                    # parsing the document over.
+                    self.soup._declared_encoding_found(match.group(3))
+                # Rewrite the meta tag.
+                def rewrite(match):
+                    return match.group(1) + "%SOUP-ENCODING%"
+                tag['content'] = self.CHARSET_RE.sub(rewrite, content)
+                return True
         return False
 
 
@@ -9,19 +9,21 @@ from bs4.builder import (
     HTMLTreeBuilder,
     )
 import html5lib
-from html5lib.constants import DataLossWarning
+from html5lib.constants import DataLossWarning, namespaces
 import warnings
 from bs4.element import (
     Comment,
     Doctype,
     NavigableString,
     Tag,
+    intern_name,
     )
 
 class HTML5TreeBuilder(HTMLTreeBuilder):
     """Use html5lib to build a tree."""
 
     features = ['html5lib', PERMISSIVE, HTML_5, HTML]
+    builds_own_tree = True
 
     def prepare_markup(self, markup, user_specified_encoding):
         # Store the user-specified encoding for use later on.
@@ -41,6 +43,11 @@ class HTML5TreeBuilder(HTMLTreeBuilder):
         else:
             doc.original_encoding = parser.tokenizer.stream.charEncoding[0]
 
+        # The html5lib parser is full of reference cycles. Make sure
+        # the tree isn't reachable from them, so it doesn't have to
+        # wait for the garbage collector along with the parser.
+        self.underlying_builder.__dict__.clear()
+
     def create_treebuilder(self, namespaceHTMLElements):
         self.underlying_builder = TreeBuilderForHtml5lib(
             self.soup, namespaceHTMLElements)
@@ -51,6 +58,9 @@ class HTML5TreeBuilder(HTMLTreeBuilder):
         return u'<html><head></head><body>%s</body></html>' % fragment
 
 
+# Tags are put into the tree with Tag._insert() rather than insert():
+# nothing needs to know the tree has changed until it's finished, and
+# BeautifulSoup._feed() notes the change once, at the end.
 class TreeBuilderForHtml5lib(html5lib.treebuilders._base.TreeBuilder):
 
     def __init__(self, soup, namespaceHTMLElements):
@@ -86,7 +96,7 @@ class TreeBuilderForHtml5lib(html5lib.treebuilders._base.TreeBuilder):
         return Element(self.soup, self.soup, None)
 
     def appendChild(self, node):
-        self.soup.insert(len(self.soup.contents), node.element)
+        self.soup._insert(len(self.soup.contents), node.element)
 
     def testSerializer(self, element):
         return testSerializer(element)
@@ -145,9 +155,9 @@ class Element(html5lib.treebuilders._base.Node):
             oldElement.parent = None
             oldElement.extract()
 
-            self.element.insert(len(self.element.contents), newStr)
+            self.element._insert(len(self.element.contents), newStr)
         else:
-            self.element.insert(len(self.element.contents), node.element)
+            self.element._insert(len(self.element.contents), node.element)
             node.parent = self
 
     def getAttributes(self):
@@ -155,16 +165,17 @@ class Element(html5lib.treebuilders._base.Node):
 
     def setAttributes(self, attributes):
         if attributes is not None and attributes != {}:
+            builder = self.soup.builder
             for name, value in list(attributes.items()):
-                self.element[name] =  value
+                self.element[intern_name(name)] = value
             # The attributes may contain variables that need substitution.
             # Call set_up_substitutions manually.
             # The Tag constructor calls this method automatically,
             # but html5lib creates a Tag object before setting up
             # the attributes.
-            self.element.contains_substitutions = (
-                self.soup.builder.set_up_substitutions(
-                    self.element))
+            if builder.tag_info(self.element.name).might_substitute:
+                self.element.contains_substitutions = (
+                    builder.set_up_substitutions(self.element))
     attributes = property(getAttributes, setAttributes)
 
     def insertText(self, data, insertBefore=None):
@@ -185,9 +196,9 @@ class Element(html5lib.treebuilders._base.Node):
             oldNode.parent = None
             oldNode.extract()
 
-            self.element.insert(index-1, newStr)
+            self.element._insert(index-1, newStr)
         else:
-            self.element.insert(index, node.element)
+            self.element._insert(index, node.element)
             node.parent = self
 
     def removeChild(self, node):
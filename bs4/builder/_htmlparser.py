@@ -11,6 +11,7 @@ from bs4.element import (
     Declaration,
     Doctype,
     ProcessingInstruction,
+    intern_name,
     )
 from bs4.dammit import EntitySubstitution, UnicodeDammit
 
@@ -27,6 +28,7 @@ class HTMLParserTreeBuilder(HTMLParser, HTMLTreeBuilder):
 
     is_xml = False
     features = [HTML, STRICT, HTMLPARSER]
+    hands_over_attrs = True
 
     def prepare_markup(self, markup, user_specified_encoding=None,
                        document_declared_encoding=None):
@@ -46,7 +48,8 @@ class HTMLParserTreeBuilder(HTMLParser, HTMLTreeBuilder):
         super(HTMLParserTreeBuilder, self).feed(markup)
 
     def handle_starttag(self, name, attrs):
-        self.soup.handle_starttag(name, dict(attrs))
+        self.soup.handle_starttag(
+            name, dict((intern_name(key), value) for key, value in attrs))
 
     def handle_endtag(self, name):
         self.soup.handle_endtag(name)
@@ -55,7 +58,11 @@ class HTMLParserTreeBuilder(HTMLParser, HTMLTreeBuilder):
         self.soup.handle_data(data)
 
     def handle_charref(self, name):
-        self.handle_data(unichr(int(name)))
+        if name.startswith('x') or name.startswith('X'):
+            real_name = int(name.lstrip('xX'), 16)
+        else:
+            real_name = int(name)
+        self.handle_data(unichr(real_name))
 
     def handle_entityref(self, name):
         character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
@@ -58,16 +58,70 @@ class LXMLTreeBuilderForXML(TreeBuilder):
                 dammit.declared_html_encoding)
 
     def feed(self, markup):
+        self._set_up_filter(self.soup)
         self.parser.feed(markup)
         self.parser.close()
 
     def close(self):
         pass
 
+    # While parse_only is in effect, a tag that doesn't match any of
+    # the SoupStrainers is left out, and so is everything around it
+    # that isn't inside a tag that does match. Such a tag's contents
+    # still have to be looked at, since they may include tags that
+    # match. lxml calls the target for every event regardless, so the
+    # most we can do is make the calls for left-out events as cheap as
+    # possible: check that nothing matching is open, check the tag
+    # against the strainers, and return without building anything.
+
+    # Whether parse_only is in effect; (if the strainers only look at
+    # tag names, and they're all plain strings) the set of names they
+    # match; and whether strings outside the kept tags can be dropped
+    # here, because none of the strainers looks for strings.
+    _filter = False
+    _filter_names = None
+    _filter_strings = False
+
+    def _set_up_filter(self, soup):
+        self._filter = bool(soup.parse_only)
+        self._filter_names = None
+        self._filter_strings = self._filter and not soup._text_strainers
+        if not self._filter:
+            return
+        names = set()
+        for strainer in soup._tag_strainers:
+            if strainer.attrs:
+                return
+            strainer_names = strainer.name
+            if isinstance(strainer_names, basestring):
+                strainer_names = [strainer_names]
+            if not (isinstance(strainer_names, (list, tuple, set, frozenset))
+                    and all(isinstance(name, basestring)
+                            for name in strainer_names)):
+                return
+            names.update(strainer_names)
+        self._filter_names = frozenset(names)
+
     def start(self, name, attrs):
+        if self._filter and len(self.soup.tagStack) <= 1:
+            names = self._filter_names
+            if names is not None:
+                keep = name in names
+            else:
+                keep = self.soup._keeps_tag(name, attrs)
+            if not keep:
+                if not self._filter_strings:
+                    # The left-out tag still ends any string before it.
+                    self.soup.endData()
+                return
         self.soup.handle_starttag(name, attrs)
 
     def end(self, name):
+        if self._filter and len(self.soup.tagStack) <= 1:
+            # This is the end of a tag that was left out.
+            if not self._filter_strings:
+                self.soup.endData()
+            return
         self.soup.endData()
         completed_tag = self.soup.tagStack[-1]
         self.soup.handle_endtag(name)
@@ -76,6 +130,8 @@ class LXMLTreeBuilderForXML(TreeBuilder):
         pass
 
     def data(self, content):
+        if self._filter_strings and len(self.soup.tagStack) <= 1:
+            return
         self.soup.handle_data(content)
 
     def doctype(self, name, pubid, system):
@@ -85,6 +141,8 @@ class LXMLTreeBuilderForXML(TreeBuilder):
 
     def comment(self, content):
         "Handle comments as Comment objects."
+        if self._filter_strings and len(self.soup.tagStack) <= 1:
+            return
         self.soup.endData()
         self.soup.handle_data(content)
         self.soup.endData(Comment)
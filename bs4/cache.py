@@ -0,0 +1,251 @@
+"""Skip parsing documents that have been parsed before.
+
+Pass a ParseCache to the BeautifulSoup constructor and it will look for
+the document in the cache before parsing it. The cache is keyed on a
+hash of the markup and of everything else that affects the parse: the
+tree builder, parse_only, and from_encoding. Parsed documents are
+stored in the binary format from bs4.binary, so every cache hit gives
+you a brand new tree that you can modify without affecting anyone
+else.
+
+    cache = ParseCache(MemoryStorage(max_size=100 * 1024 * 1024))
+    soup = BeautifulSoup(markup, parse_cache=cache)
+
+Where the documents are kept is up to the storage object.
+MemoryStorage keeps them in memory and DiskStorage keeps them in a
+directory; both throw out the least recently used documents once they
+hold more than a certain number of bytes. Any object with get(key) and
+set(key, data) methods will work.
+"""
+
+__all__ = [
+    'DiskStorage',
+    'MemoryStorage',
+    'ParseCache',
+    ]
+
+from collections import OrderedDict
+import hashlib
+import os
+import tempfile
+
+from bs4 import binary
+from bs4.element import SoupStrainer
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+class MemoryStorage(object):
+    """Keep cached documents in memory."""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param max_size: Once the cached documents take up more than
+            this many bytes, the least recently used ones are thrown
+            out.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        data = self.entries.pop(key, None)
+        if data is not None:
+            # Move it to the end, where the most recently used
+            # documents are.
+            self.entries[key] = data
+        return data
+
+    def set(self, key, data):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        if len(data) > self.max_size:
+            return
+        self.entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_size:
+            key, old = self.entries.popitem(last=False)
+            self.size -= len(old)
+
+
+class DiskStorage(object):
+    """Keep cached documents in a directory, one file per document.
+
+    A file's modification time is updated whenever it's read, so that
+    the least recently used files can be found and deleted.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param directory: Where to keep the files. It's created if
+            necessary.
+        :param max_size: Once the files take up more than this many
+            bytes, the least recently used ones are deleted.
+        """
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.size = sum(os.path.getsize(path) for path in self._paths())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _paths(self):
+        return [self._path(name) for name in os.listdir(self.directory)
+                if not name.startswith('.')]
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        return data
+
+    def set(self, key, data):
+        if len(data) > self.max_size:
+            return
+        path = self._path(key)
+        if os.path.exists(path):
+            self.size -= os.path.getsize(path)
+        # Write to a temporary file and then move it into place, so that
+        # nobody ever reads half a document.
+        handle, temp_path = tempfile.mkstemp(prefix='.', dir=self.directory)
+        try:
+            os.write(handle, data)
+        finally:
+            os.close(handle)
+        os.rename(temp_path, path)
+        self.size += len(data)
+        if self.size > self.max_size:
+            self._evict()
+
+    def _evict(self):
+        paths = []
+        self.size = 0
+        for path in self._paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            paths.append((stat.st_mtime, stat.st_size, path))
+            self.size += stat.st_size
+        paths.sort()
+        for mtime, size, path in paths:
+            if self.size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+
+def _describe(value):
+    """Describe part of a SoupStrainer in a way that can be hashed.
+
+    :return: A string, or None if the value is something (like a
+        function) whose behavior can't be described.
+    """
+    if value is None or isinstance(value, (bool, int, long, float)):
+        return repr(value)
+    if isinstance(value, basestring):
+        return repr(value)
+    if hasattr(value, 'pattern') and hasattr(value, 'flags'):
+        # It's a regular expression.
+        return "re(%r, %d)" % (value.pattern, value.flags)
+    if isinstance(value, dict):
+        items = sorted(value.items())
+        value = [item for pair in items for item in pair]
+        prefix = "dict"
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        prefix = "list"
+    else:
+        return None
+    parts = []
+    for item in value:
+        part = _describe(item)
+        if part is None:
+            return None
+        parts.append(part)
+    return "%s(%s)" % (prefix, ", ".join(parts))
+
+
+class ParseCache(object):
+    """A cache of parsed documents, keyed on a hash of the markup and
+    the parser settings.
+
+    :ivar hits: The number of documents found in the cache.
+    :ivar misses: The number of documents that had to be parsed.
+    """
+
+    def __init__(self, storage=None):
+        """
+        :param storage: Where to keep the documents. Defaults to a
+            MemoryStorage of the default size.
+        """
+        if storage is None:
+            storage = MemoryStorage()
+        self.storage = storage
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, markup, builder, parse_only=None, from_encoding=None):
+        """Calculate the cache key for a document.
+
+        :return: A string, or None if the document can't be cached
+            because parse_only contains something like a function.
+        """
+        if parse_only is None:
+            strainer = "None"
+        else:
+            if isinstance(parse_only, SoupStrainer):
+                strainer = _describe(
+                    [parse_only.name, parse_only.attrs, parse_only.text])
+            else:
+                strainer = _describe(
+                    [[each.name, each.attrs, each.text]
+                     for each in parse_only])
+            if strainer is None:
+                return None
+        if isinstance(markup, unicode):
+            markup = b'u' + markup.encode("utf-8")
+        else:
+            markup = b'b' + markup
+        builder_class = builder.__class__
+        settings = "%s.%s\0%s\0%r" % (
+            builder_class.__module__, builder_class.__name__, strainer,
+            from_encoding)
+        digest = hashlib.sha1(settings.encode("utf-8"))
+        digest.update(b'\0')
+        digest.update(markup)
+        return digest.hexdigest()
+
+    def load(self, key, soup):
+        """Load a cached document into a BeautifulSoup object.
+
+        :return: True if the document was in the cache, False if it
+            needs to be parsed.
+        """
+        data = self.storage.get(key)
+        if data is not None:
+            try:
+                binary.loads(data, soup.__class__, soup)
+            except ValueError:
+                # A damaged or out-of-date cache entry.
+                data = None
+        if data is None:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def store(self, key, soup):
+        """Put a freshly parsed document in the cache."""
+        self.storage.set(key, soup.dumps())
@@ -0,0 +1,597 @@
+"""Frozen documents stored as columns of numbers.
+
+A ColumnarSoup holds a parsed document without one Python object per
+element. Each element is a position in a set of parallel arrays, in
+document order:
+
+  kinds               The kind of element (see bs4.binary) and its flags.
+  names               The string number of a tag's name.
+  parents             The number of the element's parent.
+  first_children      The number of a tag's first child.
+  next_siblings       The number of the element's next sibling.
+  text_offsets        Where the element's text starts in one UTF-8
+                      buffer that holds all the strings in the document,
+                      end to end. There's one more offset than there are
+                      elements, so the text beneath any element is a
+                      single slice of the buffer.
+  attribute_offsets   Where the element's attributes start in the
+                      attribute_keys and attribute_values arrays, which
+                      hold string numbers. Again there's one extra
+                      offset at the end.
+
+Tag names, attribute names and attribute values are stored once each
+in a single table of strings.
+
+When a ColumnarSoup parses a document itself, the tree builder's
+events are written straight into the arrays. No Tag or NavigableString
+objects are made while parsing: a string is a stretch of the text
+buffer until someone asks for it.
+
+Everything that reads the tree works as usual. find_all(), get_text()
+and the links between elements work directly on the arrays. Tag and
+NavigableString objects are created for the elements you actually
+touch, and only live as long as you hold on to them. The tree can't be
+modified; clone() turns any part of it back into ordinary objects.
+"""
+
+__all__ = ['ColumnarSoup']
+
+from array import array
+import sys
+import weakref
+
+from bs4 import BeautifulSoup, binary
+from bs4.binary import KIND_MASK, NONE, TAG
+from bs4.element import (
+    NavigableString,
+    Tag,
+    _link_in_document_order,
+    _set_up_document,
+    _set_up_tag,
+    )
+from bs4.mapped import _ReadOnlyElement, _ReadOnlyTag
+
+# The arrays that make up a ColumnarSoup, apart from the text buffer
+# and the table of strings.
+_COLUMNS = ('_kinds', '_names', '_parents', '_first_children',
+            '_next_siblings', '_text_offsets', '_attribute_offsets',
+            '_attribute_keys', '_attribute_values')
+
+# The characters BeautifulSoup.STRIP_ASCII_SPACES removes.
+_ASCII_SPACES = u'\t\n\x0c\r '
+
+
+def _column(typecode='I'):
+    return array(typecode)
+
+
+class ColumnarElement(_ReadOnlyElement):
+    """An element of a ColumnarSoup, which is just its number in the
+    document's arrays."""
+
+
+class ColumnarTag(ColumnarElement, _ReadOnlyTag):
+    """A Tag whose name, attributes, contents and links are all read out
+    of a ColumnarSoup's arrays.
+
+    The contents aren't kept, so holding on to a tag doesn't keep
+    objects for everything beneath it alive.
+    """
+
+    _loaded_attrs = None
+
+    @property
+    def name(self):
+        document = self._document
+        return document._strings[document._names[self._number]]
+
+    @property
+    def _attrs(self):
+        if self._loaded_attrs is None:
+            self._loaded_attrs = self._document._attributes(self._number)
+        return self._loaded_attrs
+
+    @property
+    def _contents(self):
+        document = self._document
+        next_siblings = document._next_siblings
+        contents = []
+        number = document._first_children[self._number]
+        while number != NONE:
+            contents.append(document._element(number))
+            number = next_siblings[number]
+        return contents
+
+    def get_text(self, separator=u"", strip=False):
+        """
+        Get all child strings, concatenated using the given separator
+        """
+        if not separator and not strip:
+            # All the text is in one piece already.
+            document = self._document
+            return document._text_between(
+                self._number, document._end(self._number))
+        return super(ColumnarTag, self).get_text(separator, strip)
+    getText = get_text
+
+    text = property(get_text)
+
+    def _decode_contents(self, indent_level, eventual_encoding,
+                         substitute_html_entities, cache):
+        # Building ordinary objects for the contents all at once, and
+        # throwing them away afterwards, is much faster than finding
+        # each element through the arrays.
+        return self.clone()._decode_contents(
+            indent_level, eventual_encoding, substitute_html_entities,
+            False)
+
+    def clone(self):
+        """Copy this part of the document into ordinary Tag and
+        NavigableString objects, which can be modified."""
+        return self._document._materialize(self._number)
+
+
+def _columnar_string_class(cls):
+    return type('Columnar' + cls.__name__, (ColumnarElement, cls), {})
+
+COLUMNAR_STRING_CLASSES = [_columnar_string_class(cls)
+                           for cls in binary.STRING_CLASSES]
+
+
+class _ColumnarParser(BeautifulSoup):
+    """Writes a tree builder's events straight into the arrays of a
+    ColumnarSoup, without making a Tag or NavigableString for anything.
+
+    The builder drives this object just as it would an ordinary
+    BeautifulSoup object, so parse_only, parsing again after a late
+    <meta> charset, and parse statistics all work as usual. The tag
+    stack holds element numbers instead of Tags.
+    """
+
+    def reset(self):
+        self.builder.reset()
+        for name in _COLUMNS:
+            setattr(self, name, _column())
+        self._kinds = _column('H')
+        self._string_table = binary.StringTable()
+        self._strings = self._string_table.strings
+        self._text_pieces = []
+        self._text_size = 0
+        # The last child added to each element so far.
+        self._last_children = []
+        # How many of the open tags keep their whitespace.
+        self._preserving = 0
+        self.currentData = []
+        self.tagStack = []
+
+        flags = TAG | binary.HIDDEN
+        if self.builder.tag_info(self.ROOT_TAG_NAME).can_be_empty_element:
+            flags |= binary.CAN_BE_EMPTY_ELEMENT
+        self.tagStack.append(
+            self._add(flags, self._string_table.intern(self.ROOT_TAG_NAME)))
+
+    def _add(self, flags, name):
+        """Add an element as the last child of the current tag."""
+        number = len(self._kinds)
+        if self.tagStack:
+            parent = self.tagStack[-1]
+        else:
+            parent = NONE
+        self._parents.append(parent)
+        self._first_children.append(NONE)
+        self._next_siblings.append(NONE)
+        last_children = self._last_children
+        last_children.append(NONE)
+        if parent != NONE:
+            previous = last_children[parent]
+            if previous == NONE:
+                self._first_children[parent] = number
+            else:
+                self._next_siblings[previous] = number
+            last_children[parent] = number
+        self._text_offsets.append(self._text_size)
+        self._attribute_offsets.append(len(self._attribute_keys))
+        self._kinds.append(flags)
+        self._names.append(name)
+        return number
+
+    def _add_string(self, kind, data):
+        self._add(kind, NONE)
+        data = data.encode("utf-8")
+        self._text_pieces.append(data)
+        self._text_size += len(data)
+
+    def _feed(self):
+        self.builder.reset()
+        self.builder.feed(self.markup)
+        self.endData()
+        while len(self.tagStack) > 1:
+            self.popTag()
+
+    def handle_starttag(self, name, attrs):
+        self.endData()
+        if (self.parse_only and len(self.tagStack) <= 1
+            and not self._keeps_tag(name, attrs)):
+            return None
+
+        info = self.builder.tag_info(name)
+        flags = TAG
+        if info.can_be_empty_element:
+            flags |= binary.CAN_BE_EMPTY_ELEMENT
+        if info.might_substitute:
+            # The builder may want to rewrite this tag, so give it a
+            # real one to look at.
+            tag = Tag(self, self.builder, name, attrs)
+            if tag.contains_substitutions:
+                flags |= binary.CONTAINS_SUBSTITUTIONS
+            attrs = tag._attrs
+        elif attrs:
+            if hasattr(attrs, 'items'):
+                attrs = attrs.items()
+            attrs = dict(attrs)
+        intern = self._string_table.intern
+        number = self._add(flags, intern(name))
+        if attrs:
+            for key, value in attrs.items():
+                self._attribute_keys.append(intern(key))
+                self._attribute_values.append(intern(value))
+        self.tagStack.append(number)
+        if info.preserve_whitespace:
+            self._preserving += 1
+        return number
+
+    def popTag(self):
+        number = self.tagStack.pop()
+        if self._preserving:
+            name = self._strings[self._names[number]]
+            if self.builder.tag_info(name).preserve_whitespace:
+                self._preserving -= 1
+        return number
+
+    def _popToTag(self, name, inclusivePop=True):
+        if name == self.ROOT_TAG_NAME:
+            return
+        stack = self.tagStack
+        names = self._names
+        strings = self._strings
+        numPops = 0
+        for i in range(len(stack) - 1, 0, -1):
+            if name == strings[names[stack[i]]]:
+                numPops = len(stack) - i
+                break
+        if not inclusivePop:
+            numPops = numPops - 1
+        for i in range(0, numPops):
+            self.popTag()
+
+    def endData(self, containerClass=NavigableString):
+        if self.currentData:
+            currentData = u''.join(self.currentData)
+            self.currentData = []
+            # Only strip() the string rather than translate() it, and
+            # count the open tags that keep their whitespace instead of
+            # looking through the whole stack.
+            if not self._preserving and not currentData.strip(_ASCII_SPACES):
+                if '\n' in currentData:
+                    currentData = '\n'
+                else:
+                    currentData = ' '
+            if (self.parse_only and len(self.tagStack) <= 1
+                and not self._keeps_string(currentData)):
+                return
+            kind = binary.STRING_KINDS.get(containerClass)
+            if kind is None:
+                kind = binary._string_kind(containerClass(currentData))
+            self._add_string(kind, currentData)
+            if self.parse_stats is not None:
+                # The string doesn't go through object_was_parsed(),
+                # where it would otherwise be counted.
+                self.parse_stats.counts['strings'] += 1
+
+    def object_was_parsed(self, o):
+        self._add_string(binary._string_kind(o), o)
+
+
+class ColumnarSoup(ColumnarTag, BeautifulSoup):
+    """A read-only BeautifulSoup object that keeps its document in
+    arrays instead of objects."""
+
+    def __init__(self, markup="", features=None, builder=None, **kwargs):
+        """Parse a document and freeze it.
+
+        The arguments are the same as for BeautifulSoup. The tree
+        builder's events go straight into the arrays, unless the
+        builder puts the tree together itself (as html5lib does) or
+        there's a parse_cache. Then the document is parsed into
+        ordinary objects, which are stored in arrays and then
+        destroyed. To freeze a document you've already parsed, use
+        ColumnarSoup.from_soup().
+        """
+        if builder is None:
+            builder = self._find_builder(features)
+        if builder.builds_own_tree or kwargs.get('parse_cache') is not None:
+            soup = BeautifulSoup(markup, builder=builder, **kwargs)
+            self._set_up(soup)
+            self.parse_stats = soup.parse_stats
+            soup.close()
+            return
+
+        # A frozen document has no use for these.
+        kwargs.pop('index_strings', None)
+        kwargs.pop('weak_links', None)
+        parser = _ColumnarParser(markup, builder=builder, **kwargs)
+        for name in _COLUMNS:
+            setattr(self, name, getattr(parser, name))
+        self._text_offsets.append(parser._text_size)
+        self._attribute_offsets.append(len(self._attribute_keys))
+        self._text = b''.join(parser._text_pieces)
+        self._strings = parser._strings
+        self._finish_set_up(parser)
+        self.parse_stats = parser.parse_stats
+
+    @classmethod
+    def from_soup(cls, soup):
+        """Store a copy of a BeautifulSoup object in arrays. The
+        original isn't changed."""
+        columnar = cls.__new__(cls)
+        columnar._set_up(soup)
+        return columnar
+
+    def _set_up(self, soup):
+        table = binary.StringTable()
+        intern = table.intern
+        kinds = _column('H')
+        names = _column()
+        parents = _column()
+        first_children = _column()
+        next_siblings = _column()
+        text_offsets = _column()
+        attribute_offsets = _column()
+        attribute_keys = _column()
+        attribute_values = _column()
+        text = []
+        text_size = 0
+        # The last child added to each element so far.
+        last_children = []
+
+        # Walk the tree in document order without recursing.
+        stack = [(soup, NONE)]
+        while stack:
+            element, parent = stack.pop()
+            number = len(kinds)
+            parents.append(parent)
+            first_children.append(NONE)
+            next_siblings.append(NONE)
+            last_children.append(NONE)
+            if parent != NONE:
+                previous = last_children[parent]
+                if previous == NONE:
+                    first_children[parent] = number
+                else:
+                    next_siblings[previous] = number
+                last_children[parent] = number
+            text_offsets.append(text_size)
+            attribute_offsets.append(len(attribute_keys))
+            if isinstance(element, Tag):
+                flags = TAG
+                if element.can_be_empty_element:
+                    flags |= binary.CAN_BE_EMPTY_ELEMENT
+                if element.contains_substitutions:
+                    flags |= binary.CONTAINS_SUBSTITUTIONS
+                if element.hidden:
+                    flags |= binary.HIDDEN
+                kinds.append(flags)
+                names.append(intern(element.name))
+                for key, value in element._attrs.items():
+                    attribute_keys.append(intern(key))
+                    attribute_values.append(intern(value))
+                for child in reversed(element._contents):
+                    stack.append((child, number))
+            else:
+                kinds.append(binary._string_kind(element))
+                names.append(NONE)
+                data = element.encode("utf-8")
+                text.append(data)
+                text_size += len(data)
+        text_offsets.append(text_size)
+        attribute_offsets.append(len(attribute_keys))
+
+        self._kinds = kinds
+        self._names = names
+        self._parents = parents
+        self._first_children = first_children
+        self._next_siblings = next_siblings
+        self._text_offsets = text_offsets
+        self._attribute_offsets = attribute_offsets
+        self._attribute_keys = attribute_keys
+        self._attribute_values = attribute_values
+        self._text = b''.join(text)
+        self._strings = table.strings
+        self._finish_set_up(soup)
+
+    def _finish_set_up(self, soup):
+        """Set up everything but the arrays, once they're in place.
+
+        :param soup: The BeautifulSoup object the document came from.
+        """
+        # The string numbers of every distinct tag name.
+        self._tag_names = frozenset(number for number in self._names
+                                    if number != NONE)
+        self._element_count = len(self._kinds)
+
+        # Objects for the elements someone is using right now.
+        self._elements = weakref.WeakValueDictionary()
+        self._document = self
+        self._number = 0
+
+        self.builder = None
+        self.is_xml = soup.is_xml
+        self.parse_only = None
+        self.markup = None
+        self.original_encoding = soup.original_encoding
+        self.declared_html_encoding = soup.declared_html_encoding
+
+    def __sizeof__(self):
+        """The memory used by the document: its arrays and strings,
+        but not any element objects that happen to be in use."""
+        size = super(ColumnarSoup, self).__sizeof__()
+        for name in _COLUMNS + ('_text', '_strings'):
+            size += sys.getsizeof(getattr(self, name))
+        for string in self._strings:
+            size += sys.getsizeof(string)
+        return size
+
+    def clone(self):
+        """Turn the whole document into an ordinary BeautifulSoup
+        object."""
+        soup = self._materialize(0, BeautifulSoup)
+        _set_up_document(
+            soup, self.is_xml, None, self.original_encoding,
+            self.declared_html_encoding)
+        return soup
+
+    def close(self):
+        """Let go of the arrays. Nothing can be read from the document
+        afterwards."""
+        for name in _COLUMNS:
+            setattr(self, name, _column())
+        self._text = b''
+        self._strings = []
+        self._tag_names = frozenset()
+        self._element_count = 0
+        self._elements.clear()
+
+    def element(self, number):
+        """The Tag or NavigableString for an element number, such as one
+        returned by a bs4.query.Query. The document itself is element
+        0."""
+        if not 0 <= number < self._element_count:
+            raise IndexError("No such element: %s" % number)
+        return self._element(int(number))
+
+    def _end(self, number):
+        """The number of the first element after an element's
+        subtree."""
+        parents = self._parents
+        next_siblings = self._next_siblings
+        while number != NONE:
+            sibling = next_siblings[number]
+            if sibling != NONE:
+                return sibling
+            number = parents[number]
+        return self._element_count
+
+    # The accessors _ReadOnlyElement and _ReadOnlyTag use, apart from
+    # _end().
+
+    def _flags(self, number):
+        return self._kinds[number]
+
+    def _parent_number(self, number):
+        return self._parents[number]
+
+    def _next_sibling_number(self, number):
+        return self._next_siblings[number]
+
+    def _texts(self, start, end):
+        kinds = self._kinds
+        for number in range(start, end):
+            if kinds[number] & KIND_MASK != TAG:
+                yield number, self._text_between(number, number + 1)
+
+    def _matching_tags(self, strainer, start, end):
+        """A search for a tag name compares numbers: each distinct tag
+        name in the document is checked against the strainer's name
+        once, not once per tag."""
+        names = self._names
+        strings = self._strings
+        matching = self._matching_names(strainer)
+        for number in range(start, end):
+            if names[number] not in matching:
+                continue
+            if strainer.attrs and not strainer.search_tag(
+                strings[names[number]], self._attributes(number)):
+                continue
+            yield number
+
+    def _text_between(self, start, end):
+        """All the text in the strings numbered from start up to (but
+        not including) end."""
+        offsets = self._text_offsets
+        return self._text[offsets[start]:offsets[end]].decode("utf-8")
+
+    def _attributes(self, number):
+        offsets = self._attribute_offsets
+        strings = self._strings
+        values = self._attribute_values
+        attrs = {}
+        for i in range(offsets[number], offsets[number + 1]):
+            value = values[i]
+            if value == NONE:
+                attrs[strings[self._attribute_keys[i]]] = None
+            else:
+                attrs[strings[self._attribute_keys[i]]] = strings[value]
+        return attrs
+
+    def _matching_names(self, strainer):
+        """The string numbers of the tag names that a SoupStrainer's
+        name matches."""
+        strings = self._strings
+        if not strainer.name:
+            return self._tag_names
+        return frozenset(number for number in self._tag_names
+                         if strainer._matches(strings[number], strainer.name))
+
+    def _element(self, number):
+        """Find or create the object for an element."""
+        if number == NONE:
+            return None
+        if number == 0:
+            return self
+        element = self._elements.get(number)
+        if element is None:
+            kind = self._kinds[number] & KIND_MASK
+            if kind == TAG:
+                element = ColumnarTag.__new__(ColumnarTag)
+            else:
+                cls = COLUMNAR_STRING_CLASSES[kind - 1]
+                element = cls.__new__(
+                    cls, self._text_between(number, number + 1))
+            element._document = self
+            element._number = number
+            self._elements[number] = element
+        return element
+
+    def _materialize(self, number, root_class=Tag):
+        """Build ordinary objects for an element and everything beneath
+        it, and return the object for the element."""
+        kinds = self._kinds
+        strings = self._strings
+        nodes = {}
+
+        def elements_in_order():
+            for current in range(number, self._end(number)):
+                flags = kinds[current]
+                kind = flags & KIND_MASK
+                parent = nodes.get(self._parents[current])
+                if kind == TAG:
+                    if parent is None:
+                        cls = root_class
+                    else:
+                        cls = Tag
+                    attrs = None
+                    if (self._attribute_offsets[current]
+                        != self._attribute_offsets[current + 1]):
+                        attrs = self._attributes(current)
+                    node = _set_up_tag(
+                        Tag.__new__(cls), self.__class__,
+                        strings[self._names[current]], attrs,
+                        bool(flags & binary.HIDDEN),
+                        bool(flags & binary.CAN_BE_EMPTY_ELEMENT),
+                        bool(flags & binary.CONTAINS_SUBSTITUTIONS))
+                    nodes[current] = node
+                else:
+                    node = binary.STRING_CLASSES[kind - 1](
+                        self._text_between(current, current + 1))
+                yield node, parent
+        return _link_in_document_order(elements_in_order())
@@ -164,6 +164,18 @@ class UnicodeDammit:
         "iso-8859-2",
         ]
 
+    XML_ENCODING_RE = re.compile(
+        '^<\?.*encoding=[\'"](.*?)[\'"].*\?>'.encode())
+    # Matches both <meta charset="..."> and
+    # <meta http-equiv="Content-Type" content="...; charset=...">.
+    # The whole document is searched, not just the start of it as a
+    # browser would: a regular expression is much cheaper than parsing
+    # the document a second time, and with parse_only the tree builder
+    # may never get to see the <meta> tag at all. The tree builder
+    # still catches a declaration this misses.
+    META_CHARSET_RE = re.compile(
+        '<\s*meta[^>]+charset\s*=\s*["\']?([^>"\';\s]+)'.encode(), re.I)
+
     def __init__(self, markup, override_encodings=[],
                  smart_quotes_to=None, isHTML=False):
         self.declared_html_encoding = None
@@ -315,12 +327,9 @@ class UnicodeDammit:
                 pass
         except:
             xml_encoding_match = None
-        xml_encoding_re = '^<\?.*encoding=[\'"](.*?)[\'"].*\?>'.encode()
-        xml_encoding_match = re.compile(xml_encoding_re).match(xml_data)
+        xml_encoding_match = self.XML_ENCODING_RE.match(xml_data)
         if not xml_encoding_match and isHTML:
-            meta_re = '<\s*meta[^>]+charset=([^>]*?)[;\'">]'.encode()
-            regexp = re.compile(meta_re, re.I)
-            xml_encoding_match = regexp.search(xml_data)
+            xml_encoding_match = self.META_CHARSET_RE.search(xml_data)
         if xml_encoding_match is not None:
             xml_encoding = xml_encoding_match.groups()[0].decode(
                 'ascii').lower()
@@ -1,11 +1,39 @@
+import bisect
 import collections
 import re
 import sys
+import weakref
 from bs4.dammit import EntitySubstitution
 
 DEFAULT_OUTPUT_ENCODING = "utf-8"
 PY3K = (sys.version_info[0] > 2)
 
+# Shared by every Tag that has no attributes or no contents. See Tag.
+_NO_ATTRS = {}
+_NO_CONTENTS = ()
+
+# Tag names and attribute names come from a small vocabulary, so rather
+# than give every Tag its own copy, all Tags share one copy of each
+# name. Documents with huge numbers of distinct names (some XML) stop
+# adding to the table once it's this big.
+# Some builders produce byte strings and some produce Unicode, so
+# there's a separate table for each.
+MAX_INTERNED_NAMES = 10000
+_interned_names = {}
+
+
+def intern_name(name):
+    """Return the shared copy of a tag name or attribute name."""
+    table = _interned_names.get(name.__class__)
+    if table is None:
+        table = _interned_names.setdefault(name.__class__, {})
+    shared = table.get(name)
+    if shared is not None:
+        return shared
+    if len(table) < MAX_INTERNED_NAMES:
+        table[name] = name
+    return name
+
 
 def _match_css_class(str):
     """Build a RE to match the given CSS class."""
@@ -28,6 +56,10 @@ class PageElement(object):
     """Contains the navigational information for some part of the page
     (either a tag or a piece of text)"""
 
+    # True if this element's links up and back along the tree are weak
+    # references. See WeakLinkedElement.
+    _weak_links = False
+
     def setup(self, parent=None, previous_element=None):
         """Sets up the initial relations between this element and
         other elements."""
@@ -72,6 +104,7 @@ class PageElement(object):
         """Destructively rips this element out of the tree."""
         if self.parent:
             del self.parent.contents[self.parent.index(self)]
+            self.parent._tree_modified()
 
         #Find the two elements that would be next to each other if
         #this element (and any children) hadn't been parsed. Connect
@@ -97,17 +130,55 @@ class PageElement(object):
     def _last_recursive_child(self):
         "Finds the last element beneath this object to be parsed."
         last_child = self
-        while hasattr(last_child, 'contents') and last_child.contents:
-            last_child = last_child.contents[-1]
+        while isinstance(last_child, Tag) and last_child._contents:
+            last_child = last_child._contents[-1]
         return last_child
     # BS3: Not part of the API!
     _lastRecursiveChild = _last_recursive_child
 
+    def _tree_modified(self):
+        """Note that this Tag, or the tree beneath it, has changed.
+
+        This bumps the version number of this Tag and all of its
+        parents, so that anything computed from one of those subtrees
+        can tell it's out of date. Every method that modifies the tree
+        calls this.
+        """
+        tag = self
+        while tag is not None:
+            tag._version += 1
+            # The caches are out of date, and they might be all that's
+            # keeping a removed element alive.
+            if tag._first_tag_cache is not None:
+                tag._first_tag_cache = None
+            if tag._output_cache is not None:
+                tag._output_cache = None
+            if tag._string_index is not None:
+                # The tag still wants an index; it'll be rebuilt the
+                # next time it's needed.
+                tag._string_index = _STALE_STRING_INDEX
+            tag = tag.parent
+
     def insert(self, position, new_child):
+        self._insert(position, new_child)
+        self._tree_modified()
+
+    def _insert(self, position, new_child):
+        """Does the work of insert(), without noting that the tree has
+        changed.
+
+        A tree builder that puts a document together this way must
+        call _tree_modified() on the document once it's done, as
+        BeautifulSoup._feed() does.
+        """
         if (isinstance(new_child, basestring)
             and not isinstance(new_child, NavigableString)):
             new_child = NavigableString(new_child)
 
+        if self._weak_links and not new_child._weak_links:
+            # Anything added to a tree with weak links gets weak links.
+            make_links_weak([new_child])
+
         position = min(position, len(self.contents))
         if hasattr(new_child, 'parent') and new_child.parent is not None:
             # We're 'inserting' an element that's already one
@@ -270,6 +341,14 @@ class PageElement(object):
 
         if isinstance(name, SoupStrainer):
             strainer = name
+        elif text:
+            # A text search ignores the name and attributes entirely,
+            # so only the strings need to be looked at.
+            strainer = SoupStrainer(name, attrs, text, **kwargs)
+            match = strainer._string_matcher()
+            if match is not None:
+                return self._find_all_strings(
+                    match, limit, generator, ResultSet(strainer))
         elif text is None and not limit and not attrs and not kwargs:
             # findAll*(True)
             if name is True or name is None:
@@ -298,6 +377,15 @@ class PageElement(object):
                         break
         return results
 
+    def _find_all_strings(self, match, limit, generator, results):
+        "Iterates over a generator looking for strings that match."
+        for i in generator:
+            if isinstance(i, NavigableString) and i and match(i):
+                results.append(i)
+                if limit and len(results) >= limit:
+                    break
+        return results
+
     #These generators can be used to navigate starting from both
     #NavigableStrings and Tags.
     @property
@@ -440,6 +528,45 @@ class Tag(PageElement):
 
     """Represents a found HTML tag with its attributes and contents."""
 
+    # Bumped every time this tag or the tree beneath it changes. See
+    # _tree_modified().
+    _version = 0
+
+    # A StringIndex of the strings beneath this tag, if one has been
+    # built.
+    _string_index = None
+
+    # The first Tag beneath this tag with a given name, as looked up
+    # by __getattr__, and the _version of this tag at the time.
+    _first_tag_cache = None
+    _first_tag_cache_version = None
+
+    # If this is true, decode() remembers what it returned for this tag
+    # and for every tag beneath it, and reuses those strings for as long
+    # as the corresponding subtree is unchanged. This trades memory for
+    # speed when the same tree is output over and over. A change only
+    # counts if it changes the version (see version): renaming a tag or
+    # setting tag[key] does, but modifying tag.attrs or tag.contents
+    # directly doesn't, and the old output would be reused.
+    cache_output = False
+
+    # Output remembered by decode(), keyed by its arguments, and the
+    # _version of this tag at the time.
+    _output_cache = None
+    _output_cache_version = None
+
+    # A Tag with no attributes, or no contents, shares one of these
+    # empty containers instead of allocating its own. The attrs and
+    # contents properties give the Tag a container of its own as soon
+    # as anyone asks for it, since they might modify it; code in this
+    # class that only reads them goes straight to _attrs and _contents.
+    _attrs = _NO_ATTRS
+    _contents = _NO_CONTENTS
+
+    # Only tags that the builder might want to rewrite on output (such
+    # as a META tag with a charset) set this.
+    contains_substitutions = False
+
     def __init__(self, parser, builder, name, attrs=None, parent=None,
                  previous=None):
         "Basic constructor."
@@ -447,23 +574,89 @@ class Tag(PageElement):
         # We don't actually store the parser object: that lets extracted
         # chunks be garbage-collected.
         self.parser_class = parser.__class__
-        self.name = name
-        if attrs is None:
-            attrs = {}
-        else:
-            attrs = dict(attrs)
-        self.attrs = attrs
-        self.contents = []
+        self.name = intern_name(name)
+        if attrs:
+            if builder.hands_over_attrs:
+                self._attrs = attrs
+            else:
+                if hasattr(attrs, 'items'):
+                    attrs = attrs.items()
+                self._attrs = dict(
+                    (intern_name(key), value) for key, value in attrs)
         self.setup(parent, previous)
         self.hidden = False
 
-        # Set up any substitutions, such as the charset in a META tag.
-        self.contains_substitutions = builder.set_up_substitutions(self)
+        info = builder.tag_info(self.name)
+        self.can_be_empty_element = info.can_be_empty_element
 
-        self.can_be_empty_element = builder.can_be_empty_element(name)
+        # Set up any substitutions, such as the charset in a META tag.
+        if info.might_substitute:
+            self.contains_substitutions = builder.set_up_substitutions(self)
 
     parserClass = _alias("parser_class")  # BS3
 
+    @property
+    def name(self):
+        try:
+            return self.__dict__['name']
+        except KeyError:
+            # This tag has been decomposed.
+            raise AttributeError(
+                "'%s' object has no attribute 'name'" % self.__class__)
+
+    @name.setter
+    def name(self, name):
+        renamed = 'name' in self.__dict__
+        self.__dict__['name'] = name
+        if renamed:
+            # The tag's name is part of its output, and of every search
+            # that's been done beneath its parents.
+            self._tree_modified()
+
+    @property
+    def attrs(self):
+        attrs = self._attrs
+        if attrs is _NO_ATTRS:
+            attrs = self._attrs = {}
+        return attrs
+
+    @attrs.setter
+    def attrs(self, attrs):
+        self._attrs = attrs
+
+    @property
+    def contents(self):
+        contents = self._contents
+        if contents is _NO_CONTENTS:
+            if not self.__dict__:
+                # This tag has been decomposed.
+                raise AttributeError(
+                    "'%s' object has no attribute 'contents'"
+                    % self.__class__)
+            contents = self._contents = []
+        return contents
+
+    @contents.setter
+    def contents(self, contents):
+        self._contents = contents
+
+    @property
+    def version(self):
+        """A number that goes up whenever this tag or anything beneath
+        it is modified.
+
+        The version of the BeautifulSoup object covers the whole
+        document. Anything derived from a subtree can be kept along
+        with the subtree's version and reused for as long as the
+        version stays the same.
+
+        Only changes made through methods like insert(), extract(),
+        clear(), tag[key] = value and renaming a tag are counted. If
+        you modify .attrs or .contents directly, the version doesn't
+        change.
+        """
+        return self._version
+
     @property
     def is_empty_element(self):
         """Is this tag an empty-element tag? (aka a self-closing tag)
@@ -479,7 +672,7 @@ class Tag(PageElement):
         If the builder has no designated list of empty-element tags,
         then any tag with no contents is an empty-element tag.
         """
-        return len(self.contents) == 0 and self.can_be_empty_element
+        return len(self._contents) == 0 and self.can_be_empty_element
     isSelfClosing = is_empty_element  # BS3
 
     @property
@@ -492,9 +685,9 @@ class Tag(PageElement):
          return value is the 'string' attribute of the child tag,
          recursively.
         """
-        if len(self.contents) != 1:
+        if len(self._contents) != 1:
             return None
-        child = self.contents[0]
+        child = self._contents[0]
         if isinstance(child, NavigableString):
             return child
         return child.string
@@ -507,48 +700,125 @@ class Tag(PageElement):
     def get_text(self, separator=u"", strip=False):
         """
         Get all child strings, concatenated using the given separator
+
+        If this Tag has a StringIndex (see string_index), the text comes
+        from there. Otherwise it's gathered from the tree every time,
+        and nothing is kept.
         """
+        if self._string_index is None:
+            strings = (string for string in self.recursive_children
+                       if isinstance(string, NavigableString))
+            if not strip and not separator:
+                return u''.join(strings)
+        else:
+            index = self.string_index
+            if not strip and not separator:
+                return index.text
+            strings = index.strings
         if strip:
             return separator.join(string.strip()
-                for string in self.recursive_children
-                if isinstance(string, NavigableString) and string.strip())
-        else:
-            return separator.join(string
-                for string in self.recursive_children
-                if isinstance(string, NavigableString))
+                for string in strings if string.strip())
+        return separator.join(strings)
     getText = get_text
 
     text = property(get_text)
 
     def decompose(self):
-        """Recursively destroys the contents of this tree."""
+        """Recursively destroys the contents of this tree.
+
+        Every element in the tree has all of its links, attributes and
+        contents removed, so nothing in the tree refers to anything
+        else. Each element is freed as soon as nothing outside the
+        tree refers to it, without waiting for the cyclic garbage
+        collector.
+        """
         self.extract()
-        i = self
-        while i is not None:
-            next = i.next_element
-            i.__dict__.clear()
-            i = next
+        self._destroy_descendants()
+        self.__dict__.clear()
+
+    def _destroy_descendants(self):
+        """Take apart every element beneath this Tag.
+
+        This goes through the contents lists rather than following
+        next_element, so it reaches every element even if the
+        next_element chain has been broken, and it visits each element
+        exactly once, without recursing.
+        """
+        stack = list(self._contents)
+        while stack:
+            element = stack.pop()
+            if isinstance(element, Tag):
+                stack.extend(element._contents)
+            element.__dict__.clear()
 
     def clear(self, decompose=False):
         """
         Extract all children. If decompose is True, decompose instead.
         """
         if decompose:
-            for element in self.contents[:]:
-                if isinstance(element, Tag):
-                    element.decompose()
-                else:
-                    element.extract()
+            if not self._contents:
+                return
+            # Destroy all the children at once, rather than extracting
+            # them one at a time, and mend the gap in the chain of
+            # elements.
+            following = self._last_recursive_child().next_element
+            self._destroy_descendants()
+            self.contents = []
+            self.next_element = following
+            if following is not None:
+                following.previous_element = self
+            self._tree_modified()
         else:
-            for element in self.contents[:]:
+            for element in self._contents[:]:
                 element.extract()
 
+    def clone(self):
+        """Make a copy of this tag and everything beneath it.
+
+        The copy isn't part of any tree. Tag names and attribute values
+        are shared with the original, since they're never modified in
+        place; everything else is new. The subtree is copied in one
+        pass without recursing, so there's no limit on its depth.
+        """
+        def copies():
+            stack = [(self, None)]
+            while stack:
+                element, parent = stack.pop()
+                if isinstance(element, Tag):
+                    if parent is None:
+                        cls = self.__class__
+                    else:
+                        cls = Tag
+                    attrs = element._attrs
+                    if attrs:
+                        attrs = dict(attrs)
+                    node = _set_up_tag(
+                        Tag.__new__(cls), element.parser_class, element.name,
+                        attrs, element.hidden, element.can_be_empty_element,
+                        element.contains_substitutions)
+                    for child in reversed(element._contents):
+                        stack.append((child, node))
+                else:
+                    node = element.__class__(element)
+                # Elements come off the stack in document order.
+                yield node, parent
+        copy = _link_in_document_order(copies())
+        if self._weak_links:
+            make_links_weak(copy._contents)
+        return copy
+
+    def __copy__(self):
+        return self.clone()
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
     def index(self, element):
         """
         Find the index of a child by identity, not value. Avoids issues with
         tag.contents.index(element) getting the index of equal elements.
         """
-        for i, child in enumerate(self.contents):
+        for i, child in enumerate(self._contents):
             if child is element:
                 return i
         raise ValueError("Tag.index: element not in tag")
@@ -557,26 +827,26 @@ class Tag(PageElement):
         """Returns the value of the 'key' attribute for the tag, or
         the value given for 'default' if it doesn't have that
         attribute."""
-        return self.attrs.get(key, default)
+        return self._attrs.get(key, default)
 
     def has_attr(self, key):
-        return key in self.attrs
+        return key in self._attrs
 
     def __getitem__(self, key):
         """tag[key] returns the value of the 'key' attribute for the tag,
         and throws an exception if it's not there."""
-        return self.attrs[key]
+        return self._attrs[key]
 
     def __iter__(self):
         "Iterating over a tag iterates over its contents."
-        return iter(self.contents)
+        return iter(self._contents)
 
     def __len__(self):
         "The length of a tag is the length of its list of contents."
-        return len(self.contents)
+        return len(self._contents)
 
     def __contains__(self, x):
-        return x in self.contents
+        return x in self._contents
 
     def __nonzero__(self):
         "A tag is non-None even if it has no contents."
@@ -586,10 +856,13 @@ class Tag(PageElement):
         """Setting tag[key] sets the value of the 'key' attribute for the
         tag."""
         self.attrs[key] = value
+        self._tree_modified()
 
     def __delitem__(self, key):
         "Deleting tag[key] deletes all 'key' attributes for the tag."
-        self.attrs.pop(key, None)
+        if key in self._attrs:
+            del self._attrs[key]
+            self._tree_modified()
 
     def __call__(self, *args, **kwargs):
         """Calling a tag like a function is the same as calling its
@@ -600,27 +873,47 @@ class Tag(PageElement):
     def __getattr__(self, tag):
         #print "Getattr %s.%s" % (self.__class__, tag)
         if len(tag) > 3 and tag.endswith('Tag'):
-            return self.find(tag[:-3])
+            return self._find_first_tag(tag[:-3])
         # We special case contents to avoid recursion.
         elif not tag.startswith("__") and not tag=="contents":
-            return self.find(tag)
+            return self._find_first_tag(tag)
         raise AttributeError(
             "'%s' object has no attribute '%s'" % (self.__class__, tag))
 
+    def _find_first_tag(self, name):
+        """Find the first Tag beneath this one with the given name.
+
+        The answer is remembered, so that navigating the same path
+        (soup.body.table.tr) over and over again only searches the
+        tree once. The remembered answers are thrown out as soon as the
+        tree beneath this tag changes, including when a tag beneath it
+        is renamed.
+        """
+        cache = self._first_tag_cache
+        if cache is None or self._first_tag_cache_version != self._version:
+            cache = self._first_tag_cache = {}
+            self._first_tag_cache_version = self._version
+        elif name in cache:
+            return cache[name]
+        found = cache[name] = self.find(name)
+        return found
+
     def __eq__(self, other):
         """Returns true iff this tag has the same name, the same attributes,
         and the same contents (recursively) as the given tag."""
         if self is other:
             return True
         if (not hasattr(other, 'name') or
-            not hasattr(other, 'attrs') or
-            not hasattr(other, 'contents') or
+            not hasattr(other, '_attrs') or
+            not hasattr(other, '_contents') or
             self.name != other.name or
-            self.attrs != other.attrs or
+            self._attrs != other._attrs or
             len(self) != len(other)):
             return False
-        for i, my_child in enumerate(self.contents):
-            if my_child != other.contents[i]:
+        # Go straight to the containers, so that comparing two tags
+        # doesn't give them each an empty dict and list of their own.
+        for my_child, other_child in zip(self._contents, other._contents):
+            if my_child != other_child:
                 return False
         return True
 
@@ -659,9 +952,30 @@ class Tag(PageElement):
            document contains a <META> tag that mentions the document's
            encoding.
         """
+        return self._decode(indent_level, eventual_encoding,
+                            substitute_html_entities, self.cache_output)
+
+    def _decode(self, indent_level, eventual_encoding,
+                substitute_html_entities, cache):
+        """Does the work of decode(), optionally using and filling in
+        the output caches of this tag and the tags beneath it."""
+        if cache:
+            # When pretty-printing, the output also depends on whether
+            # this tag has a next sibling, and that can change without
+            # this tag's subtree changing.
+            key = (indent_level, eventual_encoding, substitute_html_entities,
+                   indent_level is not None and bool(self.next_sibling))
+            output_cache = self._output_cache
+            if (output_cache is None
+                or self._output_cache_version != self._version):
+                output_cache = self._output_cache = {}
+                self._output_cache_version = self._version
+            elif key in output_cache:
+                return output_cache[key]
+
         attrs = []
-        if self.attrs:
-            for key, val in sorted(self.attrs.items()):
+        if self._attrs:
+            for key, val in sorted(self._attrs.items()):
                 if val is None:
                     decoded = key
                 else:
@@ -689,8 +1003,9 @@ class Tag(PageElement):
         else:
             space = ''
             indent_contents = None
-        contents = self.decode_contents(
-            indent_contents, eventual_encoding, substitute_html_entities)
+        contents = self._decode_contents(
+            indent_contents, eventual_encoding, substitute_html_entities,
+            cache)
 
         if self.hidden:
             # This is the 'document root' object.
@@ -714,6 +1029,8 @@ class Tag(PageElement):
             if pretty_print and closeTag and self.next_sibling:
                 s.append("\n")
             s = ''.join(s)
+        if cache:
+            output_cache[key] = s
         return s
 
     def prettify(self, encoding=DEFAULT_OUTPUT_ENCODING):
@@ -731,6 +1048,14 @@ class Tag(PageElement):
            document contains a <META> tag that mentions the document's
            encoding.
         """
+        return self._decode_contents(indent_level, eventual_encoding,
+                                     substitute_html_entities,
+                                     self.cache_output)
+
+    def _decode_contents(self, indent_level, eventual_encoding,
+                         substitute_html_entities, cache):
+        """Does the work of decode_contents(). If cache is true, the
+        output caches of the tags beneath this one are used."""
         pretty_print = (indent_level is not None)
         s = []
         for c in self:
@@ -738,8 +1063,12 @@ class Tag(PageElement):
             if isinstance(c, NavigableString):
                 text = c.output_ready(substitute_html_entities)
             elif isinstance(c, Tag):
-                s.append(c.decode(indent_level, eventual_encoding,
-                                  substitute_html_entities))
+                if cache:
+                    s.append(c._decode(indent_level, eventual_encoding,
+                                       substitute_html_entities, True))
+                else:
+                    s.append(c.decode(indent_level, eventual_encoding,
+                                      substitute_html_entities))
             if text and indent_level:
                 text = text.strip()
             if text:
@@ -753,18 +1082,19 @@ class Tag(PageElement):
     #Soup methods
 
     def find(self, name=None, attrs={}, recursive=True, text=None,
-             **kwargs):
+             max_depth=None, prune=None, **kwargs):
         """Return only the first child of this Tag matching the given
         criteria."""
         r = None
-        l = self.find_all(name, attrs, recursive, text, 1, **kwargs)
+        l = self.find_all(name, attrs, recursive, text, 1, max_depth, prune,
+                          **kwargs)
         if l:
             r = l[0]
         return r
     findChild = find
 
     def find_all(self, name=None, attrs={}, recursive=True, text=None,
-                 limit=None, **kwargs):
+                 limit=None, max_depth=None, prune=None, **kwargs):
         """Extracts a list of Tag objects that match the given
         criteria.  You can specify the name of the Tag and any
         attributes you want the Tag to have.
@@ -773,30 +1103,107 @@ class Tag(PageElement):
         string, a list of strings, a regular expression object, or a
         callable that takes a string and returns whether or not the
         string matches for some custom definition of 'matches'. The
-        same is true of the tag name."""
-        generator = self.recursive_children
+        same is true of the tag name.
+
+        :param max_depth: Don't look more than this many levels below
+           this Tag. This Tag's children are at depth 1, so
+           recursive=False is the same as max_depth=1.
+        :param prune: A callable that takes a Tag. If it returns true,
+           that Tag and everything inside it is skipped without being
+           examined.
+        """
         if not recursive:
+            max_depth = 1
+        if max_depth is None and prune is None:
+            generator = self.recursive_children
+            if text and self._string_index is not None:
+                # Only the strings need to be searched, and we have a
+                # list of them handy.
+                generator = iter(self.string_index.strings)
+        elif max_depth == 1 and prune is None:
             generator = self.children
+        else:
+            generator = self._descendants(max_depth, prune)
         return self._find_all(name, attrs, text, limit, generator, **kwargs)
     findAll = find_all       # BS3
     findChildren = find_all  # BS2
 
+    def search_text(self, pattern):
+        """Search all the text beneath this Tag, as one string, for a
+        regular expression.
+
+        Unlike find_all(text=...), a match may span several strings.
+
+        :return: A generator of (match, string) 2-tuples, where the
+        match offsets are relative to the concatenated text and string
+        is the NavigableString in which the match starts.
+        """
+        return self.string_index.search(pattern)
+
     #Generator methods
     @property
     def children(self):
         # return iter() to make the purpose of the method clear
-        return iter(self.contents)  # XXX This seems to be untested.
+        return iter(self._contents)  # XXX This seems to be untested.
 
     @property
     def recursive_children(self):
-        if not len(self.contents):
+        if not len(self._contents):
             return
         stopNode = self._last_recursive_child().next_element
-        current = self.contents[0]
+        current = self._contents[0]
         while current is not stopNode:
             yield current
             current = current.next_element
 
+    def _descendants(self, max_depth=None, prune=None):
+        """Iterate over the elements beneath this Tag in document order,
+        stopping max_depth levels down and skipping over any Tag for
+        which prune returns true.
+
+        This follows the next_element chain like recursive_children,
+        keeping a stack of the open Tags to know how deep it is. A
+        subtree that is pruned or too deep is jumped over in one step
+        by going to the next_element of its last recursive child.
+        """
+        if not len(self._contents) or (max_depth is not None
+                                      and max_depth < 1):
+            return
+        stopNode = self._last_recursive_child().next_element
+        current = self._contents[0]
+        parents = [self]
+        while current is not stopNode:
+            while current.parent is not parents[-1]:
+                parents.pop()
+            if isinstance(current, Tag):
+                if prune is not None and prune(current):
+                    current = current._last_recursive_child().next_element
+                    continue
+                yield current
+                if max_depth is not None and len(parents) >= max_depth:
+                    current = current._last_recursive_child().next_element
+                    continue
+                parents.append(current)
+            else:
+                yield current
+            current = current.next_element
+
+    @property
+    def string_index(self):
+        """A StringIndex of all the strings beneath this Tag.
+
+        It's built the first time it's needed and then kept, and
+        rebuilt whenever the tree beneath this Tag changes. Once a Tag
+        has one, get_text() and text searches with find_all() use it.
+        A Tag that's never asked for its string_index (or searched with
+        search_text()) keeps nothing: pass index_strings=True to the
+        BeautifulSoup constructor to index the whole document up front.
+        """
+        index = self._string_index
+        if index is None or index.version != self._version:
+            index = self._string_index = StringIndex(self)
+        return index
+
     # Old names for backwards compatibility
     def childGenerator(self):
         return self.children
@@ -809,12 +1216,196 @@ class Tag(PageElement):
     # anyway.
     has_key = has_attr
 
+
+def _set_up_tag(tag, parser_class, name, attrs, hidden,
+                can_be_empty_element, contains_substitutions):
+    """Fill in a Tag made with Tag.__new__, without going through
+    Tag.__init__. This is for code that copies or loads a tree that's
+    already been parsed.
+
+    :param attrs: A dict the Tag can keep. If it's empty, the Tag
+        shares an empty dict with every other Tag that has no attributes.
+    :return: The Tag.
+    """
+    tag.__dict__ = {
+        'parser_class': parser_class,
+        'name': name,
+        'hidden': hidden,
+        'can_be_empty_element': can_be_empty_element,
+        'contains_substitutions': contains_substitutions,
+        }
+    if attrs:
+        tag._attrs = attrs
+    return tag
+
+
+def _link_in_document_order(elements):
+    """Put together a tree out of new elements that come in document
+    order.
+
+    :param elements: An iterable of (element, parent) 2-tuples. Every
+        parent must have come earlier in the iterable. The first
+        element's parent is None; it becomes the top of the tree.
+    :return: The top of the tree.
+    """
+    top = previous = None
+    for node, parent in elements:
+        node.parent = parent
+        node.next_element = None
+        node.next_sibling = None
+        node.previous_sibling = None
+        if parent is None:
+            top = node
+        else:
+            siblings = parent.contents
+            if siblings:
+                node.previous_sibling = siblings[-1]
+                siblings[-1].next_sibling = node
+            siblings.append(node)
+        # Each element comes right after the one before it.
+        node.previous_element = previous
+        if previous is not None:
+            previous.next_element = node
+        previous = node
+    return top
+
+
+def _set_up_document(soup, is_xml, parse_only, original_encoding,
+                     declared_html_encoding):
+    """Fill in the rest of a BeautifulSoup object whose tree was copied
+    or loaded rather than parsed.
+
+    As with a freshly parsed document, the document object itself is
+    taken out of the chain of elements.
+    """
+    soup.builder = None
+    soup.is_xml = is_xml
+    soup.parse_only = parse_only
+    soup.markup = None
+    soup.original_encoding = original_encoding
+    soup.declared_html_encoding = declared_html_encoding
+    soup.currentData = []
+    soup.currentTag = soup
+    soup.tagStack = [soup]
+    first = soup.next_element
+    if first is not None:
+        first.previous_element = None
+        soup.next_element = None
+        soup.previous_element = soup._last_recursive_child()
+
+
+# Weak links.
+#
+# Normally every link in the tree has a link going the other way:
+# parent and contents, next_element and previous_element, next_sibling
+# and previous_sibling. So every tree is full of reference cycles, and
+# only Python's cyclic garbage collector can free it. In a tree with
+# weak links, the links that point up or back (parent,
+# previous_element and previous_sibling) are weak references. Nothing
+# in the tree keeps anything above or before it alive, so a tree is
+# freed by reference counting as soon as the last reference to its top
+# goes away.
+#
+# The price is that an element doesn't keep its tree alive. If you
+# hold on to a Tag and let go of the BeautifulSoup object, the Tag's
+# parent becomes None.
+
+# The links that are weak references in a tree with weak links.
+WEAK_LINKS = ['parent', 'previous_element', 'previous_sibling']
+
+
+def _weak_link(name):
+    """A property that keeps a weak reference to the element it's set
+    to. The weak reference is kept in the instance dictionary under the
+    property's own name."""
+
+    def get(self):
+        link = self.__dict__.get(name)
+        if link is None:
+            return None
+        return link()
+
+    def set(self, value):
+        if value is not None:
+            value = weakref.ref(value)
+        self.__dict__[name] = value
+    return property(get, set)
+
+
+class WeakLinkedElement(object):
+    """Mixed in to a PageElement class to make its links up and back
+    along the tree into weak references."""
+
+    _weak_links = True
+
+    parent = _weak_link('parent')
+    previous_element = _weak_link('previous_element')
+    previous_sibling = _weak_link('previous_sibling')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in WEAK_LINKS:
+            link = state.get(name)
+            if link is not None:
+                state[name] = link()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name in WEAK_LINKS:
+            if name in state:
+                setattr(self, name, state[name])
+
+
+_weak_classes = {}
+
+
+def weak_class(cls):
+    """The version of a PageElement class whose links up and back
+    along the tree are weak references."""
+    if cls._weak_links:
+        return cls
+    weak = _weak_classes.get(cls)
+    if weak is None:
+        weak = _weak_classes[cls] = type(
+            'Weak' + cls.__name__, (WeakLinkedElement, cls), {})
+    return weak
+
+# The weak classes for the standard elements are module attributes, so
+# they can be pickled.
+for _cls in [Tag, NavigableString, CData, ProcessingInstruction, Comment,
+             Declaration, Doctype]:
+    globals()[weak_class(_cls).__name__] = weak_class(_cls)
+del _cls
+
+
+def make_links_weak(elements):
+    """Turn the given elements, and everything beneath them, into
+    elements with weak links.
+
+    This happens in place, by changing each element's class.
+    """
+    stack = list(elements)
+    while stack:
+        element = stack.pop()
+        if not element._weak_links:
+            links = [(name, element.__dict__.get(name))
+                     for name in WEAK_LINKS]
+            element.__class__ = weak_class(element.__class__)
+            for name, value in links:
+                setattr(element, name, value)
+        if isinstance(element, Tag):
+            stack.extend(element._contents)
+
+
 # Next, a couple classes to represent queries and their results.
 class SoupStrainer(object):
     """Encapsulates a number of ways of matching a markup element (tag or
     text)."""
 
     def __init__(self, name=None, attrs={}, text=None, **kwargs):
+        if isinstance(name, basestring):
+            name = intern_name(name)
         self.name = name
         if isinstance(attrs, basestring):
             kwargs['class'] = _match_css_class(attrs)
@@ -899,6 +1490,31 @@ class SoupStrainer(object):
                 "I don't know how to match against a %s" % markup.__class__)
         return found
 
+    def _string_matcher(self):
+        """Turn self.text into a function that takes a NavigableString
+        and decides whether it matches.
+
+        This gives the same answers as calling search() on each string,
+        without the overhead of working out what kind of object self.text
+        is over and over again. Returns None if self.text is something
+        unusual that only search() knows how to handle.
+        """
+        match_against = self.text
+        if match_against is True:
+            return lambda markup: True
+        elif isinstance(match_against, collections.Callable):
+            return match_against
+        elif hasattr(match_against, 'match'):
+            # It's a regexp object.
+            return match_against.search
+        elif isinstance(match_against, basestring):
+            match_against = NavigableString(match_against)
+            return lambda markup: markup == match_against
+        elif (hasattr(match_against, '__iter__')
+              and not hasattr(match_against, 'items')):
+            return lambda markup: markup in match_against
+        return None
+
     def _matches(self, markup, match_against):
         #print "Matching %s against %s" % (markup, match_against)
         result = False
@@ -911,6 +1527,10 @@ class SoupStrainer(object):
             #other ways of matching match the tag name as a string.
             if isinstance(markup, Tag):
                 markup = markup.name
+            if markup is match_against:
+                # Tag names are interned, so this is how a search for
+                # a tag name usually succeeds.
+                return True
             if markup is not None and not isinstance(markup, basestring):
                 markup = unicode(markup)
             #Now we know that chunk is either a string, or None.
@@ -931,6 +1551,57 @@ class SoupStrainer(object):
         return result
 
 
+class StringIndex(object):
+    """All the strings beneath a Tag, in document order.
+
+    Along with the strings themselves, this keeps their concatenation
+    and the offset at which each string starts within it, so that a
+    position in the text can be mapped back to the string it came
+    from.
+    """
+
+    def __init__(self, tag):
+        self.version = tag._version
+        self.strings = [string for string in tag.recursive_children
+                        if isinstance(string, NavigableString)]
+        self.offsets = []
+        offset = 0
+        for string in self.strings:
+            self.offsets.append(offset)
+            offset += len(string)
+        self.text = u''.join(self.strings)
+
+    def string_at(self, offset):
+        """Find the string containing the character at the given offset
+        into self.text."""
+        if offset < 0 or offset >= len(self.text):
+            raise IndexError("StringIndex offset out of range")
+        return self.strings[bisect.bisect_right(self.offsets, offset) - 1]
+
+    def search(self, pattern):
+        """Search the concatenated text for a regular expression.
+
+        :return: A generator of (match, string) 2-tuples, where string
+        is the NavigableString in which the match starts. A match may
+        run on into the strings that come after it.
+        """
+        if isinstance(pattern, basestring):
+            pattern = re.compile(pattern)
+        for match in pattern.finditer(self.text):
+            if match.start() == len(self.text):
+                # An empty match at the very end of the text.
+                break
+            yield match, self.string_at(match.start())
+
+
+# Stands in for a StringIndex that's out of date, so that a Tag which
+# had one builds a new one when it's next needed.
+_STALE_STRING_INDEX = StringIndex.__new__(StringIndex)
+_STALE_STRING_INDEX.version = None
+_STALE_STRING_INDEX.strings = _STALE_STRING_INDEX.offsets = ()
+_STALE_STRING_INDEX.text = u''
+
+
 class ResultSet(list):
     """A ResultSet is just a list that keeps track of the SoupStrainer
     that created it."""
@@ -0,0 +1,454 @@
+"""Read-only documents that are read straight out of the binary format.
+
+A MappedSoup opens data created by BeautifulSoup.dumps() (usually a
+file, which is memory-mapped) without turning it into objects. Tag and
+NavigableString objects are only created for the parts of the tree you
+actually touch, and find_all() and get_text() work directly on the
+binary data wherever they can. A query against a cached document
+costs a few page faults rather than a complete BeautifulSoup.loads().
+
+Everything that reads the tree works as usual, but the tree can't be
+modified.
+"""
+
+__all__ = ['MappedSoup']
+
+import collections
+import mmap
+import struct
+
+from bs4 import BeautifulSoup, binary
+from bs4.binary import ATTRIBUTE_SIZE, ELEMENT_SIZE, KIND_MASK, NONE, TAG
+from bs4.element import (
+    ResultSet,
+    SoupStrainer,
+    Tag,
+    _link_in_document_order,
+    _set_up_tag,
+    )
+
+RECORD = struct.Struct('<%dI' % ELEMENT_SIZE)
+STRING_OFFSETS = struct.Struct('<2I')
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("A MappedSoup can't be modified.")
+
+
+class _ReadOnlyElement(object):
+    """The links between the elements of a read-only document, looked
+    up in the document's own storage when they're needed.
+
+    Each element knows its document and its number in the document.
+    Elements are numbered in document order, so an element's subtree
+    is the run of numbers up to _end(). The document provides these
+    accessors, each of which takes an element number:
+
+      _element()              The object for an element (None for NONE).
+      _flags()                The kind of element and its flags.
+      _parent_number()        The number of the element's parent.
+      _next_sibling_number()  The number of the element's next sibling.
+      _end()                  The number of the first element after the
+                              element's subtree.
+
+    The document also has an _element_count, and two methods that
+    search a range of elements: _texts(start, end) yields (number,
+    text) for each string, and _matching_tags(strainer, start, end)
+    yields the number of each tag that matches a SoupStrainer.
+    """
+
+    @property
+    def parent(self):
+        document = self._document
+        return document._element(document._parent_number(self._number))
+
+    @property
+    def next_element(self):
+        # As in a freshly parsed document, the document object itself
+        # isn't part of the chain of elements.
+        number = self._number
+        if number == 0 or number + 1 >= self._document._element_count:
+            return None
+        return self._document._element(number + 1)
+
+    @property
+    def previous_element(self):
+        number = self._number
+        if number == 0:
+            number = self._document._element_count
+        if number <= 1:
+            return None
+        return self._document._element(number - 1)
+
+    @property
+    def next_sibling(self):
+        document = self._document
+        return document._element(document._next_sibling_number(self._number))
+
+    @property
+    def previous_sibling(self):
+        document = self._document
+        number = self._number
+        parent = document._parent_number(number)
+        if parent == NONE or parent == number - 1:
+            return None
+        # Climb up from the element just before this one until we reach
+        # a child of this element's parent.
+        number -= 1
+        number_parent = document._parent_number(number)
+        while number_parent != parent:
+            number = number_parent
+            number_parent = document._parent_number(number)
+        return document._element(number)
+
+    insert = _read_only
+    append = _read_only
+    extract = _read_only
+    replace_with = replaceWith = _read_only
+    replace_with_children = replaceWithChildren = _read_only
+
+
+class _ReadOnlyTag(_ReadOnlyElement, Tag):
+    """A Tag in a read-only document. Subclasses provide the name,
+    _attrs, _contents and clone()."""
+
+    @property
+    def parser_class(self):
+        return self._document.__class__
+
+    @property
+    def hidden(self):
+        return bool(self._document._flags(self._number) & binary.HIDDEN)
+
+    @property
+    def can_be_empty_element(self):
+        return bool(self._document._flags(self._number)
+                    & binary.CAN_BE_EMPTY_ELEMENT)
+
+    @property
+    def contains_substitutions(self):
+        return bool(self._document._flags(self._number)
+                    & binary.CONTAINS_SUBSTITUTIONS)
+
+    @property
+    def recursive_children(self):
+        document = self._document
+        for number in range(self._number + 1, document._end(self._number)):
+            yield document._element(number)
+
+    def _last_recursive_child(self):
+        document = self._document
+        return document._element(document._end(self._number) - 1)
+
+    def get_text(self, separator=u"", strip=False):
+        """
+        Get all child strings, concatenated using the given separator
+        """
+        document = self._document
+        strings = (text for number, text in document._texts(
+                self._number + 1, document._end(self._number)))
+        if strip:
+            return separator.join(string.strip()
+                for string in strings if string.strip())
+        return separator.join(strings)
+    getText = get_text
+
+    text = property(get_text)
+
+    def find_all(self, name=None, attrs={}, recursive=True, text=None,
+                 limit=None, max_depth=None, prune=None, **kwargs):
+        """Extracts a list of Tag objects that match the given
+        criteria. See Tag.find_all().
+
+        Common searches are run against the document's own storage, so
+        only the matching elements are turned into objects.
+        """
+        if isinstance(name, SoupStrainer):
+            strainer = name
+        else:
+            strainer = SoupStrainer(name, attrs, text, **kwargs)
+        text_matcher = None
+        if strainer.text:
+            text_matcher = strainer._string_matcher()
+        if (not recursive or max_depth is not None or prune is not None
+            or (strainer.text and text_matcher is None)
+            or (not strainer.text
+                and isinstance(strainer.name, collections.Callable))):
+            # This search needs real objects to work with.
+            return super(_ReadOnlyTag, self).find_all(
+                strainer, recursive=recursive, limit=limit,
+                max_depth=max_depth, prune=prune)
+
+        document = self._document
+        start = self._number + 1
+        end = document._end(self._number)
+        results = ResultSet(strainer)
+        if strainer.text:
+            # A function might want to look at more than the text, so
+            # give it the real string object.
+            wants_object = isinstance(strainer.text, collections.Callable)
+            for number, string in document._texts(start, end):
+                if wants_object:
+                    string = document._element(number)
+                if string and text_matcher(string):
+                    results.append(document._element(number))
+                    if limit and len(results) >= limit:
+                        break
+        else:
+            for number in document._matching_tags(strainer, start, end):
+                results.append(document._element(number))
+                if limit and len(results) >= limit:
+                    break
+        return results
+    findAll = find_all       # BS3
+    findChildren = find_all  # BS2
+
+    clear = _read_only
+    decompose = _read_only
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    string = property(Tag.string.fget, _read_only)
+
+
+class MappedElement(_ReadOnlyElement):
+    """An element of a MappedSoup, which keeps a copy of its own record
+    from the binary data."""
+
+
+class MappedTag(MappedElement, _ReadOnlyTag):
+    """A Tag whose contents, attributes and links are read out of a
+    MappedSoup's binary data the first time they're needed."""
+
+    _loaded_attrs = None
+    _loaded_contents = None
+
+    @property
+    def name(self):
+        return self._document._name(self._record[1])
+
+    @property
+    def _attrs(self):
+        if self._loaded_attrs is None:
+            self._loaded_attrs = self._document._attributes(self._record)
+        return self._loaded_attrs
+
+    @property
+    def _contents(self):
+        if self._loaded_contents is None:
+            document = self._document
+            contents = []
+            number = self._number + 1
+            end = self._record[3]
+            while number < end:
+                child = document._element(number)
+                contents.append(child)
+                number = child._record[3]
+            self._loaded_contents = contents
+        return self._loaded_contents
+
+    def clone(self):
+        """Copy this part of the document into ordinary Tag and
+        NavigableString objects, which can be modified."""
+        document = self._document
+        nodes = {}
+
+        def elements_in_order():
+            for number, record in document._records(
+                self._number, self._record[3]):
+                kind = record[0] & KIND_MASK
+                parent = nodes.get(record[2])
+                if kind == TAG:
+                    attrs = None
+                    if record[5]:
+                        attrs = document._attributes(record)
+                    node = _set_up_tag(
+                        Tag.__new__(Tag), document.__class__,
+                        document._name(record[1]), attrs,
+                        bool(record[0] & binary.HIDDEN),
+                        bool(record[0] & binary.CAN_BE_EMPTY_ELEMENT),
+                        bool(record[0] & binary.CONTAINS_SUBSTITUTIONS))
+                    nodes[number] = node
+                else:
+                    node = binary.STRING_CLASSES[kind - 1](
+                        document._string(record[1]))
+                yield node, parent
+        return _link_in_document_order(elements_in_order())
+
+
+def _mapped_string_class(cls):
+    return type('Mapped' + cls.__name__, (MappedElement, cls), {})
+
+MAPPED_STRING_CLASSES = [_mapped_string_class(cls)
+                         for cls in binary.STRING_CLASSES]
+
+
+class MappedSoup(MappedTag, BeautifulSoup):
+    """A read-only BeautifulSoup object backed by data created by
+    BeautifulSoup.dumps()."""
+
+    def __init__(self, source):
+        """
+        :param source: The name of a file, or an open file, containing
+            data created by BeautifulSoup.dumps(). The file is
+            memory-mapped. To use a byte string instead, call
+            MappedSoup.loads().
+        """
+        if isinstance(source, basestring):
+            source = open(source, 'rb')
+        try:
+            data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            source.close()
+        self._mmap = data
+        self._set_up(data)
+
+    @classmethod
+    def loads(cls, data):
+        """Open a byte string created by dumps() without loading it."""
+        soup = cls.__new__(cls)
+        soup._mmap = None
+        soup._set_up(data)
+        return soup
+
+    def _set_up(self, data):
+        self._data = data
+        ((magic, version, document_flags, element_count, attribute_count,
+          string_count, original_encoding, declared_encoding),
+         position) = binary.read_header(data)
+        if element_count == 0:
+            raise ValueError("Beautiful Soup binary data has no document.")
+        self._element_count = element_count
+        self._element_start = position
+        self._attribute_start = (
+            self._element_start + element_count * RECORD.size)
+        self._offset_start = (
+            self._attribute_start + attribute_count * ATTRIBUTE_SIZE * 4)
+        self._string_start = self._offset_start + (string_count + 1) * 4
+        if self._string_start > len(data):
+            raise ValueError("Truncated Beautiful Soup binary data.")
+
+        self._record = RECORD.unpack_from(data, self._element_start)
+        self._elements = {0: self}
+        self._names = {}
+        self._document = self
+        self._number = 0
+
+        self.builder = None
+        self.is_xml = bool(document_flags & binary.IS_XML)
+        self.parse_only = None
+        self.markup = None
+        self.original_encoding = self._string(original_encoding)
+        self.declared_html_encoding = self._string(declared_encoding)
+
+    def clone(self):
+        """Load the whole document as an ordinary BeautifulSoup object."""
+        return BeautifulSoup.loads(self._data[:])
+
+    def close(self):
+        """Release the memory-mapped file, if there is one.
+
+        Nothing can be read from the document afterwards.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _read_record(self, number):
+        # An element that has an object keeps its record there.
+        element = self._elements.get(number)
+        if element is not None:
+            return element._record
+        return RECORD.unpack_from(
+            self._data, self._element_start + number * RECORD.size)
+
+    # The accessors _ReadOnlyElement and _ReadOnlyTag use.
+
+    def _flags(self, number):
+        return self._read_record(number)[0]
+
+    def _parent_number(self, number):
+        return self._read_record(number)[2]
+
+    def _next_sibling_number(self, number):
+        parent, end = self._read_record(number)[2:4]
+        if (parent == NONE or end >= self._element_count
+            or self._read_record(end)[2] != parent):
+            return NONE
+        return end
+
+    def _end(self, number):
+        return self._read_record(number)[3]
+
+    def _texts(self, start, end):
+        for number, record in self._records(start, end):
+            if record[0] & KIND_MASK != TAG:
+                yield number, self._string(record[1])
+
+    def _matching_tags(self, strainer, start, end):
+        for number, record in self._records(start, end):
+            if record[0] & KIND_MASK != TAG:
+                continue
+            tag_name = self._name(record[1])
+            if strainer.name and not strainer._matches(
+                tag_name, strainer.name):
+                # Don't bother reading the attributes.
+                continue
+            if strainer.attrs:
+                attrs = self._attributes(record)
+            else:
+                attrs = {}
+            if strainer.search_tag(tag_name, attrs):
+                yield number
+
+    def _records(self, start, end):
+        """Iterate over (number, record) for a range of elements."""
+        table, position = binary._from_bytes(
+            self._data, self._element_start + start * RECORD.size,
+            (end - start) * ELEMENT_SIZE)
+        for i in range(0, len(table), ELEMENT_SIZE):
+            yield start + i // ELEMENT_SIZE, table[i:i + ELEMENT_SIZE]
+
+    def _string(self, number):
+        if number == NONE:
+            return None
+        start, end = STRING_OFFSETS.unpack_from(
+            self._data, self._offset_start + number * 4)
+        return self._data[
+            self._string_start + start:self._string_start + end].decode(
+            "utf-8")
+
+    def _name(self, number):
+        """Look up a string that's likely to be used over and over, such
+        as a tag name or an attribute name."""
+        name = self._names.get(number)
+        if name is None:
+            name = self._names[number] = self._string(number)
+        return name
+
+    def _attributes(self, record):
+        attributes, position = binary._from_bytes(
+            self._data, self._attribute_start + record[4] * ATTRIBUTE_SIZE * 4,
+            record[5] * ATTRIBUTE_SIZE)
+        attrs = {}
+        for i in range(0, len(attributes), ATTRIBUTE_SIZE):
+            attrs[self._name(attributes[i])] = self._string(attributes[i + 1])
+        return attrs
+
+    def _element(self, number):
+        """Find or create the object for an element."""
+        if number == NONE:
+            return None
+        element = self._elements.get(number)
+        if element is None:
+            record = self._read_record(number)
+            kind = record[0] & KIND_MASK
+            if kind == TAG:
+                element = MappedTag.__new__(MappedTag)
+            else:
+                cls = MAPPED_STRING_CLASSES[kind - 1]
+                element = cls.__new__(cls, self._string(record[1]))
+            element._document = self
+            element._number = number
+            element._record = record
+            self._elements[number] = element
+        return element
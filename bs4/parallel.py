@@ -0,0 +1,114 @@
+"""Parse many documents at once, using a pool of worker processes.
+
+Parsing is CPU-bound Python code, so threads don't help. This module
+hands raw documents out to a multiprocessing pool, parses them with
+Beautiful Soup in the worker processes, and passes back whatever your
+extractor function pulls out of each tree.
+"""
+
+__all__ = ['parse_many']
+
+from collections import deque
+import multiprocessing
+
+from bs4 import BeautifulSoup
+
+# Set up in each worker process by _init_worker().
+_worker_builder = None
+_worker_extract = None
+_worker_parse_only = None
+_worker_from_encoding = None
+
+
+def _init_worker(builder_class, extract, parse_only, from_encoding):
+    """Create the tree builder a worker will use for every document."""
+    global _worker_builder, _worker_extract
+    global _worker_parse_only, _worker_from_encoding
+    _worker_builder = builder_class()
+    _worker_extract = extract
+    _worker_parse_only = parse_only
+    _worker_from_encoding = from_encoding
+
+
+def _parse_chunk(documents):
+    """Parse a list of documents in a worker process."""
+    results = []
+    for markup in documents:
+        soup = BeautifulSoup(markup, builder=_worker_builder,
+                             parse_only=_worker_parse_only,
+                             from_encoding=_worker_from_encoding)
+        if _worker_extract is None:
+            results.append(soup)
+        else:
+            results.append(_worker_extract(soup))
+    return results
+
+
+def _chunks(documents, chunksize):
+    chunk = []
+    for markup in documents:
+        chunk.append(markup)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_many(documents, features=None, extract=None, workers=None,
+               parse_only=None, from_encoding=None, chunksize=1,
+               max_pending=None):
+    """Parse a number of documents in worker processes.
+
+    :param documents: An iterable of markup strings. It's consumed
+        lazily, so it can be a generator reading from disk or the
+        network.
+    :param features: Used to pick a tree builder, as with the
+        BeautifulSoup constructor. Each worker creates its builder
+        once and reuses it for every document.
+    :param extract: A function that takes a BeautifulSoup object and
+        returns what you want to know about the document. It's called
+        in the worker process, and its return value is pickled and sent
+        back, so it should be small. If this is None, the whole
+        BeautifulSoup object is sent back, which is much slower. On
+        platforms that don't fork, extract must be a module-level
+        function so it can be pickled.
+    :param workers: The number of worker processes. Defaults to the
+        number of CPUs.
+    :param chunksize: The number of documents sent to a worker in one
+        go. Larger chunks mean less overhead for small documents.
+    :param max_pending: The largest number of chunks that can be
+        waiting to be parsed or collected at once. This stops a fast
+        source of documents from filling up memory. Defaults to twice
+        the number of workers.
+
+    :return: A generator that yields one result per document, in the
+        same order as the documents.
+    """
+    # Look up the builder here rather than in the workers, so that a
+    # bad feature list raises an exception instead of killing workers.
+    builder_class = BeautifulSoup._find_builder(features).__class__
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if max_pending is None:
+        max_pending = workers * 2
+    pool = multiprocessing.Pool(
+        workers, _init_worker,
+        (builder_class, extract, parse_only, from_encoding))
+    pending = deque()
+    try:
+        for chunk in _chunks(documents, chunksize):
+            if len(pending) >= max_pending:
+                for result in pending.popleft().get():
+                    yield result
+            pending.append(pool.apply_async(_parse_chunk, (chunk,)))
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
@@ -0,0 +1,288 @@
+"""Queries that run over whole ColumnarSoup documents at once.
+
+A Query picks out tags by name, by attributes, and by what they're
+inside of:
+
+    rows = Query('tr', within=Query('table', 'results'))
+    for document, numbers in zip(documents, rows.run(documents)):
+        for number in numbers:
+            print document.element(number)
+
+Rather than visiting elements one at a time, a Query works on the
+arrays of a ColumnarSoup (see bs4.columnar). Each part of the query
+becomes a mask over all the elements of a document. The name, the
+attributes and the enclosing tag are each checked against the
+document's table of strings, once per distinct string, and the answers
+are then spread out over the elements.
+
+If NumPy is installed, all the documents in a Batch are joined into
+one set of arrays and every mask is computed for the whole batch with
+a handful of array operations. Otherwise the same masks are computed
+in pure Python, one document at a time.
+
+Names and attribute values are matched as in find_all(): against a
+string, a regular expression, a list, True or a function. A function
+is given the tag name or the attribute value as a string, not the Tag.
+"""
+
+__all__ = ['Batch', 'Query']
+
+from bs4.binary import NONE
+from bs4.element import SoupStrainer
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Query(object):
+    """A search for tags across one or more ColumnarSoup documents."""
+
+    def __init__(self, name=None, attrs={}, within=None, **kwargs):
+        """
+        :param name: Match the tag name against this, as in find_all().
+        :param attrs: Match attribute values against these, as in
+            find_all(). A string matches the CSS class, and keyword
+            arguments are attributes too.
+        :param within: Only match tags that are somewhere inside a tag
+            that matches this Query. Anything else is taken to be the
+            name of the enclosing tag.
+        """
+        self.strainer = SoupStrainer(name, attrs, **kwargs)
+        if within is not None and not isinstance(within, Query):
+            within = Query(within)
+        self.within = within
+
+    def run(self, documents):
+        """Run the query against some ColumnarSoup objects.
+
+        :param documents: A list of ColumnarSoup objects, or a Batch.
+            To run several queries against the same documents, make a
+            Batch once and pass it to each query.
+        :return: A list with, for each document, the numbers of the
+            matching tags in document order. Pass a number to the
+            document's element() method to get the Tag. The numbers
+            come as a NumPy array if NumPy is installed, and as a list
+            otherwise.
+        """
+        if not isinstance(documents, Batch):
+            documents = Batch(documents)
+        return documents.run(self)
+
+    def find_all(self, document):
+        """Run the query against one ColumnarSoup and return the
+        matching tags."""
+        return [document.element(number)
+                for number in self.run([document])[0]]
+
+
+def _attribute_tests(strainer):
+    """Each attribute a SoupStrainer looks at, with the value to match
+    against and whether a tag without the attribute matches."""
+    attrs = strainer.attrs or {}
+    return [(key, match_against, strainer._matches(None, match_against))
+            for key, match_against in attrs.items()]
+
+
+def _matches(strainer, match_against, string, memo):
+    """Does a string match? The answer is remembered in memo, so each
+    distinct string is only checked once however many times it turns
+    up."""
+    result = memo.get(string)
+    if result is None:
+        result = memo[string] = bool(
+            strainer._matches(string, match_against))
+    return result
+
+
+def _python_mask(query, document, memos):
+    """A list with a boolean for each element of the document: does it
+    match the query?
+
+    :param memos: A dictionary of the memos used by _matches(), one
+        for each part of the query, shared between documents.
+    """
+    strainer = query.strainer
+    names = document._names
+    strings = document._strings
+    count = document._element_count
+    if strainer.name:
+        memo = memos.setdefault((id(query), None), {})
+        matching = frozenset(
+            number for number in document._tag_names
+            if _matches(strainer, strainer.name, strings[number], memo))
+    else:
+        matching = document._tag_names
+    mask = [names[number] in matching for number in range(count)]
+    # The document itself is never a match.
+    mask[0] = False
+
+    offsets = document._attribute_offsets
+    keys = document._attribute_keys
+    values = document._attribute_values
+    for key, match_against, absent_matches in _attribute_tests(strainer):
+        memo = memos.setdefault((id(query), key), {})
+        key_numbers = set(number for number, string in enumerate(strings)
+                          if string == key)
+        for number in range(count):
+            if not mask[number]:
+                continue
+            result = absent_matches
+            for i in range(offsets[number], offsets[number + 1]):
+                if keys[i] in key_numbers:
+                    value = values[i]
+                    if value != NONE:
+                        result = _matches(
+                            strainer, match_against, strings[value], memo)
+                    break
+            mask[number] = result
+
+    if query.within is not None:
+        # Mark where each enclosing tag's subtree starts and ends, then
+        # walk through the document keeping count of how many of those
+        # subtrees we're inside.
+        enclosing = _python_mask(query.within, document, memos)
+        changes = [0] * (count + 1)
+        for number in range(count):
+            if enclosing[number]:
+                changes[number + 1] += 1
+                changes[document._end(number)] -= 1
+        depth = 0
+        for number in range(count):
+            depth += changes[number]
+            if not depth:
+                mask[number] = False
+    return mask
+
+
+def _numpy_column(column, renumber=None):
+    """Turn an array of element or string numbers into a NumPy array
+    of signed integers, with NONE turned into -1. If renumber is
+    given, it's an array that maps each string number to a new one."""
+    if not len(column):
+        return numpy.zeros(0, numpy.int64)
+    result = numpy.frombuffer(column, numpy.uint32).astype(numpy.int64)
+    result[result == NONE] = -1
+    if renumber is not None:
+        result = renumber[result]
+    return result
+
+
+class Batch(object):
+    """Several ColumnarSoup objects, ready to be queried together.
+
+    If NumPy is installed, the documents' arrays are joined end to end
+    when the Batch is made, which takes longer than running most
+    queries. Their string tables are merged into one, so that a string
+    has the same number wherever it appears in the batch and a
+    predicate only needs to be checked once for each distinct string.
+    A missing string is -1, which picks out an extra False at the end
+    of every lookup table.
+    """
+
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self.joined = numpy is not None and len(self.documents) > 0
+        if self.joined:
+            self._join()
+
+    def _join(self):
+        documents = self.documents
+        self.element_starts = numpy.cumsum(
+            [0] + [document._element_count for document in documents])
+        numbers = {}
+        names = []
+        keys = []
+        values = []
+        counts = []
+        for document in documents:
+            # The extra -1 on the end leaves a missing string missing.
+            renumber = numpy.array(
+                [numbers.setdefault(string, len(numbers))
+                 for string in document._strings] + [-1], numpy.int64)
+            names.append(_numpy_column(document._names, renumber))
+            keys.append(_numpy_column(document._attribute_keys, renumber))
+            values.append(
+                _numpy_column(document._attribute_values, renumber))
+            counts.append(numpy.diff(_numpy_column(
+                document._attribute_offsets)))
+        self.strings = [None] * len(numbers)
+        for string, number in numbers.items():
+            self.strings[number] = string
+        self.names = numpy.concatenate(names)
+        self.keys = numpy.concatenate(keys)
+        self.values = numpy.concatenate(values)
+        # The element each attribute belongs to.
+        self.owners = numpy.repeat(
+            numpy.arange(len(self.names)), numpy.concatenate(counts))
+
+    def _lookup(self, numbers, function):
+        """A table with a boolean for each string, plus one for 'no
+        string'. It's true for each of the given string numbers for
+        which function returns true."""
+        table = numpy.zeros(len(self.strings) + 1, bool)
+        for number in numpy.unique(numbers):
+            if number >= 0 and function(self.strings[number]):
+                table[number] = True
+        return table
+
+    def _mask(self, query):
+        strainer = query.strainer
+        if strainer.name:
+            matching = self._lookup(self.names, lambda name: (
+                strainer._matches(name, strainer.name)))
+            mask = matching[self.names]
+        else:
+            mask = self.names >= 0
+        # The documents themselves are never matches.
+        mask[self.element_starts[:-1]] = False
+
+        for key, match_against, absent_matches in _attribute_tests(strainer):
+            has_key = self._lookup(
+                self.keys, lambda string: string == key)[self.keys]
+            value_matches = self._lookup(
+                self.values[has_key], lambda value: (
+                    strainer._matches(value, match_against)))
+            value_matches[-1] = absent_matches
+            matches = numpy.zeros(len(mask), bool)
+            matches[self.owners[has_key & value_matches[self.values]]] = True
+            if absent_matches:
+                has = numpy.zeros(len(mask), bool)
+                has[self.owners[has_key]] = True
+                matches |= ~has
+            mask &= matches
+
+        if query.within is not None:
+            # Mark where each enclosing tag's subtree starts and ends,
+            # and add up the marks to see how many of those subtrees
+            # each element is inside.
+            enclosing = numpy.flatnonzero(self._mask(query.within))
+            starts = self.element_starts
+            which = numpy.searchsorted(starts, enclosing, 'right') - 1
+            ends = numpy.empty(len(enclosing), numpy.int64)
+            for i, (number, document) in enumerate(zip(enclosing, which)):
+                ends[i] = starts[document] + self.documents[document]._end(
+                    number - starts[document])
+            changes = numpy.zeros(len(mask) + 1, numpy.int64)
+            numpy.add.at(changes, enclosing + 1, 1)
+            numpy.add.at(changes, ends, -1)
+            mask &= numpy.cumsum(changes[:-1]) > 0
+        return mask
+
+    def run(self, query):
+        """Run a Query against every document in the batch. See
+        Query.run()."""
+        if not self.joined:
+            memos = {}
+            results = []
+            for document in self.documents:
+                mask = _python_mask(query, document, memos)
+                results.append(
+                    [number for number in range(len(mask)) if mask[number]])
+            return results
+        numbers = numpy.flatnonzero(self._mask(query))
+        starts = self.element_starts
+        pieces = numpy.split(
+            numbers, numpy.searchsorted(numbers, starts[1:-1]))
+        return [piece - start for piece, start in zip(pieces, starts)]
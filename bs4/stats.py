@@ -0,0 +1,158 @@
+"""Find out where the time goes when a document is parsed.
+
+    soup = BeautifulSoup(markup, collect_stats=True)
+    print soup.parse_stats
+
+Collecting statistics works by temporarily replacing the BeautifulSoup
+object's tree-building methods with versions that count and time each
+call, so it costs nothing unless you ask for it.
+"""
+
+__all__ = ['ParseStats', 'clock']
+
+import time
+
+# The BeautifulSoup methods that the tree builders call, and the
+# event each call is counted as.
+EVENTS = [
+    ('handle_starttag', 'start_tags'),
+    ('handle_endtag', 'end_tags'),
+    ('handle_data', 'data'),
+    ('endData', None),
+    ('object_was_parsed', 'strings'),
+    ('popTag', 'pops'),
+    ]
+
+# The timer used for every measurement: the most precise one this
+# version of Python has. The benchmarks use it too.
+if hasattr(time, 'perf_counter'):
+    clock = time.perf_counter
+else:
+    clock = time.time
+
+
+class ParseStats(object):
+    """Timings and event counts for one parse.
+
+    :ivar times: Seconds spent in each phase of parsing:
+        'encoding' (working out the document's encoding and converting
+        it to Unicode), 'parser' (the underlying parser), 'tree'
+        (building the Beautiful Soup tree), and 'total'. 'reparse' is
+        the part of 'parser' and 'tree' spent parsing the document a
+        second time, after finding an encoding in a META tag.
+    :ivar counts: The number of times each thing happened:
+        'start_tags', 'end_tags', 'data' (chunks of text from the
+        parser), 'pops' (tags closed), 'reparses', 'tags' (tags
+        created) and 'strings' (strings created).
+
+    A tree builder that puts the tree together itself, as html5lib
+    does, doesn't go through the methods that are counted. For those
+    builders every count except 'reparses' is None, and so is the
+    'tree' time: it's included in 'parser'.
+    """
+
+    def __init__(self):
+        self.times = dict.fromkeys(
+            ['encoding', 'parser', 'tree', 'reparse', 'total'], 0.0)
+        self.counts = dict.fromkeys(
+            ['start_tags', 'end_tags', 'data', 'pops', 'reparses', 'tags',
+             'strings'], 0)
+        # How deep we are in calls to BeautifulSoup methods. Only the
+        # outermost call is timed.
+        self._depth = 0
+        self._feeding = False
+
+    def __str__(self):
+        lines = []
+        for phase in ['encoding', 'parser', 'tree', 'reparse', 'total']:
+            if self.times[phase] is None:
+                lines.append("%-10s %10s" % (phase, "-"))
+            else:
+                lines.append("%-10s %9.6fs" % (phase, self.times[phase]))
+        for event, count in sorted(self.counts.items()):
+            if count is None:
+                lines.append("%-10s -" % event)
+            else:
+                lines.append("%-10s %d" % (event, count))
+        return "\n".join(lines)
+
+    def start(self, soup):
+        """Start timing a parse, and counting calls to a BeautifulSoup
+        object's tree-building methods."""
+        if soup.builder.builds_own_tree:
+            # None of the methods will be called, so there's nothing
+            # to count, and building the tree can't be timed apart
+            # from the parser.
+            for event in self.counts:
+                if event != 'reparses':
+                    self.counts[event] = None
+            self.times['tree'] = None
+        else:
+            for name, event in EVENTS:
+                setattr(soup, name, self._wrap(getattr(soup, name), event))
+            soup.handle_starttag = self._count_tags(soup.handle_starttag)
+        soup._feed = self._wrap_feed(soup._feed)
+        self._start = self._encoding_start = clock()
+
+    def encoding_done(self):
+        """Note that the document has been converted to Unicode."""
+        self.times['encoding'] += clock() - self._encoding_start
+
+    def finish(self, soup):
+        """Stop counting, and work out how long the parser took."""
+        self.times['total'] += clock() - self._start
+        for name, event in EVENTS + [('_feed', None)]:
+            soup.__dict__.pop(name, None)
+        # Until now, 'parser' has included the time spent building the
+        # tree.
+        if self.times['tree'] is not None:
+            self.times['parser'] = max(
+                0.0, self.times['parser'] - self.times['tree'])
+
+    def _wrap(self, method, event):
+        counts = self.counts
+        times = self.times
+
+        def wrapper(*args, **kwargs):
+            if event is not None:
+                counts[event] += 1
+            if self._depth:
+                return method(*args, **kwargs)
+            self._depth += 1
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times['tree'] += clock() - start
+                self._depth -= 1
+        return wrapper
+
+    def _count_tags(self, method):
+        counts = self.counts
+
+        def wrapper(*args, **kwargs):
+            tag = method(*args, **kwargs)
+            if tag is not None:
+                counts['tags'] += 1
+            return tag
+        return wrapper
+
+    def _wrap_feed(self, method):
+        # The first call to _feed() is the parse. Any others start the
+        # parse over.
+        times = self.times
+
+        def wrapper(*args, **kwargs):
+            reparse = self._feeding
+            if reparse:
+                self.counts['reparses'] += 1
+            self._feeding = True
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                times['parser'] += elapsed
+                if reparse:
+                    times['reparse'] += elapsed
+        return wrapper
@@ -0,0 +1,124 @@
+"""Tests of the benchmark suite (not of how fast anything is)."""
+
+import copy
+import sys
+import unittest
+
+from bs4 import benchmarks
+from bs4.benchmarks import corpus, tree
+
+
+class TestCorpus(unittest.TestCase):
+
+    def test_corpora_are_the_same_every_time(self):
+        for name, function in corpus.CORPORA:
+            self.assertEqual(corpus.generate(name, 0.01),
+                             corpus.generate(name, 0.01))
+
+    def test_non_utf8_documents_are_in_their_declared_encoding(self):
+        documents = corpus.generate('non_utf8', 0.02)
+        self.assertEqual(len(documents), len(corpus.NON_UTF8))
+        for markup, (encoding, text) in zip(documents, corpus.NON_UTF8):
+            self.assertTrue(text.encode(encoding) in markup)
+
+    def test_unknown_corpus(self):
+        self.assertRaises(ValueError, corpus.generate, 'no such corpus')
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def run_benchmarks(self):
+        return benchmarks.run(
+            ['lxml'], ['small_pages', 'malformed'], scale=0.01, repeat=1,
+            isolate=False, suites=['parse'])
+
+    def test_results(self):
+        results = self.run_benchmarks()
+        self.assertEqual(sorted(results['results'].keys()),
+                         ['lxml/malformed', 'lxml/small_pages'])
+        result = results['results']['lxml/small_pages']
+        self.assertEqual(result['documents'], 2)
+        self.assertTrue(result['nodes'] > 0)
+        for measurement in ['docs_per_sec', 'mb_per_sec', 'nodes_per_sec']:
+            self.assertTrue(result[measurement] > 0)
+        self.assertTrue('lxml/small_pages' in
+                        benchmarks.format_results(results))
+
+    def test_custom_documents(self):
+        results = benchmarks.run(
+            ['lxml'], repeat=1, documents=["<p>foo</p>", "<p>bar</p>"],
+            suites=['parse'])
+        result = results['results']['lxml/custom']
+        self.assertEqual(result['documents'], 2)
+        # <html>, <body>, <p> and a string, twice over.
+        self.assertEqual(result['nodes'], 8)
+
+    def test_compare_against_baseline(self):
+        baseline = self.run_benchmarks()
+        baseline['results']['lxml/malformed']['peak_memory'] = 1000
+        results = copy.deepcopy(baseline)
+        self.assertEqual(benchmarks.compare(results, baseline), [])
+
+        result = results['results']['lxml/malformed']
+        result['docs_per_sec'] /= 2
+        result['peak_memory'] = 2000
+        regressions = benchmarks.compare(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('lxml/malformed'))
+
+        # A big enough tolerance forgives anything.
+        self.assertEqual(
+            benchmarks.compare(results, baseline, tolerance=100), [])
+
+
+class TestTreeBenchmarks(unittest.TestCase):
+
+    def test_tree_shapes(self):
+        for shape in tree.SHAPES:
+            soup = tree.make_tree(shape, 30)
+            tags = soup.find_all('div')
+            self.assertEqual(
+                [tag['id'] for tag in tags], ["n%d" % i for i in range(30)])
+        deep = tree.make_tree('deep', 30)
+        self.assertEqual(len(deep.find(id='n29').find_parents('div')), 29)
+        balanced = tree.make_tree('balanced', 30)
+        self.assertEqual(len(balanced.find(id='n0').find_all(
+            'div', recursive=False)), tree.FANOUT)
+
+    def test_results(self):
+        results = tree.run_tree(
+            shapes=['flat'], operations=['find_all_name', 'extract_insert'],
+            sizes=[20, 40], repeat=1)
+        self.assertEqual(sorted(results.keys()), [
+            'tree/flat/extract_insert/20', 'tree/flat/extract_insert/40',
+            'tree/flat/find_all_name/20', 'tree/flat/find_all_name/40'])
+        result = results['tree/flat/find_all_name/20']
+        self.assertTrue(result['seconds'] > 0)
+        self.assertFalse('growth' in result)
+
+    def test_operations_leave_the_original_tree_alone(self):
+        soup = tree.make_tree('balanced', 30)
+        markup = soup.decode()
+        tree.run_tree(shapes=['balanced'], sizes=[30], repeat=1)
+        self.assertEqual(tree.make_tree('balanced', 30).decode(), markup)
+
+    def test_failure_is_recorded(self):
+        # decode() recurses once for each level of the tree.
+        size = sys.getrecursionlimit()
+        results = tree.run_tree(
+            shapes=['deep'], operations=['decode'], sizes=[size], repeat=1)
+        self.assertTrue('recursion' in
+                        results['tree/deep/decode/%d' % size]['error'])
+
+
+class TestGarbageBenchmarks(unittest.TestCase):
+
+    def test_results(self):
+        results = benchmarks.run_gc(['html.parser'], scale=0.01, repeat=1)
+        self.assertEqual(sorted(results.keys()), [
+            'gc/html.parser/default', 'gc/html.parser/weak_links'])
+        self.assertTrue(results['gc/html.parser/default']['collected'] > 0)
+        self.assertEqual(
+            results['gc/html.parser/weak_links']['collected'], 0)
+        self.assertTrue('gc/html.parser/weak_links' in
+                        benchmarks.format_results(dict(results=results)))
@@ -0,0 +1,147 @@
+"""Tests of the parse result cache."""
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from bs4 import BeautifulSoup
+from bs4.builder import LXMLTreeBuilder
+from bs4.cache import DiskStorage, MemoryStorage, ParseCache
+from bs4.element import SoupStrainer
+
+DOCUMENT = "<html><head><title>Hi</title></head><body><p class='a'>One</p><p>Two</p></body></html>"
+
+
+class TestParseCache(unittest.TestCase):
+
+    def test_second_parse_comes_from_cache(self):
+        cache = ParseCache()
+        first = BeautifulSoup(DOCUMENT, parse_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        second = BeautifulSoup(DOCUMENT, parse_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(first.decode(), second.decode())
+        self.assertEqual(second.builder, None)
+        self.assertEqual(second.p['class'], 'a')
+        self.assertEqual(second.p.next_sibling.string, 'Two')
+
+    def test_cached_trees_are_independent(self):
+        cache = ParseCache()
+        BeautifulSoup(DOCUMENT, parse_cache=cache)
+        first = BeautifulSoup(DOCUMENT, parse_cache=cache)
+        first.title.string = "Changed"
+        second = BeautifulSoup(DOCUMENT, parse_cache=cache)
+        self.assertEqual(second.title.string, "Hi")
+        self.assertEqual(cache.hits, 2)
+
+    def test_index_strings_works_on_cache_hit(self):
+        cache = ParseCache()
+        BeautifulSoup(DOCUMENT, parse_cache=cache)
+        soup = BeautifulSoup(DOCUMENT, parse_cache=cache, index_strings=True)
+        self.assertEqual(soup.find_all(text="Two"), ["Two"])
+
+    def test_settings_are_part_of_the_key(self):
+        cache = ParseCache()
+        BeautifulSoup(DOCUMENT, parse_cache=cache)
+        BeautifulSoup(DOCUMENT, "html.parser", parse_cache=cache)
+        BeautifulSoup(DOCUMENT, "html.parser", parse_only=SoupStrainer("p"),
+                      parse_cache=cache)
+        BeautifulSoup(DOCUMENT.encode("utf8"), from_encoding="utf8",
+                      parse_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+
+        soup = BeautifulSoup(DOCUMENT, "html.parser",
+                             parse_only=SoupStrainer("p"), parse_cache=cache)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(soup.decode(), '<p class="a">One</p><p>Two</p>')
+
+    def test_regular_expression_strainer_is_cacheable(self):
+        cache = ParseCache()
+        for i in range(2):
+            BeautifulSoup(DOCUMENT, parse_only=SoupStrainer(re.compile("^t")),
+                          parse_cache=cache)
+        self.assertEqual(cache.hits, 1)
+
+    def test_list_of_strainers_is_cacheable(self):
+        cache = ParseCache()
+        for strainer in ([SoupStrainer("p"), SoupStrainer("b")],
+                         [SoupStrainer("p"), SoupStrainer("b")],
+                         [SoupStrainer("p")]):
+            BeautifulSoup(DOCUMENT, parse_only=strainer, parse_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        strainers = [SoupStrainer("p"), SoupStrainer(lambda name: False)]
+        self.assertEqual(cache.key(DOCUMENT, LXMLTreeBuilder(), strainers),
+                         None)
+
+    def test_function_strainer_is_not_cached(self):
+        cache = ParseCache()
+        strainer = SoupStrainer(lambda name: name == 'p')
+        for i in range(2):
+            soup = BeautifulSoup(DOCUMENT, parse_only=strainer,
+                                 parse_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+        self.assertEqual(len(soup.find_all('p')), 2)
+
+    def test_damaged_entry_is_a_miss(self):
+        cache = ParseCache()
+        BeautifulSoup(DOCUMENT, parse_cache=cache)
+        for key in cache.storage.entries:
+            cache.storage.entries[key] = b'BS4T garbage'
+        soup = BeautifulSoup(DOCUMENT, parse_cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        self.assertEqual(soup.title.string, "Hi")
+
+
+class TestMemoryStorage(unittest.TestCase):
+
+    def test_least_recently_used_is_thrown_out(self):
+        storage = MemoryStorage(max_size=10)
+        storage.set('a', b'aaaa')
+        storage.set('b', b'bbbb')
+        storage.get('a')
+        storage.set('c', b'cccc')
+        self.assertEqual(storage.get('b'), None)
+        self.assertEqual(storage.get('a'), b'aaaa')
+        self.assertEqual(storage.get('c'), b'cccc')
+        self.assertEqual(storage.size, 8)
+
+    def test_oversized_document_is_not_stored(self):
+        storage = MemoryStorage(max_size=3)
+        storage.set('a', b'aaaa')
+        self.assertEqual(storage.get('a'), None)
+        self.assertEqual(storage.size, 0)
+
+
+class TestDiskStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_documents_survive_between_caches(self):
+        cache = ParseCache(DiskStorage(self.directory))
+        BeautifulSoup(DOCUMENT, parse_cache=cache)
+
+        cache = ParseCache(DiskStorage(self.directory))
+        soup = BeautifulSoup(DOCUMENT, parse_cache=cache)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(soup.title.string, "Hi")
+
+    def test_least_recently_used_is_deleted(self):
+        storage = DiskStorage(self.directory, max_size=10)
+        storage.set('a', b'aaaa')
+        storage.set('b', b'bbbb')
+        # Make 'a' look older than 'b', then use it.
+        os.utime(os.path.join(self.directory, 'a'), (1, 1))
+        os.utime(os.path.join(self.directory, 'b'), (2, 2))
+        storage.get('a')
+        storage.set('c', b'cccc')
+        self.assertEqual(storage.get('b'), None)
+        self.assertEqual(storage.get('a'), b'aaaa')
+        self.assertEqual(storage.get('c'), b'cccc')
+        self.assertEqual(sorted(os.listdir(self.directory)), ['a', 'c'])
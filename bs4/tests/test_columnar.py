@@ -0,0 +1,170 @@
+"""Tests of frozen documents stored in arrays."""
+
+import gc
+import re
+import sys
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+from bs4.columnar import ColumnarSoup
+from bs4.element import NavigableString, SoupStrainer, Tag
+from bs4.testing import SoupTest
+
+
+class TestColumnarSoup(SoupTest):
+
+    markup = ('<div id="main"><p class="a">One <b>two</b></p>'
+              '<p class="b">Three<!--four--></p></div><p>Five</p><br>')
+
+    def setUp(self):
+        super(TestColumnarSoup, self).setUp()
+        self.original = self.soup(self.markup)
+        self.columnar = ColumnarSoup.from_soup(self.original)
+
+    def test_output_is_identical(self):
+        self.assertEqual(self.columnar.decode(), self.original.decode())
+        self.assertEqual(self.columnar.prettify(), self.original.prettify())
+
+    def test_parse_directly(self):
+        columnar = ColumnarSoup(self.markup, builder=self.default_builder)
+        self.assertEqual(columnar.decode(), self.original.decode())
+        self.assertEqual(columnar.original_encoding,
+                         self.original.original_encoding)
+
+    def test_parse_without_making_objects(self):
+        markup = self.markup + "<pre> </pre>  \n <textarea>\n</textarea>"
+        for builder in (self.default_builder,
+                        builder_registry.lookup('html.parser')()):
+            columnar = ColumnarSoup(markup, builder=builder,
+                                    collect_stats=True)
+            soup = self.soup(markup, builder=builder, collect_stats=True)
+            # Every string is counted, even though none of them became
+            # a NavigableString.
+            self.assertEqual(columnar.parse_stats.counts['strings'],
+                             soup.parse_stats.counts['strings'])
+            frozen = ColumnarSoup.from_soup(soup)
+            for name in ('_kinds', '_names', '_parents', '_text_offsets',
+                         '_attribute_keys', '_text', '_strings'):
+                self.assertEqual(getattr(columnar, name),
+                                 getattr(frozen, name))
+
+    def test_parse_with_options(self):
+        columnar = ColumnarSoup(self.markup, builder=self.default_builder,
+                                parse_only=SoupStrainer("p", "b"),
+                                index_strings=True)
+        self.assertEqual(columnar.decode(), '<p class="b">Three<!--four--></p>')
+
+        html5lib = builder_registry.lookup('html5lib')
+        if html5lib is not None:
+            columnar = ColumnarSoup(self.markup, builder=html5lib())
+            self.assertEqual(columnar.p.get_text(), u"One two")
+
+    def test_find_all(self):
+        self.assertEqual(
+            [p.get_text() for p in self.columnar.find_all('p')],
+            [u"One two", u"Threefour", u"Five"])
+        self.assertEqual(self.columnar.find_all('p', 'b')[0].get_text(),
+                         u"Threefour")
+        self.assertEqual(self.columnar.find_all(id="main")[0].name, "div")
+        self.assertEqual(len(self.columnar.find_all(['b', 'div'])), 2)
+        self.assertEqual(len(self.columnar.find_all(re.compile('^b'))), 3)
+        self.assertEqual(len(self.columnar.find_all('p', limit=2)), 2)
+        self.assertEqual(self.columnar.div.find_all('p', recursive=False),
+                         self.original.div.find_all('p', recursive=False))
+        self.assertEqual(len(self.columnar.find_all('table')), 0)
+
+    def test_find_all_text(self):
+        self.assertEqual(self.columnar.find_all(text=re.compile("^T")),
+                         [u"Three"])
+        found = self.columnar.find_all(
+            text=lambda string: string.parent.name == 'b')
+        self.assertEqual(found, [u"two"])
+        self.assertTrue(isinstance(found[0], NavigableString))
+
+    def test_find_all_with_function(self):
+        self.assertEqual(len(self.columnar.find_all(
+            lambda tag: tag.get('class') == 'a')), 1)
+
+    def test_get_text(self):
+        self.assertEqual(self.columnar.get_text(),
+                         self.original.get_text())
+        self.assertEqual(self.columnar.div.get_text("|", strip=True),
+                         self.original.div.get_text("|", strip=True))
+        self.assertEqual(self.columnar.p.text, u"One two")
+
+    def test_navigation(self):
+        p = self.columnar.find('p', 'b')
+        self.assertEqual(p.parent.name, 'div')
+        self.assertEqual(p.previous_sibling['class'], 'a')
+        self.assertEqual(p.next_sibling, None)
+        self.assertEqual(p.previous_element, u"two")
+        self.assertTrue(p.parent.parent is self.columnar.body)
+        self.assertTrue(isinstance(p, Tag))
+
+        # Every link matches the original document.
+        for columnar, original in zip(
+            self.columnar.recursive_children,
+            self.original.recursive_children):
+            for link in ('parent', 'next_element', 'previous_element',
+                         'next_sibling', 'previous_sibling'):
+                self.assertEqual(getattr(columnar, link),
+                                 getattr(original, link))
+
+    def test_elements_are_only_kept_while_in_use(self):
+        p = self.columnar.find('p')
+        self.assertTrue(p is self.columnar.find('p'))
+        self.assertTrue(p.find('b').parent is p)
+        del p
+        gc.collect()
+        self.assertEqual(len(self.columnar._elements), 0)
+
+    def test_non_ascii_text(self):
+        markup = (u"<p>caf\N{LATIN SMALL LETTER E WITH ACUTE}</p>"
+                  u"<p>\N{SNOWMAN}</p>")
+        columnar = ColumnarSoup(markup, builder=self.default_builder)
+        self.assertEqual([p.string for p in columnar.find_all('p')],
+                         [u"caf\N{LATIN SMALL LETTER E WITH ACUTE}",
+                          u"\N{SNOWMAN}"])
+        self.assertEqual(columnar.get_text(),
+                         u"caf\N{LATIN SMALL LETTER E WITH ACUTE}"
+                         u"\N{SNOWMAN}")
+
+    def test_modification_is_not_allowed(self):
+        self.assertRaises(TypeError, self.columnar.p.extract)
+        self.assertRaises(TypeError, self.columnar.p.append, "foo")
+        self.assertRaises(TypeError, self.columnar.p.__setitem__, 'id', '1')
+        self.assertRaises(TypeError, self.columnar.b.string.extract)
+
+    def test_clone(self):
+        copied = self.columnar.find_all('p')[1].clone()
+        self.assertEqual(copied.__class__, Tag)
+        self.assertEqual(copied.parent, None)
+        self.assertEqual(copied.decode(), '<p class="b">Three<!--four--></p>')
+        copied.append("five")
+        self.assertEqual(copied.contents[1].next_element, copied.contents[2])
+
+        soup = self.columnar.clone()
+        self.assertEqual(soup.__class__, BeautifulSoup)
+        self.assertEqual(soup.decode(), self.original.decode())
+        self.assertEqual(soup.previous_element, soup.br)
+        soup.b.extract()
+        self.assertEqual(self.columnar.b.string, "two")
+
+    def test_uses_much_less_memory(self):
+        markup = "<table>%s</table>" % "".join(
+            '<tr><td class="c%d">%d</td><td>text</td></tr>' % (i % 3, i)
+            for i in range(500))
+        soup = self.soup(markup)
+        tree_size = sys.getsizeof(soup) + sys.getsizeof(soup.__dict__)
+        for element in soup.recursive_children:
+            tree_size += sys.getsizeof(element)
+            tree_size += sys.getsizeof(element.__dict__)
+        columnar = ColumnarSoup.from_soup(soup)
+        self.assertTrue(sys.getsizeof(columnar) * 10 < tree_size)
+
+    def test_deep_tree(self):
+        soup = self.soup("<a>" * 3000 + "text",
+                         builder=builder_registry.lookup('html.parser')())
+        columnar = ColumnarSoup.from_soup(soup)
+        self.assertEqual(columnar.find(text="text").parent.name, 'a')
+        self.assertEqual(len(columnar.find_all('a')), 3000)
+        self.assertEqual(columnar.get_text(), "text")
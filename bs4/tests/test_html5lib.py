@@ -22,6 +22,31 @@ class TestHTML5Builder(TestLXMLBuilder):
         self.assertEquals(
             soup.decode(), self.document_for(markup))
 
+    def test_soupstrainer_keeps_outermost_matches(self):
+        # See test_soupstrainer.
+        pass
+
+    def test_parsing_doesnt_bump_every_ancestor(self):
+        # The tree is built without noting each change on the way, so
+        # only the document's version changes during the parse.
+        soup = self.soup("<div><p><b>x</b></p></div>")
+        self.assertEqual(soup.div.version, 0)
+        self.assertTrue(soup.version > 0)
+        soup.b.append("y")
+        self.assertTrue(soup.div.version > 0)
+
+    def test_stats_dont_count_events_html5lib_doesnt_send(self):
+        # html5lib builds the tree without calling the methods that
+        # are counted, so the counts and the tree time aren't known.
+        soup = self.soup("<p>foo<b>bar</b></p>", collect_stats=True)
+        stats = soup.parse_stats
+        self.assertEqual(stats.counts['start_tags'], None)
+        self.assertEqual(stats.counts['strings'], None)
+        self.assertEqual(stats.counts['reparses'], 0)
+        self.assertEqual(stats.times['tree'], None)
+        self.assertTrue(stats.times['parser'] > 0)
+        self.assertTrue('start_tags' in str(stats))
+
     def test_bare_string(self):
         # A bare string is turned into some kind of HTML document or
         # fragment recognizable as the original string.
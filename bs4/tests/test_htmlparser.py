@@ -1,4 +1,5 @@
 from HTMLParser import HTMLParseError
+from bs4 import BeautifulSoup
 from bs4.builder import HTMLParserTreeBuilder
 from bs4.element import CData
 from test_lxml import (
@@ -30,6 +31,10 @@ class TestHTMLParserTreeBuilder(TestLXMLBuilder):
         self.assertEquals(string, "foobar")
         self.assertTrue(isinstance(string, CData))
 
+    def test_hexadecimal_character_reference(self):
+        soup = self.soup("<p>&#x2014;&#X41;&#65;</p>")
+        self.assertEquals(soup.p.string, u"\N{EM DASH}AA")
+
     # These are tests that could be 'fixed' by improving the
     # HTMLParserTreeBuilder, but I don't think it's worth it. Users
     # will have fewer headaches if they use one of the other tree
@@ -104,6 +109,18 @@ class TestHTMLParserTreeBuilder(TestLXMLBuilder):
                           ['if (i < 2) { alert("<b>foo',
                            '"); }'])
 
+    def test_tag_keeps_the_attributes_dict_it_was_given(self):
+        given = []
+        class Soup(BeautifulSoup):
+            def handle_starttag(self, name, attrs):
+                given.append(attrs)
+                return BeautifulSoup.handle_starttag(self, name, attrs)
+        soup = Soup('<a id="1"></a><b id="2"></b>',
+                    builder=self.default_builder)
+        self.assertTrue(soup.a._attrs is given[0])
+        # The names were interned by the builder.
+        self.assertTrue(list(soup.a._attrs)[0] is list(soup.b._attrs)[0])
+
     # Namespaced doctypes cause an HTMLParseError
     def test_namespaced_system_doctype(self):
         self.assertRaises(HTMLParseError, self._test_doctype,
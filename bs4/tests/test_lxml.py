@@ -307,6 +307,54 @@ class TestLXMLBuilder(SoupTest):
                          parse_only=strainer)
         self.assertEquals(soup.decode(), "<b>bold</b>")
 
+    def test_soupstrainer_keeps_outermost_matches(self):
+        markup = ('<div><p class="x">1<b>2</b><!--c--></p>'
+                  '<p>3<p>4</p></p></div>tail<b>5</b>')
+        def parse(*args, **kwargs):
+            return self.soup(
+                markup, parse_only=SoupStrainer(*args, **kwargs)).decode()
+        self.assertEquals(parse("b"), "<b>2</b><b>5</b>")
+        self.assertEquals(parse(["b", "p"]), parse(re.compile("^[bp]$")))
+        self.assertEquals(parse("p", "x"), '<p class="x">1<b>2</b><!--c--></p>')
+        self.assertEquals(parse(lambda name, attrs: name == "b"), parse("b"))
+        self.assertEquals(parse("nosuchtag"), "")
+        self.assertEquals(parse(text=re.compile("[35]")), "35")
+
+
+class TestLXMLParseOnly(SoupTest):
+
+    def test_left_out_events_are_not_passed_on(self):
+        markup = "<div><p>Some <i>text</i></p><b>bold</b><p>more</p></div>"
+        soup = self.soup(markup, parse_only=SoupStrainer("b"),
+                         collect_stats=True)
+        self.assertEquals(soup.decode(), "<b>bold</b>")
+        counts = soup.parse_stats.counts
+        self.assertEquals((counts['start_tags'], counts['data']), (1, 1))
+
+        # A strainer that needs the whole tag works the same way.
+        soup = self.soup(markup, parse_only=SoupStrainer(
+                lambda name, attrs: name == "i"), collect_stats=True)
+        self.assertEquals(soup.decode(), "<i>text</i>")
+        self.assertEquals(soup.parse_stats.counts['start_tags'], 1)
+
+    def test_strings_are_still_passed_on(self):
+        soup = self.soup("<p>one <b>two</b></p>",
+                         parse_only=SoupStrainer(text="one "))
+        self.assertEquals(soup.decode(), "one ")
+
+    def test_list_of_strainers(self):
+        markup = "<div><p>Some <i>text</i></p><b>bold</b><p>more</p></div>"
+        soup = self.soup(markup, parse_only=[
+                SoupStrainer("b"), SoupStrainer("i")], collect_stats=True)
+        self.assertEquals(soup.decode(), "<i>text</i><b>bold</b>")
+        counts = soup.parse_stats.counts
+        self.assertEquals((counts['start_tags'], counts['data']), (2, 2))
+
+        # Left-out tags still separate the strings around them.
+        soup = self.soup(markup, parse_only=[
+                SoupStrainer("i"), SoupStrainer(text="more")])
+        self.assertEquals(soup.decode(), "<i>text</i>more")
+
 
 class TestLXMLBuilderInvalidMarkup(SoupTest):
     """Tests of invalid markup for the LXML tree builder.
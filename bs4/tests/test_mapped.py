@@ -0,0 +1,132 @@
+"""Tests of read-only documents backed by the binary format."""
+
+import os
+import re
+import tempfile
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+from bs4.element import NavigableString, Tag
+from bs4.mapped import MappedSoup
+from bs4.testing import SoupTest
+
+
+class TestMappedSoup(SoupTest):
+
+    def setUp(self):
+        super(TestMappedSoup, self).setUp()
+        self.original = self.soup(
+            '<div id="main"><p class="a">One <b>two</b></p>'
+            '<p class="b">Three<!--four--></p></div><p>Five</p>')
+        self.mapped = MappedSoup.loads(self.original.dumps())
+
+    def test_output_is_identical(self):
+        self.assertEqual(self.mapped.decode(), self.original.decode())
+        self.assertEqual(self.mapped.prettify(), self.original.prettify())
+
+    def test_elements_are_only_created_when_touched(self):
+        self.assertEqual(list(self.mapped._elements.keys()), [0])
+        self.mapped.find_all('b')
+        self.assertEqual(len(self.mapped._elements), 2)
+
+    def test_find_all(self):
+        self.assertEqual(
+            [p.get_text() for p in self.mapped.find_all('p')],
+            [u"One two", u"Threefour", u"Five"])
+        self.assertEqual(self.mapped.find_all('p', 'b')[0].get_text(),
+                         u"Threefour")
+        self.assertEqual(self.mapped.find_all(id="main")[0].name, "div")
+        self.assertEqual(len(self.mapped.find_all(['b', 'div'])), 2)
+        self.assertEqual(len(self.mapped.find_all('p', limit=2)), 2)
+        self.assertEqual(self.mapped.div.find_all('p', recursive=False),
+                         self.original.div.find_all('p', recursive=False))
+
+    def test_find_all_text(self):
+        self.assertEqual(self.mapped.find_all(text=re.compile("^T")),
+                         [u"Three"])
+        found = self.mapped.find_all(
+            text=lambda string: string.parent.name == 'b')
+        self.assertEqual(found, [u"two"])
+        self.assertTrue(isinstance(found[0], NavigableString))
+
+    def test_find_all_with_function(self):
+        self.assertEqual(
+            len(self.mapped.find_all(lambda tag: tag.get('class') == 'a')),
+            1)
+
+    def test_get_text(self):
+        self.assertEqual(self.mapped.get_text(),
+                         self.original.get_text())
+        self.assertEqual(self.mapped.div.get_text("|", strip=True),
+                         self.original.div.get_text("|", strip=True))
+        self.assertEqual(self.mapped.p.text, u"One two")
+
+    def test_navigation(self):
+        p = self.mapped.find('p', 'b')
+        self.assertEqual(p.parent.name, 'div')
+        self.assertEqual(p.previous_sibling['class'], 'a')
+        self.assertEqual(p.next_sibling, None)
+        self.assertEqual(p.parent.next_sibling.name, 'p')
+        self.assertEqual(p.previous_element, u"two")
+        self.assertEqual(p.next_element, u"Three")
+        self.assertTrue(p.parent.parent is self.mapped.body)
+        self.assertTrue(isinstance(p, Tag))
+
+        # Every link matches the original document.
+        for mapped, original in zip(
+            self.mapped.recursive_children,
+            self.original.recursive_children):
+            for link in ('parent', 'next_element', 'previous_element',
+                         'next_sibling', 'previous_sibling'):
+                self.assertEqual(getattr(mapped, link),
+                                 getattr(original, link))
+
+    def test_elements_keep_their_identity(self):
+        self.assertTrue(self.mapped.p is self.mapped.find('p'))
+        self.assertTrue(self.mapped.b.parent is self.mapped.p)
+
+    def test_document_attributes(self):
+        self.assertEqual(self.mapped.is_xml, self.original.is_xml)
+        self.assertEqual(self.mapped.original_encoding,
+                         self.original.original_encoding)
+
+    def test_modification_is_not_allowed(self):
+        self.assertRaises(TypeError, self.mapped.p.extract)
+        self.assertRaises(TypeError, self.mapped.p.append, "foo")
+        self.assertRaises(TypeError, self.mapped.p.__setitem__, 'id', '1')
+        self.assertRaises(TypeError, self.mapped.p.b.string.extract)
+        self.assertRaises(TypeError, setattr, self.mapped.b, 'string', 'x')
+
+    def test_clone(self):
+        copied = self.mapped.find_all('p')[1].clone()
+        self.assertEqual(copied.__class__, Tag)
+        self.assertEqual(copied.parent, None)
+        self.assertEqual(copied.decode(), '<p class="b">Three<!--four--></p>')
+        copied.append("five")
+        self.assertEqual(copied.contents[1].next_element, copied.contents[2])
+
+        soup = self.mapped.clone()
+        self.assertEqual(soup.__class__, BeautifulSoup)
+        soup.b.extract()
+        self.assertEqual(self.mapped.b.string, "two")
+
+    def test_memory_mapped_file(self):
+        handle, path = tempfile.mkstemp()
+        try:
+            os.write(handle, self.original.dumps())
+            os.close(handle)
+            mapped = MappedSoup(path)
+            self.assertEqual(mapped.decode(), self.original.decode())
+            mapped.close()
+        finally:
+            os.remove(path)
+
+    def test_dumps_of_mapped_soup(self):
+        loaded = BeautifulSoup.loads(self.mapped.dumps())
+        self.assertEqual(loaded.decode(), self.original.decode())
+
+    def test_deep_tree(self):
+        soup = self.soup("<a>" * 3000 + "text",
+                         builder=builder_registry.lookup('html.parser')())
+        mapped = MappedSoup.loads(soup.dumps())
+        self.assertEqual(mapped.find(text="text").parent.name, 'a')
+        self.assertEqual(len(mapped.find_all('a')), 3000)
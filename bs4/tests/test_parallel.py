@@ -0,0 +1,54 @@
+"""Tests of parsing documents in worker processes."""
+
+import unittest
+from bs4.element import SoupStrainer
+from bs4.parallel import parse_many
+
+
+def get_title(soup):
+    return soup.title.string
+
+
+def get_text(soup):
+    return soup.get_text()
+
+
+class TestParseMany(unittest.TestCase):
+
+    def documents(self, count):
+        return ["<html><head><title>%d</title></head></html>" % i
+                for i in range(count)]
+
+    def test_results_come_back_in_order(self):
+        results = list(parse_many(
+            self.documents(20), extract=get_title, workers=2))
+        self.assertEqual(results, [str(i) for i in range(20)])
+
+    def test_chunks_and_backpressure(self):
+        # Results still come back in order when documents are sent out
+        # in chunks and only a few chunks can be in flight.
+        documents = iter(self.documents(25))
+        results = list(parse_many(
+            documents, extract=get_title, workers=2, chunksize=3,
+            max_pending=1))
+        self.assertEqual(results, [str(i) for i in range(25)])
+
+    def test_whole_soup_is_returned_without_extractor(self):
+        soups = list(parse_many(["<b>foo</b>"], workers=1))
+        self.assertEqual(soups[0].b.string, "foo")
+
+    def test_parse_options_are_passed_to_workers(self):
+        results = list(parse_many(
+            ["<a>no</a><b>yes</b>"], features="html.parser",
+            extract=get_text, workers=1, parse_only=SoupStrainer("b")))
+        self.assertEqual(results, ["yes"])
+
+    def test_unknown_features(self):
+        self.assertRaises(
+            ValueError, list,
+            parse_many(["<b>foo</b>"], features="no-such-parser", workers=1))
+
+    def test_errors_in_extractor_are_raised(self):
+        self.assertRaises(
+            AttributeError, list,
+            parse_many(["<b>foo</b>"], extract=get_title, workers=1))
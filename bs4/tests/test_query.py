@@ -0,0 +1,119 @@
+"""Tests of queries over ColumnarSoup documents."""
+
+import re
+import unittest
+from bs4 import query
+from bs4.columnar import ColumnarSoup
+from bs4.query import Batch, Query
+from bs4.testing import SoupTest
+
+
+class TestQuery(SoupTest):
+    """Run queries in pure Python, whether or not NumPy is installed."""
+
+    use_numpy = False
+
+    markup = ('<table class="results" id="t%(i)d">'
+              '<tr class="odd"><td>a</td></tr><tr><td>b</td></tr></table>'
+              '<tr class="odd"><td>x</td></tr>'
+              '<div><input disabled="disabled"><a href="/x%(i)d">l</a></div>')
+
+    def setUp(self):
+        super(TestQuery, self).setUp()
+        self.numpy = query.numpy
+        if not self.use_numpy:
+            query.numpy = None
+        self.documents = [ColumnarSoup(self.markup % dict(i=i),
+                                       builder=self.default_builder)
+                          for i in range(3)]
+
+    def tearDown(self):
+        query.numpy = self.numpy
+
+    def assertFinds(self, query, *args, **kwargs):
+        """Make sure a Query finds the same tags in every document as
+        find_all() does."""
+        for document, numbers in zip(
+            self.documents, query.run(self.documents)):
+            found = [document.element(number) for number in numbers]
+            expected = document.find_all(*args, **kwargs)
+            self.assertEqual(len(found), len(expected))
+            for tag, expected_tag in zip(found, expected):
+                self.assertTrue(tag is expected_tag)
+
+    def test_name(self):
+        self.assertFinds(Query('tr'), 'tr')
+        self.assertFinds(Query(['td', 'a']), ['td', 'a'])
+        self.assertFinds(Query(re.compile('^t[dr]$')), re.compile('^t[dr]$'))
+        self.assertFinds(Query('nosuchtag'), 'nosuchtag')
+
+    def test_attributes(self):
+        self.assertFinds(Query('tr', 'odd'), 'tr', 'odd')
+        self.assertFinds(Query(href=re.compile('x1')),
+                         href=re.compile('x1'))
+        self.assertFinds(Query(id=True), id=True)
+        self.assertFinds(Query('tr', {'class': None}), 'tr', {'class': None})
+        self.assertFinds(Query(id=lambda value: value and value[-1] == '2'),
+                         id=lambda value: value and value[-1] == '2')
+        self.assertFinds(Query('input', disabled='disabled', id=None),
+                         'input', disabled='disabled', id=None)
+
+    def test_within(self):
+        document = self.documents[0]
+        results = Query('tr', within=Query('table', 'results')).run(
+            self.documents)
+        self.assertEqual(
+            [document.element(number) for number in results[0]],
+            document.table.find_all('tr'))
+        self.assertEqual(len(Query('td', within='tr').run(
+            self.documents)[1]), 3)
+        # The enclosing tag itself isn't inside itself.
+        self.assertEqual(
+            len(Query('tr', within='tr').run(self.documents)[2]), 0)
+
+        # Queries can be nested.
+        unmarked = Query('td', within=Query('tr', {'class': None},
+                                            within='table'))
+        self.assertEqual(
+            [document.element(number).string
+             for number in unmarked.run(self.documents)[0]], ["b"])
+
+    def test_batch(self):
+        batch = Batch(self.documents)
+        links = [[document.element(number) for number in numbers]
+                 for document, numbers in zip(
+                self.documents, Query('a').run(batch))]
+        self.assertEqual(links, [[document.a] for document in self.documents])
+        self.assertEqual([len(numbers) for numbers in
+                          Query(href="/x2").run(batch)], [0, 0, 1])
+        self.assertEqual(Query('a').run([]), [])
+
+    def test_documents_that_differ(self):
+        documents = [
+            ColumnarSoup("<p>one</p>", builder=self.default_builder),
+            ColumnarSoup('<b id="1">one</b><p id="2">two</p><p>three</p>',
+                         builder=self.default_builder),
+            ColumnarSoup("", builder=self.default_builder),
+            ]
+        found = [[document.element(number).get_text()
+                  for number in numbers]
+                 for document, numbers in zip(
+                documents, Query('p', id=True).run(documents))]
+        self.assertEqual(found, [[], ["two"], []])
+
+    def test_find_all(self):
+        document = self.documents[1]
+        self.assertEqual(Query('td').find_all(document),
+                         document.find_all('td'))
+        # The document itself never matches.
+        self.assertEqual(len(Query().find_all(document)),
+                         len(document.find_all(True)))
+
+
+class TestQueryWithNumPy(TestQuery):
+    """Run the same queries with NumPy."""
+
+    use_numpy = True
+
+TestQueryWithNumPy = unittest.skipIf(
+    query.numpy is None, "NumPy is not installed.")(TestQueryWithNumPy)
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 """Tests of Beautiful Soup as a whole."""
 
+import gc
+import pickle
+import re
 import unittest
-from bs4.element import SoupStrainer
+import weakref
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLParserTreeBuilder
+from bs4.element import Comment, SoupStrainer, Tag
 from bs4.dammit import EntitySubstitution, UnicodeDammit
 from bs4.testing import SoupTest
 
@@ -15,6 +21,254 @@ class TestSelectiveParsing(SoupTest):
         soup = self.soup(markup, parse_only=strainer)
         self.assertEquals(soup.encode(), b"<b>Yes</b><b>Yes <c>Yes</c></b>")
 
+    def test_parse_with_list_of_soupstrainers(self):
+        markup = ('<html><head><title>Title</title><meta name="a" />'
+                  '<script>x</script></head><body><div><article>'
+                  '<p>Yes</p></article><p>No</p></div></body></html>')
+        strainers = [SoupStrainer("title"), SoupStrainer("meta"),
+                     SoupStrainer("article")]
+        for builder in self.default_builder, HTMLParserTreeBuilder():
+            soup = self.soup(markup, builder=builder, parse_only=strainers)
+            self.assertEquals(
+                soup.decode(), '<title>Title</title><meta name="a" />'
+                '<article><p>Yes</p></article>')
+
+    def test_list_of_soupstrainers_with_text(self):
+        markup = "<p>one</p><p id='x'>two</p><b>three</b>"
+        soup = self.soup(markup, parse_only=(
+                SoupStrainer(id="x"), SoupStrainer(text=re.compile("e$"))))
+        self.assertEquals(soup.decode(), 'one<p id="x">two</p>three')
+        # An empty list is the same as no strainer at all.
+        self.assertEquals(self.soup(markup, parse_only=[]).decode(),
+                          self.soup(markup).decode())
+
+
+class TestParseStats(SoupTest):
+
+    def test_stats_are_off_by_default(self):
+        soup = self.soup("<b>foo</b>")
+        self.assertEqual(soup.parse_stats, None)
+
+    def test_events_are_counted(self):
+        soup = self.soup("<p>foo<b>bar</b><br></p>", collect_stats=True)
+        counts = soup.parse_stats.counts
+        self.assertEqual(counts['start_tags'], len(soup.find_all(True)))
+        self.assertEqual(counts['tags'], len(soup.find_all(True)))
+        self.assertEqual(counts['strings'], len(soup.find_all(text=True)))
+        self.assertEqual(counts['reparses'], 0)
+        self.assertTrue(counts['end_tags'] > 0)
+        self.assertTrue(counts['data'] > 0)
+
+    def test_times_are_recorded(self):
+        soup = self.soup(b"<p>foo<b>bar</b></p>", collect_stats=True)
+        times = soup.parse_stats.times
+        for phase in ['encoding', 'parser', 'tree', 'total']:
+            self.assertTrue(times[phase] >= 0)
+        self.assertTrue(times['total'] >= times['tree'])
+        self.assertTrue('start_tags' in str(soup.parse_stats))
+
+    def test_instrumentation_is_removed_after_parsing(self):
+        soup = self.soup("<b>foo</b>", collect_stats=True)
+        self.assertFalse('handle_starttag' in soup.__dict__)
+        self.assertFalse('_feed' in soup.__dict__)
+        pickle.loads(pickle.dumps(soup))
+
+    def test_instrumentation_is_removed_if_parsing_fails(self):
+        class BrokenSoup(BeautifulSoup):
+            def handle_data(self, data):
+                raise ValueError(data)
+        soup = BrokenSoup.__new__(BrokenSoup)
+        self.assertRaises(ValueError, soup.__init__, "<b>foo</b>",
+                          builder=self.default_builder, collect_stats=True)
+        for name in ('handle_starttag', 'endData', '_feed'):
+            self.assertFalse(name in soup.__dict__)
+        self.assertEqual(soup.builder, None)
+        self.assertTrue(soup.parse_stats.times['total'] > 0)
+
+
+class TestLateMetaCharset(SoupTest):
+    """Test documents whose <meta> tag declares an encoding."""
+
+    META = (b'<meta http-equiv="Content-Type" '
+            b'content="text/html; charset=koi8-r">')
+
+    # The same declaration, written so that only a parser can read it.
+    ESCAPED_META = (b'<meta http-equiv="Content-Type" '
+                    b'content="text/html; charset&#61;koi8-r">')
+
+    def document(self, body, padding=0, meta=META):
+        return (b'<html><head><!--' + b'x' * padding + b'-->' + meta
+                + b'</head><body>' + body + b'</body></html>')
+
+    def test_early_meta_tag_is_used_without_parsing_twice(self):
+        before = BeautifulSoup.reparse_count
+        soup = self.soup(self.document(b'\xc1\xc2'), collect_stats=True)
+        self.assertEqual(soup.body.string, u'\u0430\u0431')
+        self.assertEqual(soup.original_encoding, 'koi8-r')
+        self.assertEqual(soup.parse_stats.counts['reparses'], 0)
+        self.assertEqual(BeautifulSoup.reparse_count, before)
+
+    def test_late_meta_tag_is_used_without_parsing_twice(self):
+        before = BeautifulSoup.reparse_count
+        soup = self.soup(self.document(b'\xc1\xc2', 4096),
+                         collect_stats=True)
+        self.assertEqual(soup.body.string, u'\u0430\u0431')
+        self.assertEqual(soup.original_encoding, 'koi8-r')
+        self.assertEqual(soup.parse_stats.counts['reparses'], 0)
+        self.assertEqual(BeautifulSoup.reparse_count, before)
+
+    def test_late_meta_tag_with_parse_only(self):
+        # The <meta> tag isn't part of the tree, but its encoding is
+        # still used.
+        soup = self.soup(self.document(b'\xc1\xc2', 4096),
+                         parse_only=SoupStrainer("body"))
+        self.assertEqual(soup.body.string, u'\u0430\u0431')
+        self.assertEqual(soup.meta, None)
+
+    def test_meta_tag_only_the_parser_understands_means_parsing_twice(self):
+        before = BeautifulSoup.reparse_count
+        markup = self.document(b'\xc1\xc2', meta=self.ESCAPED_META)
+        soup = self.soup(markup, collect_stats=True)
+        self.assertEqual(soup.body.string, u'\u0430\u0431')
+        self.assertEqual(soup.original_encoding, 'koi8-r')
+        self.assertEqual(soup.declared_html_encoding, 'koi8-r')
+        self.assertEqual(soup.parse_stats.counts['reparses'], 1)
+        self.assertEqual(BeautifulSoup.reparse_count, before + 1)
+        # The tree only contains the results of the second parse.
+        self.assertEqual(len(soup.find_all('meta')), 1)
+        self.assertTrue(soup.meta.contains_substitutions)
+
+    def test_meta_tag_that_changes_nothing(self):
+        # An ASCII document means the same thing in any of these
+        # encodings, so there's no need to parse it again.
+        before = BeautifulSoup.reparse_count
+        markup = self.document(b'ab', meta=self.ESCAPED_META)
+        soup = self.soup(markup)
+        self.assertEqual(soup.body.string, u'ab')
+        self.assertEqual(soup.declared_html_encoding, 'koi8-r')
+        self.assertEqual(BeautifulSoup.reparse_count, before)
+
+    def test_unicode_document_is_not_parsed_twice(self):
+        before = BeautifulSoup.reparse_count
+        markup = self.document(b'ab', meta=self.ESCAPED_META)
+        soup = self.soup(markup.decode("ascii"))
+        self.assertEqual(soup.declared_html_encoding, None)
+        self.assertEqual(BeautifulSoup.reparse_count, before)
+
+
+class TestClose(SoupTest):
+
+    def test_close_frees_the_whole_document(self):
+        soup = self.soup(
+            "<html><body><p>foo<b>bar</b></p>baz</body></html>",
+            index_strings=True)
+        soup.find_all(text="bar")
+        soup.body.p
+        references = map(weakref.ref, [soup.body, soup.p, soup.b.string])
+        gc.disable()
+        try:
+            soup.close()
+            self.assertEqual([ref() for ref in references],
+                             [None] * len(references))
+        finally:
+            gc.enable()
+        self.assertEqual(soup.contents, [])
+        self.assertEqual(soup.next_element, None)
+        self.assertEqual(soup.previous_element, None)
+        self.assertEqual(soup.find_all(text="bar"), [])
+
+    def test_context_manager(self):
+        with self.soup("<p>foo</p>") as soup:
+            p = soup.p
+            self.assertEqual(p.string, "foo")
+        self.assertEqual(soup.contents, [])
+        self.assertFalse(hasattr(p, "contents"))
+
+
+class TestWeakLinks(SoupTest):
+
+    markup = "<div><p>foo<b>bar</b></p><p id='2'>baz<!--comment--></p></div>"
+
+    def test_tree_is_the_same(self):
+        strong = self.soup(self.markup)
+        weak = self.soup(self.markup, weak_links=True)
+        self.assertEqual(weak.decode(), strong.decode())
+        b = weak.b
+        self.assertEqual(b.parent.name, "p")
+        self.assertEqual(b.previous_element, "foo")
+        self.assertEqual(b.previous_sibling, "foo")
+        self.assertEqual([tag.name for tag in b.find_parents()],
+                         [tag.name for tag in strong.b.find_parents()])
+        self.assertEqual(weak.find(text="comment").find_previous("b"), b)
+        self.assertTrue(isinstance(b, Tag))
+        self.assertTrue(isinstance(weak.find(text="comment"), Comment))
+
+    def test_dropped_document_is_freed_without_garbage_collection(self):
+        collected = {}
+        for weak_links in (False, True):
+            gc.collect()
+            gc.disable()
+            try:
+                soup = BeautifulSoup(
+                    self.markup, "html.parser", weak_links=weak_links)
+                reference = weakref.ref(soup.b)
+                del soup
+                freed = reference() is None
+                collected[weak_links] = gc.collect()
+            finally:
+                gc.enable()
+            self.assertEqual(freed, weak_links)
+        # An ordinary tree leaves every one of its elements for the
+        # garbage collector; a tree with weak links leaves it nothing.
+        self.assertTrue(collected[False] > 10)
+        self.assertEqual(collected[True], 0)
+
+    def test_element_does_not_keep_document_alive(self):
+        b = self.soup(self.markup, weak_links=True).b
+        self.assertEqual(b.parent, None)
+        self.assertEqual(b.string, "bar")
+
+    def test_modifications(self):
+        soup = self.soup(self.markup, weak_links=True)
+        new = self.soup("<i>new</i>").i
+        soup.b.append(new)
+        self.assertEqual(new.parent, soup.b)
+        self.assertEqual(new.string.parent, new)
+        soup.p.insert(0, "first")
+        self.assertEqual(soup.p.contents[0].next_element.previous_element,
+                         soup.p.contents[0])
+        p2 = soup.find(id="2").extract()
+        self.assertEqual(p2.parent, None)
+        soup.div.insert(0, p2)
+        self.assertEqual(soup.div.decode(),
+            '<div><p id="2">baz<!--comment--></p>'
+            '<p>firstfoo<b>bar<i>new</i></b></p></div>')
+
+        gc.disable()
+        try:
+            reference = weakref.ref(new)
+            del soup, new, p2
+            self.assertEqual(reference(), None)
+        finally:
+            gc.enable()
+
+    def test_copies_have_weak_links(self):
+        soup = self.soup(self.markup, weak_links=True)
+        copiers = [lambda: soup.clone(), lambda: soup.div.clone(),
+                   lambda: pickle.loads(pickle.dumps(soup, 2))]
+        for copier in copiers:
+            copy = copier()
+            self.assertEqual(copy.b.decode(), soup.b.decode())
+            b = copy.b
+            self.assertEqual(b.parent.name, "p")
+            gc.disable()
+            try:
+                reference = weakref.ref(b)
+                del copy, b
+                self.assertEqual(reference(), None)
+            finally:
+                gc.enable()
+
 
 class TestEntitySubstitution(unittest.TestCase):
     """Standalone tests of the EntitySubstitution class."""
@@ -100,6 +354,14 @@ class TestUnicodeDammit(unittest.TestCase):
         self.assertEquals(
             dammit.unicode_markup, "<foo>&lsquo;&rsquo;&ldquo;&rdquo;</foo>")
 
+    def test_meta_charset_is_found_anywhere(self):
+        meta = b'<meta charset="koi8-r">'
+        dammit = UnicodeDammit(meta + b'\xc1', isHTML=True)
+        self.assertEquals(dammit.declared_html_encoding, 'koi8-r')
+        dammit = UnicodeDammit(b' ' * 4096 + meta + b'\xc1', isHTML=True)
+        self.assertEquals(dammit.declared_html_encoding, 'koi8-r')
+        self.assertEquals(dammit.unicode_markup[-1], u'\u0430')
+
     def test_detect_utf8(self):
         utf8 = b"\xc3\xa9"
         dammit = UnicodeDammit(utf8)
@@ -10,8 +10,11 @@ methods tested here.
 """
 
 import copy
+import gc
 import pickle
 import re
+import sys
+import weakref
 from bs4 import BeautifulSoup
 from bs4.builder import builder_registry
 from bs4.element import CData, SoupStrainer, Tag
@@ -84,6 +87,61 @@ class TestFindAll(TreeTest):
         self.assertSelects(
             soup.find_all('a', limit=0), ["1", "2", "3", "4", "5"])
 
+class TestFindAllText(TreeTest):
+    """Test the shortcut taken when searching only for strings."""
+
+    def test_text_search_ignores_name_and_attributes(self):
+        soup = self.soup("<a>foo</a><b id='x'>foo</b>")
+        self.assertEqual(soup.find_all('a', text="foo"), [u"foo", u"foo"])
+        self.assertEqual(soup.find_all(id='x', text="foo"),
+                         [u"foo", u"foo"])
+
+    def test_text_search_with_callable(self):
+        soup = self.soup("<a>foo</a><b>bar</b><c>baz</c>")
+        self.assertEqual(soup.find_all(text=lambda s: s.startswith('b')),
+                         [u"bar", u"baz"])
+
+    def test_text_search_with_limit(self):
+        soup = self.soup("<a>foo</a><b>bar</b><c>baz</c>")
+        self.assertEqual(soup.find_all(text=True, limit=2), [u"foo", u"bar"])
+        self.assertEqual(soup.find(text=re.compile("^ba")), u"bar")
+
+    def test_text_search_result_source(self):
+        soup = self.soup("<a>foo</a>")
+        results = soup.find_all(text="foo")
+        self.assertEqual(results.source.text, "foo")
+
+    def test_text_search_with_string_index(self):
+        soup = self.soup("<a>foo</a><b>bar</b>", index_strings=True)
+        self.assertEqual(soup.find_all(text=re.compile("o")), [u"foo"])
+
+        # The index is rebuilt when the tree changes.
+        soup.b.append("boo")
+        self.assertEqual(soup.find_all(text=re.compile("o")),
+                         [u"foo", u"boo"])
+        soup.a.extract()
+        self.assertEqual(soup.find_all(text=re.compile("o")), [u"boo"])
+
+    def test_search_text(self):
+        soup = self.soup("<p>The <b>quick</b> brown fox</p>")
+        matches = list(soup.p.search_text("e q.*k b"))
+        self.assertEqual(len(matches), 1)
+        match, string = matches[0]
+        self.assertEqual(match.group(0), "e quick b")
+        self.assertEqual(string, u"The ")
+        self.assertEqual(string.parent.name, "p")
+
+    def test_string_index(self):
+        soup = self.soup("<p>ab<b>cd</b>ef</p>")
+        index = soup.p.string_index
+        self.assertEqual(index.text, u"abcdef")
+        self.assertEqual(index.offsets, [0, 2, 4])
+        self.assertEqual(index.string_at(0), u"ab")
+        self.assertEqual(index.string_at(3), u"cd")
+        self.assertEqual(index.string_at(5), u"ef")
+        self.assertRaises(IndexError, index.string_at, 6)
+
+
 class TestFindAllByName(TreeTest):
     """Test ways of finding tags by tag name."""
 
@@ -139,6 +197,68 @@ class TestFindAllByName(TreeTest):
             tree.find_all(id_matches_name), ["Match 1.", "Match 2."])
 
 
+class TestFindAllDepthAndPruning(TreeTest):
+    """Test ways of limiting how much of the tree find_all() looks at."""
+
+    def setUp(self):
+        super(TreeTest, self).setUp()
+        self.tree = self.soup("""<div id="1"><div id="2"><div id="3">
+                                 <div id="4"></div></div></div></div>
+                                 <aside><div id="5"></div></aside>
+                                 <div id="6"><aside><div id="7"></div>
+                                 </aside></div>""")
+        self.body = self.tree.body
+
+    def test_max_depth(self):
+        self.assertSelectsIDs(
+            self.body.find_all('div', max_depth=1), ['1', '6'])
+        self.assertSelectsIDs(
+            self.body.find_all('div', max_depth=2), ['1', '2', '5', '6'])
+        self.assertSelectsIDs(
+            self.body.find_all('div', max_depth=3),
+            ['1', '2', '3', '5', '6', '7'])
+
+    def test_max_depth_one_is_not_recursive(self):
+        self.assertEqual(self.body.find_all('div', max_depth=1),
+                         self.body.find_all('div', recursive=False))
+
+    def test_max_depth_zero_finds_nothing(self):
+        self.assertEqual(self.body.find_all(max_depth=0), [])
+
+    def test_max_depth_includes_text(self):
+        soup = self.soup("<a>1<b>2<c>3</c></b></a>")
+        self.assertEqual(soup.a.find_all(text=True, max_depth=2),
+                         [u"1", u"2"])
+
+    def test_prune(self):
+        def is_aside(tag):
+            return tag.name == 'aside'
+        self.assertSelectsIDs(
+            self.body.find_all('div', prune=is_aside),
+            ['1', '2', '3', '4', '6'])
+        # The pruned tag itself is not found.
+        self.assertEqual(self.body.find_all('aside', prune=is_aside), [])
+
+    def test_prune_and_max_depth(self):
+        def is_aside(tag):
+            return tag.name == 'aside'
+        self.assertSelectsIDs(
+            self.body.find_all('div', max_depth=2, prune=is_aside),
+            ['1', '2', '6'])
+
+    def test_prune_last_element(self):
+        soup = self.soup("<a><b>1</b><c>2</c></a>")
+        self.assertEqual(
+            soup.a.find_all(text=True, prune=lambda tag: tag.name == 'c'),
+            [u"1"])
+
+    def test_find_with_prune(self):
+        self.assertEqual(
+            self.body.find('div', id='7',
+                           prune=lambda tag: tag.name == 'aside'), None)
+        self.assertEqual(self.body.find('div', id='7')['id'], '7')
+
+
 class TestFindAllByAttribute(TreeTest):
 
     def test_find_all_by_attribute_name(self):
@@ -750,6 +870,59 @@ class TestTreeModification(SoupTest):
         a.clear(decompose=True)
         self.assertFalse(hasattr(em, "contents"))
 
+    def test_clear_with_decompose_mends_the_element_chain(self):
+        soup = self.soup("<p><a>String <em>Italicized</em></a> and another</p>")
+        a = soup.a
+        em = a.em
+        a.clear(decompose=True)
+        self.assertEqual(a.contents, [])
+        self.assertFalse(hasattr(em, "contents"))
+        self.assertEqual(a.next_element, " and another")
+        self.assertEqual(a.next_element.previous_element, a)
+        self.assertEqual(soup.p.decode(), "<p><a></a> and another</p>")
+
+    def test_decompose_frees_elements_without_garbage_collection(self):
+        soup = self.soup("<div><p>foo<b>bar</b></p><p>baz</p></div>")
+        p = soup.p
+        references = map(weakref.ref, [p, p.b, p.b.string, p.contents[0]])
+        gc.disable()
+        try:
+            p.decompose()
+            del p
+            self.assertEqual([ref() for ref in references],
+                             [None] * len(references))
+        finally:
+            gc.enable()
+        self.assertEqual(soup.div.decode(), "<div><p>baz</p></div>")
+
+    def test_decompose_frees_strings_cached_by_ancestors(self):
+        markup = "<div><p>foo<b>bar</b></p><p>baz</p></div>"
+        for soup in (self.soup(markup), self.soup(markup, index_strings=True)):
+            div = soup.div
+            self.assertEqual(div.text, "foobarbaz")
+            div.string_index
+            div.cache_output = True
+            div.decode()
+            reference = weakref.ref(div.b.string)
+            gc.disable()
+            try:
+                div.p.decompose()
+                self.assertEqual(reference(), None)
+                div.find('p').clear(decompose=True)
+            finally:
+                gc.enable()
+            self.assertEqual(div.text, "")
+            self.assertEqual(soup.text, "")
+            self.assertEqual(soup.find_all(text="baz"), [])
+
+    def test_decompose_deep_tree(self):
+        depth = sys.getrecursionlimit() * 2
+        soup = BeautifulSoup(
+            "<div>" + "<b>x" * depth + "</b>" * depth + "</div>",
+            "html.parser")
+        soup.b.decompose()
+        self.assertEqual(soup.div.decode(), "<div></div>")
+
     def test_string_set(self):
         """Tag.string = 'string'"""
         soup = self.soup("<a></a> <b><c></c></b>")
@@ -759,6 +932,53 @@ class TestTreeModification(SoupTest):
         self.assertEqual(soup.b.contents, ["bar"])
 
 
+class TestTreeVersion(SoupTest):
+    """Test the version numbers that track changes to the tree."""
+
+    def test_parsing_sets_a_version(self):
+        soup = self.soup("<a>foo</a>")
+        self.assertTrue(soup.version > 0)
+
+    def test_every_modification_changes_the_version(self):
+        soup = self.soup("<a><b>foo</b></a><c>bar</c>")
+        a, b, c = soup.a, soup.b, soup.c
+        modifications = [
+            lambda: b.append("baz"),
+            lambda: b.insert(0, "quux"),
+            lambda: b.contents[0].extract(),
+            lambda: b.contents[0].replace_with("new"),
+            lambda: b.__setitem__("id", "1"),
+            lambda: b.__delitem__("id"),
+            lambda: setattr(b, 'string', "bar"),
+            lambda: b.clear(),
+            ]
+        for modify in modifications:
+            old_versions = (soup.version, a.version, b.version)
+            c_version = c.version
+            modify()
+            for old, new in zip(old_versions,
+                                (soup.version, a.version, b.version)):
+                self.assertTrue(new > old)
+            # Other subtrees are not affected.
+            self.assertEqual(c.version, c_version)
+
+    def test_deleting_missing_attribute_is_not_a_modification(self):
+        soup = self.soup("<a>foo</a>")
+        version = soup.version
+        del soup.a['id']
+        self.assertEqual(soup.version, version)
+
+    def test_moving_a_subtree_leaves_its_version_alone(self):
+        soup = self.soup("<a><b>foo</b></a><c></c>")
+        b_version = soup.b.version
+        a_version = soup.a.version
+        c_version = soup.c.version
+        soup.c.append(soup.b)
+        self.assertEqual(soup.b.version, b_version)
+        self.assertTrue(soup.a.version > a_version)
+        self.assertTrue(soup.c.version > c_version)
+
+
 class TestElementObjects(SoupTest):
     """Test various features of element objects."""
 
@@ -776,6 +996,39 @@ class TestElementObjects(SoupTest):
         self.assertEquals(len(soup.top), 3)
         self.assertEquals(len(soup.top.contents), 3)
 
+    def test_names_are_shared_between_tags(self):
+        markup = '<div class="a"><div class="b"></div></div>'
+        for features in ['html.parser', 'lxml', 'html5lib']:
+            builder = builder_registry.lookup(features)
+            if builder is None:
+                continue
+            first, second = [self.soup(markup, builder=builder()).find_all('div')
+                             for i in range(2)]
+            tags = first + second
+            for tag in tags:
+                self.assertTrue(tag.name is tags[0].name)
+                self.assertTrue(list(tag.attrs)[0] is list(tags[0].attrs)[0])
+
+    def test_empty_attrs_and_contents_are_private_once_used(self):
+        soup = self.soup('<p><br><br></p>')
+        first, second = soup.find_all('br')
+        self.assertEqual(len(first), 0)
+        self.assertEqual(first.get('id'), None)
+        self.assertEqual(list(first), [])
+        self.assertEqual(first, second)
+        for tag in first, second:
+            self.assertFalse('_attrs' in tag.__dict__)
+            self.assertFalse('_contents' in tag.__dict__)
+
+        first.attrs['id'] = 'a'
+        first.contents.append('x')
+        self.assertEqual(first.attrs, {'id': 'a'})
+        self.assertEqual(first.contents, ['x'])
+        self.assertEqual(second.attrs, {})
+        self.assertEqual(second.contents, [])
+        self.assertTrue('id="a"' in first.decode())
+        self.assertFalse('id="a"' in second.decode())
+
     def test_member_access_invokes_find(self):
         """Accessing a Python member .foo or .fooTag invokes find('foo')"""
         soup = self.soup('<b><i></i></b>')
@@ -786,6 +1039,55 @@ class TestElementObjects(SoupTest):
         self.assertEqual(soup.a, None)
         self.assertEqual(soup.aTag, None)
 
+    def test_member_access_is_remembered_until_tree_changes(self):
+        soup = self.soup('<b><i>1</i></b><i>2</i>')
+        i = soup.i
+        self.assertEqual(i.string, "1")
+        self.assertTrue(soup.i is i)
+        self.assertTrue(soup.iTag is i)
+
+        # Changes anywhere beneath the tag are noticed.
+        new_i = self.soup('<i>0</i>').i
+        soup.b.insert(0, new_i)
+        self.assertEqual(soup.i.string, "0")
+        new_i.extract()
+        self.assertEqual(soup.i.string, "1")
+        soup.b.extract()
+        self.assertEqual(soup.i.string, "2")
+        self.assertEqual(soup.b, None)
+
+    def test_member_access_notices_renamed_tags(self):
+        soup = self.soup('<font>1</font><p><font>2</font></p>')
+        renamed = 0
+        while soup.font:
+            soup.font.name = 'span'
+            renamed += 1
+        self.assertEqual(renamed, 2)
+        self.assertEqual(soup.decode(), self.document_for(
+                '<span>1</span><p><span>2</span></p>'))
+
+        soup = self.soup('<b><i>1</i></b><i>2</i>')
+        self.assertEqual(soup.i.string, "1")
+        soup.i.name = 'em'
+        self.assertEqual(soup.i.string, "2")
+
+    def test_member_access_notices_tags_renamed_into_a_name(self):
+        soup = self.soup('<p><i>a</i><b>x</b></p>')
+        self.assertEqual(soup.em, None)
+        soup.i.name = 'em'
+        self.assertEqual(soup.em.string, "a")
+
+        soup = self.soup('<p><i>a</i><b>x</b></p>')
+        self.assertEqual(soup.b.string, "x")
+        soup.i.name = 'b'
+        self.assertEqual(soup.b.string, "a")
+
+    def test_renaming_a_tag_changes_the_version(self):
+        soup = self.soup('<p><b>x</b></p>')
+        p_version = soup.p.version
+        soup.b.name = 'i'
+        self.assertTrue(soup.p.version > p_version)
+
     def test_has_attr(self):
         """has_attr() checks for the presence of an attribute.
 
@@ -854,6 +1156,31 @@ class TestElementObjects(SoupTest):
         self.assertEqual(soup.a.get_text(","), "a,r, , t ")
         self.assertEqual(soup.a.get_text(",", strip=True), "a,r,t")
 
+    def test_get_text_keeps_nothing_by_default(self):
+        soup = self.soup("<a>foo<b>bar</b></a>")
+        self.assertEqual(soup.a.get_text(), u"foobar")
+        self.assertEqual(soup.a.get_text("|", strip=True), u"foo|bar")
+        self.assertEqual(soup.a._string_index, None)
+        self.assertEqual(soup._string_index, None)
+
+    def test_get_text_is_cached_until_tree_changes(self):
+        soup = self.soup("<a>foo<b>bar</b></a>")
+        a = soup.a
+        index = a.string_index
+        self.assertEqual(a.get_text(), u"foobar")
+        self.assertEqual(a.get_text("|"), u"foo|bar")
+        self.assertTrue(a.string_index is index)
+
+        # Changing the tree anywhere beneath the tag invalidates
+        # the cached text.
+        a.b.append("baz")
+        self.assertEqual(a.get_text(), u"foobarbaz")
+        self.assertFalse(a.string_index is index)
+        a.b.string = "quux"
+        self.assertEqual(a.get_text(), u"fooquux")
+        a.b.extract()
+        self.assertEqual(a.get_text(), u"foo")
+
 
 class TestPersistence(SoupTest):
     "Testing features like pickle and deepcopy."
@@ -899,9 +1226,136 @@ class TestPersistence(SoupTest):
         loaded = pickle.loads(dumped)
         self.assertEqual(loaded.decode(), soup.decode())
 
+    def links(self, soup):
+        """Describe every link between the elements of a tree."""
+        elements = [soup] + list(soup.recursive_children)
+        positions = dict((id(element), i)
+                         for i, element in enumerate(elements))
+        def position(element):
+            if element is None:
+                return None
+            return positions[id(element)]
+        return [(element.__class__.__name__,
+                 position(element.parent),
+                 position(element.next_element),
+                 position(element.previous_element),
+                 position(element.next_sibling),
+                 position(element.previous_sibling))
+                for element in elements]
+
+    def test_binary_dump_and_load_identity(self):
+        data = self.tree.dumps()
+        loaded = BeautifulSoup.loads(data)
+        self.assertEqual(loaded.__class__, BeautifulSoup)
+        self.assertEqual(loaded.decode(), self.tree.decode())
+        self.assertEqual(self.links(loaded), self.links(self.tree))
+        self.assertEqual(loaded.original_encoding,
+                         self.tree.original_encoding)
+        self.assertEqual(loaded.is_xml, self.tree.is_xml)
+
+        # The loaded tree can be searched and modified.
+        self.assertEqual(len(loaded.find_all('a')), 2)
+        loaded.b.extract()
+        self.assertEqual(loaded.find_all(text="bar"), [])
+
+    def test_binary_format_keeps_encoding_substitution(self):
+        loaded = BeautifulSoup.loads(self.tree.dumps())
+        self.assertTrue(loaded.meta.contains_substitutions)
+        self.assertTrue(
+            'charset=euc-jp' in loaded.encode("euc-jp").decode("euc-jp"))
+
+    def test_binary_format_keeps_string_classes(self):
+        soup = self.soup("<p><!--comment--><![CDATA[foo]]>bar<br></p>",
+                         builder=builder_registry.lookup('html.parser')())
+        loaded = BeautifulSoup.loads(soup.dumps())
+        self.assertEqual([c.__class__ for c in loaded.p.contents],
+                         [c.__class__ for c in soup.p.contents])
+        self.assertEqual(loaded.decode(), soup.decode())
+        self.assertEqual(loaded.br.is_empty_element, True)
+
+    def test_binary_format_handles_deep_trees(self):
+        soup = self.soup("<a>" * 5000,
+                         builder=builder_registry.lookup('html.parser')())
+        loaded = BeautifulSoup.loads(soup.dumps())
+        self.assertEqual(self.links(loaded), self.links(soup))
+
+    def test_binary_format_handles_unicode(self):
+        soup = self.soup(u'<b id="\N{SNOWMAN}">\N{SNOWMAN}</b>')
+        loaded = BeautifulSoup.loads(soup.dumps())
+        self.assertEqual(loaded.decode(), soup.decode())
+
+    def test_loading_bad_binary_data(self):
+        self.assertRaises(ValueError, BeautifulSoup.loads, b"")
+        self.assertRaises(ValueError, BeautifulSoup.loads, b"x" * 100)
+        self.assertRaises(ValueError, BeautifulSoup.loads,
+                          self.tree.dumps()[:100])
+
+    def test_clone_document(self):
+        copied = self.tree.clone()
+        self.assertEqual(copied.__class__, BeautifulSoup)
+        self.assertEqual(copied.decode(), self.tree.decode())
+        self.assertEqual(self.links(copied), self.links(self.tree))
+        self.assertEqual(copied.original_encoding,
+                         self.tree.original_encoding)
+
+    def test_clone_subtree(self):
+        original = self.tree.find_all('a')[1]
+        copied = original.clone()
+        self.assertEqual(copied.decode(), original.decode())
+        self.assertEqual(copied.parent, None)
+        self.assertEqual(copied.previous_element, None)
+        self.assertEqual(copied.next_sibling, None)
+        self.assertEqual(copied.b.string.next_element, None)
+        self.assertEqual(self.links(copied),
+                         self.links(original.extract().clone()))
+
+        # The copy is independent of the original.
+        copied['href'] = 'bar'
+        copied.b.string.replace_with('baz')
+        self.assertEqual(original.decode(), '<a href="foo"><b>bar</b></a>')
+        self.assertEqual(copied.decode(), '<a href="bar"><b>baz</b></a>')
+
+    def test_copy_module_copies_only_subtree(self):
+        original = self.tree.b
+        for copied in copy.copy(original), copy.deepcopy(original):
+            self.assertEqual(copied.decode(), original.decode())
+            self.assertEqual(copied.parent, None)
+
+    def test_clone_handles_deep_trees(self):
+        soup = self.soup("<a>" * 5000,
+                         builder=builder_registry.lookup('html.parser')())
+        self.assertEqual(self.links(soup.clone()), self.links(soup))
+
 
 class TestSubstitutions(SoupTest):
 
+    def test_builder_tag_info(self):
+        builder = builder_registry.lookup('html')()
+        info = builder.tag_info('br')
+        self.assertEqual(info, (True, False, False))
+        self.assertTrue(builder.tag_info('br') is info)
+        self.assertEqual(builder.tag_info('pre').preserve_whitespace, True)
+        self.assertEqual(builder.tag_info('meta').might_substitute, True)
+
+    def test_only_substitution_tags_are_checked(self):
+        class Builder(builder_registry.lookup('html.parser')):
+            checked = []
+            def set_up_substitutions(self, tag):
+                self.checked.append(tag.name)
+                return False
+        self.soup('<p><meta charset="utf8"></p>', builder=Builder())
+        self.assertEqual(Builder.checked, ['meta'])
+
+    def test_any_tag_is_checked_by_default(self):
+        class Builder(builder_registry.lookup('xml')):
+            checked = []
+            def set_up_substitutions(self, tag):
+                self.checked.append(tag.name)
+                return True
+        soup = self.soup('<a><b/></a>', builder=Builder())
+        self.assertEqual(Builder.checked, [soup.ROOT_TAG_NAME, 'a', 'b'])
+        self.assertTrue(soup.b.contains_substitutions)
+
     def test_html_entity_substitution(self):
         soup = self.soup(
             u"<b>Sacr\N{LATIN SMALL LETTER E WITH ACUTE} bleu!</b>")
@@ -953,6 +1407,68 @@ class TestSubstitutions(SoupTest):
         self.assertEquals(soup.contents[0].name, 'pre')
 
 
+class TestOutputCache(SoupTest):
+    """Test the opt-in cache of decode() output."""
+
+    def test_output_is_not_cached_by_default(self):
+        soup = self.soup("<a><b>foo</b></a>")
+        soup.decode()
+        self.assertEqual(soup.a._output_cache, None)
+
+    def test_cached_output_is_reused(self):
+        soup = self.soup("<a><b>foo</b></a><c>bar</c>")
+        soup.cache_output = True
+        first = soup.decode()
+        self.assertEqual(first, self.document_for("<a><b>foo</b></a><c>bar</c>"))
+        # Every tag beneath the cached tag has its output cached.
+        self.assertEqual(list(soup.b._output_cache.values()), [u"<b>foo</b>"])
+        self.assertTrue(soup.decode() is first)
+
+    def test_cache_is_invalidated_by_modification(self):
+        soup = self.soup("<a><b>foo</b></a><c>bar</c>")
+        soup.cache_output = True
+        soup.decode()
+        c_output = list(soup.c._output_cache.values())[0]
+
+        soup.b.string = "baz"
+        self.assertEqual(
+            soup.decode(), self.document_for("<a><b>baz</b></a><c>bar</c>"))
+        soup.b['id'] = "1"
+        self.assertEqual(
+            soup.decode(),
+            self.document_for('<a><b id="1">baz</b></a><c>bar</c>'))
+
+        # The subtree that didn't change wasn't output again.
+        self.assertTrue(list(soup.c._output_cache.values())[0] is c_output)
+
+    def test_cache_is_invalidated_by_renaming(self):
+        soup = self.soup("<a><b>foo</b></a>")
+        soup.cache_output = True
+        soup.decode()
+        soup.b.name = "i"
+        self.assertEqual(soup.decode(), self.document_for("<a><i>foo</i></a>"))
+
+    def test_cache_is_keyed_on_arguments(self):
+        soup = self.soup(u"<a>\N{SNOWMAN}\u00f5</a>")
+        soup.a.cache_output = True
+        self.assertEqual(soup.a.decode(), u"<a>\N{SNOWMAN}\u00f5</a>")
+        self.assertEqual(soup.a.decode(substitute_html_entities=True),
+                         u"<a>\N{SNOWMAN}&otilde;</a>")
+        self.assertEqual(soup.a.decode(), u"<a>\N{SNOWMAN}\u00f5</a>")
+
+    def test_pretty_print_notices_new_sibling(self):
+        # Giving <b> a next sibling changes its pretty-printed output,
+        # even though the tree beneath <b> hasn't changed.
+        soup = self.soup("<a><b>foo</b></a><c>bar</c>")
+        soup.cache_output = True
+        soup.decode(True)
+        soup.a.append(soup.c)
+        soup.cache_output = False
+        uncached = soup.decode(True)
+        soup.cache_output = True
+        self.assertEqual(soup.decode(True), uncached)
+
+
 class TestEncoding(SoupTest):
     """Test the ability to encode objects into strings."""
 